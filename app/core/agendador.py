@@ -0,0 +1,35 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# Agendador simples em processo: cada tarefa roda numa thread daemon própria,
+# a cada "intervalo" segundos, até parar_tarefas() ser chamado.
+_parar = threading.Event()
+_threads: list[threading.Thread] = []
+
+
+def _loop(nome: str, funcao, intervalo: float):
+    while not _parar.is_set():
+        try:
+            funcao()
+        except Exception:
+            # uma execução com erro não pode derrubar o agendador
+            logger.exception("Erro na tarefa periódica '%s'.", nome)
+        _parar.wait(intervalo)
+
+
+def registrar_tarefa(nome: str, funcao, intervalo: float):
+    _parar.clear()
+    thread = threading.Thread(target=_loop, args=(nome, funcao, intervalo), name=nome, daemon=True)
+    thread.start()
+    _threads.append(thread)
+    return thread
+
+
+def parar_tarefas(timeout: float = 5):
+    _parar.set()
+    for thread in _threads:
+        thread.join(timeout)
+    _threads.clear()
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import tempfile
+import time
+
+
+# ---------------------------------------------------------
+# Armazenamento de arquivos endereçado por conteúdo
+# Cada arquivo fica em <DIRETORIO>/<aa>/<bb>/<sha256>; o mesmo conteúdo enviado
+# duas vezes ocupa o disco uma vez só. O banco guarda apenas os metadados.
+#
+# Remover um anexo não apaga o conteúdo: a coleta periódica (remover_blob_orfao)
+# apaga os blobs sem anexo e sem uso recente. Reaproveitar um blob renova o mtime,
+# então um envio em andamento nunca perde o conteúdo que acabou de reaproveitar.
+# ---------------------------------------------------------
+DIRETORIO_ARQUIVOS = os.getenv("SGHSS_DIRETORIO_ARQUIVOS", "./arquivos_exames")
+LIMITE_ARQUIVO_BYTES = int(os.getenv("SGHSS_LIMITE_ARQUIVO_MB", "200")) * 1024 * 1024
+
+
+class ArquivoMuitoGrande(Exception):
+    pass
+
+
+def caminho_blob(hash_sha256: str) -> str:
+    return os.path.join(DIRETORIO_ARQUIVOS, hash_sha256[:2], hash_sha256[2:4], hash_sha256)
+
+
+def blob_existe(hash_sha256: str) -> bool:
+    return os.path.isfile(caminho_blob(hash_sha256))
+
+
+class GravadorBlob:
+    """
+    Recebe o arquivo em pedaços (escrever), calculando o hash enquanto grava num
+    temporário dentro do próprio diretório; concluir() move para o caminho final.
+    Nada é mantido inteiro em memória.
+    """
+
+    def __init__(self, limite_bytes: int = LIMITE_ARQUIVO_BYTES):
+        os.makedirs(DIRETORIO_ARQUIVOS, exist_ok=True)
+        self.limite_bytes = limite_bytes
+        self.tamanho = 0
+        self._hash = hashlib.sha256()
+        # mesmo sistema de arquivos do destino → os.replace é atômico
+        fd, self._temporario = tempfile.mkstemp(dir=DIRETORIO_ARQUIVOS, prefix=".envio-")
+        self._arquivo = os.fdopen(fd, "wb")
+
+    def escrever(self, pedaco: bytes):
+        self.tamanho += len(pedaco)
+        if self.tamanho > self.limite_bytes:
+            raise ArquivoMuitoGrande()
+        self._hash.update(pedaco)
+        self._arquivo.write(pedaco)
+
+    def concluir(self) -> tuple[str, int]:
+        """Retorna (sha256, tamanho). Se o conteúdo já existe, o temporário é descartado."""
+        self._arquivo.close()
+        hash_sha256 = self._hash.hexdigest()
+        destino = caminho_blob(hash_sha256)
+
+        if os.path.isfile(destino):
+            try:
+                # renova o mtime: a coleta não apaga um blob reaproveitado agora
+                os.utime(destino)
+                os.remove(self._temporario)
+                return hash_sha256, self.tamanho
+            except FileNotFoundError:
+                pass    # a coleta levou o blob neste instante: fica a nossa cópia
+
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(self._temporario, destino)
+        return hash_sha256, self.tamanho
+
+    def descartar(self):
+        self._arquivo.close()
+        if os.path.exists(self._temporario):
+            os.remove(self._temporario)
+
+
+def listar_blobs_antigos(carencia_segundos: float):
+    """Gera os hashes dos blobs sem modificação há mais de carencia_segundos."""
+    limite = time.time() - carencia_segundos
+    for raiz, _, nomes in os.walk(DIRETORIO_ARQUIVOS):
+        for nome in nomes:
+            # temporários de envio e blobs no meio de uma remoção ficam de fora
+            if nome.startswith(".") or nome.endswith(".remover"):
+                continue
+            try:
+                if os.stat(os.path.join(raiz, nome)).st_mtime < limite:
+                    yield nome
+            except FileNotFoundError:
+                continue
+
+
+def remover_blob_orfao(hash_sha256: str, carencia_segundos: float, ainda_em_uso) -> bool:
+    """
+    Tira o blob do caminho com um rename atômico antes de decidir: um envio que chega
+    depois não o encontra e grava a própria cópia. Se o blob foi reaproveitado antes
+    do rename (mtime recente) ou ganhou um anexo (ainda_em_uso()), volta para o lugar.
+    """
+    caminho = caminho_blob(hash_sha256)
+    removendo = caminho + ".remover"
+    try:
+        os.replace(caminho, removendo)
+    except FileNotFoundError:
+        return False
+
+    if time.time() - os.stat(removendo).st_mtime < carencia_segundos or ainda_em_uso():
+        os.replace(removendo, caminho)
+        return False
+
+    os.remove(removendo)
+    return True
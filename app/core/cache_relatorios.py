@@ -0,0 +1,125 @@
+import functools
+import inspect
+import threading
+import time
+from concurrent.futures import Future
+
+
+# ---------------------------------------------------------
+# Cache em processo dos resultados dos relatórios
+# Chave: (relatório, parâmetros). Cada resultado vale TTL_RELATORIOS_SEGUNDOS;
+# as escritas de consulta chamam invalidar_relatorios() depois do commit.
+#
+# Single-flight: se várias requisições pedem a mesma chave ausente ao mesmo
+# tempo, só a primeira calcula; as outras esperam o mesmo Future.
+# A invalidação também solta os cálculos em andamento: o que começou antes
+# dela não é guardado, e quem chega depois calcula de novo.
+# ---------------------------------------------------------
+TTL_RELATORIOS_SEGUNDOS = 60
+MAXIMO_ENTRADAS = 512
+
+_entradas: dict[tuple, tuple[float, object]] = {}      # chave → (expira_em, resultado)
+_em_calculo: dict[tuple, Future] = {}
+_lock = threading.Lock()
+
+_metricas: dict[str, dict[str, int]] = {}
+
+
+def _contar(relatorio: str, evento: str):
+    # chamado com _lock adquirido
+    m = _metricas.setdefault(relatorio, {"acertos": 0, "falhas": 0, "aguardaram": 0, "invalidacoes": 0})
+    m[evento] += 1
+
+
+def _guardar(chave: tuple, resultado, agora: float):
+    # chamado com _lock adquirido; acima do limite, sai primeiro o que expirou, depois o mais antigo
+    if len(_entradas) >= MAXIMO_ENTRADAS:
+        for k in [k for k, (expira, _) in _entradas.items() if expira <= agora]:
+            del _entradas[k]
+        while len(_entradas) >= MAXIMO_ENTRADAS:
+            del _entradas[next(iter(_entradas))]
+    _entradas[chave] = (agora + TTL_RELATORIOS_SEGUNDOS, resultado)
+
+
+def obter_ou_calcular(relatorio: str, parametros: tuple, calcular):
+    chave = (relatorio, parametros)
+    calcula_aqui = False
+
+    with _lock:
+        agora = time.monotonic()
+        item = _entradas.get(chave)
+        if item and item[0] > agora:
+            _contar(relatorio, "acertos")
+            return item[1]
+
+        futuro = _em_calculo.get(chave)
+        if futuro is not None:
+            _contar(relatorio, "aguardaram")
+        else:
+            _contar(relatorio, "falhas")
+            futuro = _em_calculo[chave] = Future()
+            calcula_aqui = True
+
+    if not calcula_aqui:
+        # outra requisição já está calculando: espera (erro também é repassado)
+        return futuro.result()
+
+    try:
+        resultado = calcular()
+    except BaseException as erro:
+        with _lock:
+            if _em_calculo.get(chave) is futuro:
+                del _em_calculo[chave]
+        futuro.set_exception(erro)
+        raise
+
+    with _lock:
+        # ainda registrado = nenhuma invalidação durante o cálculo
+        if _em_calculo.get(chave) is futuro:
+            del _em_calculo[chave]
+            _guardar(chave, resultado, time.monotonic())
+    futuro.set_result(resultado)
+    return resultado
+
+
+def em_cache(relatorio: str):
+    """Decorador para funções de relatório no formato f(db, ...): a chave ignora o db."""
+    def decorador(funcao):
+        assinatura = inspect.signature(funcao)
+
+        @functools.wraps(funcao)
+        def envolvida(db, *args, **kwargs):
+            argumentos = assinatura.bind(db, *args, **kwargs)
+            argumentos.apply_defaults()
+            parametros = tuple((nome, valor) for nome, valor in argumentos.arguments.items() if nome != "db")
+            return obter_ou_calcular(relatorio, parametros, lambda: funcao(db, *args, **kwargs))
+
+        return envolvida
+    return decorador
+
+
+def invalidar_relatorios(*relatorios: str):
+    """Sem argumentos, limpa tudo."""
+    with _lock:
+        for mapa in (_entradas, _em_calculo):
+            for chave in [c for c in mapa if not relatorios or c[0] in relatorios]:
+                del mapa[chave]
+        for relatorio in relatorios or list(_metricas):
+            _contar(relatorio, "invalidacoes")
+
+
+def metricas_cache() -> dict:
+    with _lock:
+        relatorios = {}
+        for relatorio, m in sorted(_metricas.items()):
+            pedidos = m["acertos"] + m["falhas"] + m["aguardaram"]
+            relatorios[relatorio] = {
+                **m,
+                "taxa_acerto": round((m["acertos"] + m["aguardaram"]) / pedidos, 3) if pedidos else None,
+            }
+        return {
+            "ttl_segundos": TTL_RELATORIOS_SEGUNDOS,
+            "entradas": len(_entradas),
+            "em_calculo": len(_em_calculo),
+            "relatorios": relatorios,
+        }
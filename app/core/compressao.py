@@ -0,0 +1,58 @@
+import base64
+import zlib
+
+
+# ---------------------------------------------------------
+# Compressão transparente de textos clínicos grandes
+# (EntradaProntuario.texto e Exame.resultado).
+#
+# Textos acima do limite são gravados como MARCADOR + base64(zlib(texto)), ainda
+# numa coluna String comum — funciona igual no SQLite e no Postgres, sem migrar
+# o tipo da coluna. Textos pequenos (ou que não encolhem) ficam como estão.
+# ---------------------------------------------------------
+LIMITE_COMPRESSAO_BYTES = 1024
+NIVEL_ZLIB = 6
+
+# caractere de controle no início: não aparece em texto digitado. Se o cliente
+# mandar um texto que começa com ele, o texto é comprimido mesmo assim (senão
+# seria lido de volta como comprimido).
+MARCADOR = "\x01z:"
+
+
+def esta_comprimido(valor: str | None) -> bool:
+    return isinstance(valor, str) and valor.startswith(MARCADOR)
+
+
+def comprimir_texto(texto: str | None) -> str | None:
+    # recebe sempre texto puro; quem já tem o valor gravado checa esta_comprimido antes
+    if texto is None:
+        return None
+
+    obrigatorio = esta_comprimido(texto)
+    bruto = texto.encode("utf-8")
+    if len(bruto) < LIMITE_COMPRESSAO_BYTES and not obrigatorio:
+        return texto
+
+    comprimido = MARCADOR + base64.b64encode(zlib.compress(bruto, NIVEL_ZLIB)).decode("ascii")
+    # só vale a pena se realmente ocupar menos
+    return comprimido if obrigatorio or len(comprimido) < len(bruto) else texto
+
+
+def descomprimir_texto(valor: str | None) -> str | None:
+    if not esta_comprimido(valor):
+        return valor
+    return zlib.decompress(base64.b64decode(valor[len(MARCADOR):])).decode("utf-8")
+
+
+def coluna_comprimida(nome_atributo: str):
+    """
+    Property para usar com synonym(): lê descomprimindo (só quando o atributo é
+    acessado, ex.: na serialização) e grava comprimindo.
+    """
+    def getter(self):
+        return descomprimir_texto(getattr(self, nome_atributo))
+
+    def setter(self, valor):
+        setattr(self, nome_atributo, comprimir_texto(valor))
+
+    return property(getter, setter)
@@ -0,0 +1,21 @@
+import base64
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+# ---------------------------------------------------------
+# Cursor opaco para paginação keyset por (data_hora, id).
+# O cliente só repassa o "proximo_cursor" recebido na página anterior.
+# ---------------------------------------------------------
+def codificar_cursor(data_hora: datetime, id_: int, *extras: str) -> str:
+    bruto = "|".join([data_hora.isoformat(), str(id_), *extras])
+    return base64.urlsafe_b64encode(bruto.encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor: str) -> tuple:
+    try:
+        partes = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return (datetime.fromisoformat(partes[0]), int(partes[1]), *partes[2:])
+    except (ValueError, IndexError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
@@ -1,7 +1,10 @@
+import os
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./sghss.db"
+# SGHSS_DATABASE_URL troca o banco (ex.: os testes usam um SQLite temporário)
+DATABASE_URL = os.getenv("SGHSS_DATABASE_URL", "sqlite:///./sghss.db")
 
 engine = create_engine(
     DATABASE_URL,
@@ -10,6 +13,14 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Leitura dos relatórios em background: aponte SGHSS_DATABASE_URL_LEITURA para
+# uma réplica; sem ela, usa o mesmo banco.
+DATABASE_URL_LEITURA = os.getenv("SGHSS_DATABASE_URL_LEITURA")
+
+engine_leitura = create_engine(DATABASE_URL_LEITURA) if DATABASE_URL_LEITURA else engine
+
+SessionLeitura = sessionmaker(autocommit=False, autoflush=False, bind=engine_leitura)
+
 Base = declarative_base()
 
 
@@ -22,16 +33,46 @@ def inicializar_bd():
     #Modelos de funções do sistema
     import app.models.consulta
     import app.models.agenda  
+    import app.models.lembrete_consulta
+    import app.models.contador_consulta
+    import app.models.evento_consulta
+    import app.models.tarefa_relatorio
+    import app.models.remocao_registro
 
     #Modelos para o prontuario do paciente 
     import app.models.prontuario
     import app.models.entrada_prontuario
+    import app.models.resumo_prontuario
 
     #Modelo para exames
     import app.models.exame
+    import app.models.arquivo_exame
+    import app.models.resultado_analito
+
+    #Modelos de notificações (tabela ativa + arquivo)
+    import app.models.notificacao
+    import app.models.notificacao_arquivada
+    import app.models.envio_notificacao
+    import app.models.entrega_notificacao
+
+    #Webhooks para integradores
+    import app.models.webhook
 
    # Cria todas as tabelas que ainda não existem
     Base.metadata.create_all(bind=engine)
+
+    # Índice de busca textual do prontuário (FTS5 no SQLite, tsvector no Postgres)
+    from app.services.busca_service import inicializar_indice_busca
+    inicializar_indice_busca(engine)
+
+    # Contadores dos relatórios de consultas (monta na primeira vez)
+    from app.services.contador_service import inicializar_contadores
+    db = SessionLocal()
+    try:
+        inicializar_contadores(db)
+    finally:
+        db.close()
+
     print(">>> Banco de dados inicializado. As tabelas foram verificadas/criadas.")
 
 
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+from functools import partial
 from fastapi import FastAPI
 from app.routes.usuario_router import router as usuario_router
 from app.routes.auth_router import router as auth_router
@@ -10,13 +12,62 @@ from app.routes import exame_router
 from app.routes import admin_router
 from app.routes import relatorio_router
 from app.routes import notificacao_router
+from app.routes import webhook_router
 from app.database import inicializar_bd 
+from app.core.agendador import registrar_tarefa, parar_tarefas
+from app.services.lembrete_service import executar_lembretes_em_background
+from app.services.entrega_service import (
+    criar_canais_configurados,
+    executar_entregas_em_background,
+    INTERVALO_ENTREGA
+)
+from app.services.webhook_service import executar_webhooks_em_background, INTERVALO_WEBHOOKS
+from app.services.arquivo_exame_service import coletar_blobs_orfaos_em_background, INTERVALO_COLETA_BLOBS
+from app.services.tarefa_relatorio_service import (
+    expirar_resultados_em_background,
+    recuperar_tarefas_interrompidas,
+    renovar_tarefas_em_background,
+    encerrar_tarefas_relatorios,
+    INTERVALO_EXPIRACAO,
+    INTERVALO_RENOVACAO
+)
+
+# intervalo (segundos) entre varreduras de lembretes de consulta
+INTERVALO_LEMBRETES = 300
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # tarefas periódicas em background (sobem e descem junto com a API)
+    registrar_tarefa("lembretes_consulta", executar_lembretes_em_background, INTERVALO_LEMBRETES)
+    registrar_tarefa("webhooks", executar_webhooks_em_background, INTERVALO_WEBHOOKS)
+
+    # relatórios em background: o que ficou pela metade no último desligamento vira erro;
+    # depois, renova a reserva das tarefas desta instância e recolhe as órfãs de outras
+    recuperar_tarefas_interrompidas()
+    registrar_tarefa("renovar_relatorios", renovar_tarefas_em_background, INTERVALO_RENOVACAO)
+    registrar_tarefa("expirar_relatorios", expirar_resultados_em_background, INTERVALO_EXPIRACAO)
+
+    # conteúdo de anexos removidos (sem nenhum anexo apontando) sai do disco aqui
+    registrar_tarefa("coletar_blobs", coletar_blobs_orfaos_em_background, INTERVALO_COLETA_BLOBS)
+
+    # um worker por canal de entrega configurado (SGHSS_CANAIS_ENTREGA)
+    canais = criar_canais_configurados()
+    for canal in canais:
+        registrar_tarefa(f"entrega_{canal.nome}", partial(executar_entregas_em_background, canal), INTERVALO_ENTREGA)
+
+    yield
 
+    parar_tarefas()
+    encerrar_tarefas_relatorios()
+    for canal in canais:
+        canal.fechar()
 
 
 app = FastAPI(
     title="SGHSS - Sistema de Gestão Hospitalar",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 inicializar_bd()
@@ -32,6 +83,7 @@ app.include_router(exame_router.router)
 app.include_router(admin_router.router)
 app.include_router(relatorio_router.router)
 app.include_router(notificacao_router.router)
+app.include_router(webhook_router.router)
 
 
 @app.get("/")
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, Date, Time, Boolean, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, Date, Time, DateTime, Boolean, ForeignKey, UniqueConstraint, Index, func
 from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
 
 from app.database import Base
 
@@ -13,6 +14,15 @@ class Agenda(Base):
     hora = Column(Time, nullable=False)
     disponivel = Column(Boolean, default=True)
 
+    # exportação incremental (/admin/exportacoes?desde=)
+    # server_default: linhas inseridas fora do ORM também entram na exportação incremental
+    atualizado_em = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        server_default=func.now()
+    )
+
     # CORREÇÃO AQUI:
     profissional = relationship("ProfissionalSaude", backref="agendas")
 
@@ -23,4 +33,8 @@ class Agenda(Base):
             "hora",
             name="unique_horario_profissional"
         ),
+        # relatório de ocupação: faixa de datas de todos os profissionais
+        Index("ix_agendas_data", "data", "profissional_id", "disponivel"),
+        # exportação incremental
+        Index("ix_agendas_atualizado", "atualizado_em", "id"),
     )
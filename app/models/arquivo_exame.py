@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
+
+from app.database import Base
+
+
+# Metadados de um arquivo anexado ao exame (PDF, imagem...).
+# O conteúdo fica no armazenamento em disco, endereçado pelo hash (app/core/armazenamento.py);
+# vários anexos podem apontar para o mesmo hash.
+class ArquivoExame(Base):
+    __tablename__ = "arquivos_exame"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    exame_id = Column(Integer, ForeignKey("exames.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    nome_arquivo = Column(String, nullable=False)
+    tipo_conteudo = Column(String, nullable=False, default="application/octet-stream")
+    tamanho = Column(Integer, nullable=False)
+    hash_sha256 = Column(String(64), nullable=False, index=True)
+
+    enviado_por = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
+    enviado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    exame = relationship("Exame", backref="arquivos")
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from app.database import Base
-from datetime import datetime
+from datetime import datetime, timezone
 
 class Consulta(Base):
     __tablename__ = "consultas"
@@ -11,8 +11,30 @@ class Consulta(Base):
     status = Column(String, default="agendada", nullable=False)
     observacoes = Column(String, nullable=True)
 
+    # exportação incremental (/admin/exportacoes?desde=)
+    # server_default: linhas inseridas fora do ORM também entram na exportação incremental
+    atualizado_em = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        server_default=func.now()
+    )
+
     paciente_id = Column(Integer, ForeignKey("pacientes.id"), nullable=False)
     profissional_id = Column(Integer, ForeignKey("profissionais_saude.id"), nullable=False)
 
     paciente = relationship("Paciente", backref="consultas")
     profissional = relationship("ProfissionalSaude", backref="consultas")
+
+    __table_args__ = (
+        # varredura por janela de tempo (lembretes, relatórios, ocupação por profissional)
+        Index("ix_consultas_data_hora_status", "data_hora", "status", "profissional_id"),
+        # vínculo de cuidado profissional ↔ paciente (acesso ao prontuário)
+        Index("ix_consultas_profissional_paciente", "profissional_id", "paciente_id"),
+        # relatórios de um profissional por período
+        Index("ix_consultas_profissional_data", "profissional_id", "data_hora", "status"),
+        # linha do tempo do paciente
+        Index("ix_consultas_paciente_data", "paciente_id", "data_hora"),
+        # exportação incremental
+        Index("ix_consultas_atualizado", "atualizado_em", "id"),
+    )
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+
+from app.database import Base
+
+
+# Contadores dos relatórios de consultas, mantidos pelo consulta_service na mesma
+# transação de cada mudança (agendar, mudar status, reagendar, deletar).
+# Os endpoints /relatorios/consultas-* leem só estas linhas.
+# Divergiu? python reconstruir_contadores.py
+
+class ContadorConsultaStatus(Base):
+    __tablename__ = "contadores_consultas_status"
+
+    status = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+
+
+class ContadorConsultaMes(Base):
+    __tablename__ = "contadores_consultas_mes"
+
+    mes = Column(String(7), primary_key=True)     # "AAAA-MM" da data_hora da consulta
+    total = Column(Integer, nullable=False, default=0)
+
+
+class ContadorConsultaProfissional(Base):
+    __tablename__ = "contadores_consultas_profissional"
+
+    profissional_id = Column(Integer, ForeignKey("profissionais_saude.id", ondelete="CASCADE"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship, synonym
 from datetime import datetime, timezone
 
 from app.database import Base
+from app.core.compressao import coluna_comprimida
 
 
 class EntradaProntuario(Base):
@@ -12,7 +13,9 @@ class EntradaProntuario(Base):
 
     prontuario_id = Column(Integer, ForeignKey("prontuarios.id"), nullable=False)
 
-    texto = Column(String, nullable=False)
+    # coluna "texto" no banco (pode estar comprimida); use sempre o atributo .texto
+    _texto = Column("texto", String, nullable=False)
+    texto = synonym("_texto", descriptor=coluna_comprimida("_texto"))
     tipo = Column(String, default="anotacao")  # opcional: evolucao, prescricao, exame, etc
     data_hora = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
@@ -22,3 +25,8 @@ class EntradaProntuario(Base):
     # relacionamentos
     prontuario = relationship("Prontuario", back_populates="entradas")
     consulta = relationship("Consulta", backref="entrada_prontuario")
+
+    __table_args__ = (
+        # listagem paginada do prontuário (mais recentes primeiro)
+        Index("ix_entradas_prontuario_data", "prontuario_id", "data_hora"),
+    )
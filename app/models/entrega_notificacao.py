@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, UniqueConstraint
+from datetime import datetime, timezone
+
+from app.database import Base
+
+
+# Fila durável (outbox) da entrega externa — uma linha por notificação por canal.
+# Gravada na mesma transação da notificação; quando o agrupamento reescreve a
+# notificação, a linha é rearmada (versao + 1) e a mensagem nova sai de novo.
+# O worker do canal reserva um lote, envia e só então apaga a linha.
+# status: pendente, enviando (reservado por um worker até proxima_tentativa), falhou
+class EntregaNotificacao(Base):
+    __tablename__ = "entregas_notificacoes"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    canal = Column(String, nullable=False)
+    notificacao_id = Column(Integer, ForeignKey("notificacoes.id", ondelete="CASCADE"), nullable=False)
+
+    status = Column(String, default="pendente", nullable=False)
+    tentativas = Column(Integer, default=0, nullable=False)
+    proxima_tentativa = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    lote = Column(String, nullable=True)            # token do worker que reservou a linha
+    erro = Column(String, nullable=True)
+
+    # sobe a cada rearme: o worker só apaga/atualiza a versão que ele enviou
+    versao = Column(Integer, default=1, nullable=False)
+
+    criado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        UniqueConstraint("canal", "notificacao_id", name="unique_entrega_canal_notificacao"),
+        Index("ix_entregas_notificacoes_fila", "canal", "status", "proxima_tentativa"),
+    )
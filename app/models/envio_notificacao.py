@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from datetime import datetime, timezone
+
+from app.database import Base
+
+
+# Envio em massa (broadcast) de uma notificação.
+# Guarda o alvo e o progresso (checkpoint) para poder retomar de onde parou.
+class EnvioNotificacao(Base):
+    __tablename__ = "envios_notificacao"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    tipo = Column(String, nullable=False)
+    mensagem = Column(String, nullable=False)
+
+    # alvo: todos, role, tipo_profissional, lista
+    alvo = Column(String, nullable=False)
+    filtro = Column(String, nullable=True)          # valor da role ou do tipo_profissional
+    usuario_ids = Column(JSON, nullable=True)       # somente quando alvo = "lista"
+
+    # pendente, em_andamento, concluido, erro
+    status = Column(String, default="pendente", nullable=False)
+
+    total_destinatarios = Column(Integer, default=0)
+    enviados = Column(Integer, default=0)
+    ultimo_usuario_id = Column(Integer, default=0)  # checkpoint — ids são processados em ordem crescente
+
+    erro = Column(String, nullable=True)
+
+    criado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    atualizado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime, timezone
+
+from app.database import Base
+
+
+# Histórico das transições de status de uma consulta (uma linha por mudança).
+# O agendamento entra com status_anterior = NULL. Gravado pelo consulta_service na
+# mesma transação da mudança; base das análises de cancelamento em /relatorios.
+#
+# Sem FK para consultas: o histórico continua valendo para as análises mesmo se a
+# consulta for deletada depois.
+class EventoConsulta(Base):
+    __tablename__ = "eventos_consultas"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    consulta_id = Column(Integer, nullable=False)
+    paciente_id = Column(Integer, nullable=False)
+    profissional_id = Column(Integer, nullable=False)
+
+    status_anterior = Column(String, nullable=True)
+    status_novo = Column(String, nullable=False)
+
+    # data/hora da consulta no momento do evento (antecedência do cancelamento)
+    data_hora_consulta = Column(DateTime, nullable=False)
+    ocorrido_em = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # eventos de uma consulta em ordem (janelas por consulta); cobre as colunas lidas
+        Index(
+            "ix_eventos_consultas_consulta",
+            "consulta_id", "ocorrido_em", "status_novo", "data_hora_consulta", "profissional_id"
+        ),
+        # agendamentos/cancelamentos de um período
+        Index(
+            "ix_eventos_consultas_status_data",
+            "status_novo", "ocorrido_em", "consulta_id", "paciente_id", "profissional_id", "data_hora_consulta"
+        ),
+        # histórico de um paciente (cancelamentos recorrentes)
+        Index("ix_eventos_consultas_paciente", "paciente_id", "status_novo", "ocorrido_em"),
+    )
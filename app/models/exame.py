@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship, synonym
 from datetime import datetime, timezone
 
 from app.database import Base
+from app.core.compressao import coluna_comprimida
 
 class Exame(Base):
     __tablename__ = "exames"
@@ -23,12 +24,32 @@ class Exame(Base):
     status = Column(String, default="solicitado", nullable=False)  
     # exemplos: solicitado, em_andamento, concluido
 
-    resultado = Column(String, nullable=True)
+    # coluna "resultado" no banco (pode estar comprimida); use sempre o atributo .resultado
+    _resultado = Column("resultado", String, nullable=True)
+    resultado = synonym("_resultado", descriptor=coluna_comprimida("_resultado"))
 
     criado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     atualizado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
+    # momentos das transições de status (tempo de resposta por etapa)
+    iniciado_em = Column(DateTime, nullable=True)     # primeira vez em "em_andamento"
+    concluido_em = Column(DateTime, nullable=True)    # última vez que passou a "concluido"
+
     # relações
     paciente = relationship("Paciente", backref="exames")
     profissional = relationship("ProfissionalSaude", backref="exames_solicitados")
     consulta = relationship("Consulta", backref="exames")
+
+    __table_args__ = (
+        # linha do tempo do paciente
+        Index("ix_exames_paciente_criado", "paciente_id", "criado_em"),
+        # fila de trabalho do laboratório: status (+ tipo) em ordem de chegada
+        Index("ix_exames_fila", "status", "tipo_exame", "criado_em", "id"),
+        # mesma fila sem filtro de tipo (evita ordenar em memória)
+        Index("ix_exames_fila_status", "status", "criado_em", "id"),
+        # relatórios de tempo de resposta: faixa de datas + colunas usadas (só o índice é lido)
+        Index("ix_exames_concluido", "concluido_em", "tipo_exame", "profissional_id", "criado_em", "iniciado_em"),
+        Index("ix_exames_iniciado", "iniciado_em", "tipo_exame", "profissional_id", "criado_em"),
+        # exportação incremental (/admin/exportacoes?desde=)
+        Index("ix_exames_atualizado", "atualizado_em", "id"),
+    )
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime, timezone
+
+from app.database import Base
+
+
+# Registro dos lembretes já enviados — garante que cada consulta receba um lembrete só.
+# A unique (consulta_id, data_hora) faz o papel de "trava": se dois workers tentarem
+# lembrar a mesma consulta, só um INSERT passa. Se a consulta for reagendada, a nova
+# data_hora gera um novo lembrete.
+class LembreteConsulta(Base):
+    __tablename__ = "lembretes_consulta"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    consulta_id = Column(Integer, ForeignKey("consultas.id", ondelete="CASCADE"), nullable=False)
+    data_hora = Column(DateTime, nullable=False)   # data_hora da consulta no momento do lembrete
+
+    enviado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        UniqueConstraint("consulta_id", "data_hora", name="unique_lembrete_consulta"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 
@@ -16,6 +16,25 @@ class Notificacao(Base):
     mensagem = Column(String, nullable=False)
     lida = Column(Boolean, default=False)
 
+    # quantos eventos foram agrupados nesta notificação (resumo/digest)
+    agrupadas = Column(Integer, default=1, nullable=False)
+    # grupo aberto: ainda recebe eventos do mesmo tipo (fecha ao ler ou quando a janela vence)
+    agrupando = Column(Boolean, default=False, nullable=False)
+
     data_envio = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     usuario = relationship("Usuario", backref="notificacoes")
+
+    __table_args__ = (
+        # listagem do usuário (ordenada por data_envio desc)
+        Index("ix_notificacoes_usuario_data", "usuario_id", "data_envio"),
+        # varredura da política de retenção (lidas antigas de um tipo)
+        Index("ix_notificacoes_retencao", "tipo", "lida", "data_envio"),
+        # no máximo um grupo aberto por usuário e tipo (alvo do UPSERT do agrupamento)
+        Index(
+            "ux_notificacoes_grupo_aberto", "usuario_id", "tipo",
+            unique=True,
+            sqlite_where=agrupando == True,
+            postgresql_where=agrupando == True
+        ),
+    )
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
+from datetime import datetime, timezone
+
+from app.database import Base
+
+
+# Notificações lidas e antigas saem da tabela "quente" (notificacoes) e vêm pra cá.
+# Sem FK de propósito: o arquivo é só histórico e não deve travar exclusões de usuário.
+class NotificacaoArquivada(Base):
+    __tablename__ = "notificacoes_arquivadas"
+
+    # mesmo id da notificação original
+    id = Column(Integer, primary_key=True)
+
+    usuario_id = Column(Integer, nullable=False)
+
+    tipo = Column(String, nullable=False)
+    mensagem = Column(String, nullable=False)
+    lida = Column(Boolean, default=True)
+    agrupadas = Column(Integer, default=1, nullable=False)
+
+    data_envio = Column(DateTime, nullable=True)
+    arquivada_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_notificacoes_arquivadas_usuario_id", "usuario_id", "id"),
+    )
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime, timezone
+
+from app.database import Base
+
+
+# Marca de remoção (tombstone) das linhas apagadas de uma tabela exportada para BI.
+# Gravada na mesma transação do DELETE; a exportação incremental lê estas marcas em
+# /admin/exportacoes/{entidade}/remocoes?desde= para apagar a linha no destino.
+# entidade: nome usado na exportação ("consultas", "agendas")
+class RemocaoRegistro(Base):
+    __tablename__ = "remocoes_registros"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    entidade = Column(String, nullable=False)
+    registro_id = Column(Integer, nullable=False)
+    removido_em = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # remoções de uma entidade desde um instante, na mesma ordem da exportação
+        Index("ix_remocoes_registros_entidade", "entidade", "removido_em", "id"),
+    )
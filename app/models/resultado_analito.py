@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from datetime import datetime, timezone
+
+from app.database import Base
+
+
+# Resultado estruturado de um exame: um analito por linha (ex.: glicose = 98 mg/dL).
+# Opcional — o texto livre continua em Exame.resultado. Valores numéricos em Float
+# (não texto) para a série do paciente caber em poucas páginas do índice.
+class ResultadoAnalito(Base):
+    __tablename__ = "resultados_analitos"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    exame_id = Column(Integer, ForeignKey("exames.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # repetido do exame para a série por paciente não precisar de JOIN
+    paciente_id = Column(Integer, ForeignKey("pacientes.id"), nullable=False)
+
+    analito = Column(String, nullable=False)        # normalizado em minúsculas: "glicose", "hemoglobina"
+    valor = Column(Float, nullable=False)
+    unidade = Column(String, nullable=True)         # ex: mg/dL
+
+    referencia_min = Column(Float, nullable=True)
+    referencia_max = Column(Float, nullable=True)
+
+    coletado_em = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # tendência: série de um analito do paciente em ordem de tempo
+        Index("ix_resultados_analitos_serie", "paciente_id", "analito", "coletado_em"),
+    )
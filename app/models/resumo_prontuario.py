@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, JSON
+from datetime import datetime, timezone
+
+from app.database import Base
+
+
+# Resumo do prontuário (projeção 1:1), mantido pelo adicionar_entrada() na mesma
+# transação da entrada. Serve o "resumo rápido" sem ler as entradas.
+class ResumoProntuario(Base):
+    __tablename__ = "resumos_prontuario"
+
+    prontuario_id = Column(Integer, ForeignKey("prontuarios.id", ondelete="CASCADE"), primary_key=True)
+
+    total_entradas = Column(Integer, nullable=False, default=0)
+    contagem_por_tipo = Column(JSON, nullable=False, default=dict)   # ex: {"exame": 3, "evolucao": 7}
+    ultimas_entradas = Column(JSON, nullable=False, default=list)    # mais recentes primeiro (id, tipo, data_hora, trecho, consulta_id)
+
+    ultima_atualizacao = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from datetime import datetime, timezone
+
+from app.database import Base
+
+
+# Relatório pedido para rodar em background (POST /relatorios/tarefas).
+# status: pendente → executando → concluida | erro; depois de expira_em o
+# arquivo do resultado é apagado e a tarefa fica "expirada".
+# Cada tarefa pertence à instância da API que a aceitou (instancia), que renova
+# reservada_ate enquanto ela está na fila ou rodando; tarefa com a reserva
+# vencida ficou órfã (a instância caiu) e vira erro.
+class TarefaRelatorio(Base):
+    __tablename__ = "tarefas_relatorios"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    relatorio = Column(String, nullable=False)          # ex: "ocupacao_agendas"
+    parametros = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="pendente")
+
+    solicitado_por = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+
+    instancia = Column(String, nullable=True)           # processo que roda a tarefa
+    reservada_ate = Column(DateTime, nullable=True)     # renovada pela instância dona
+
+    criado_em = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    iniciado_em = Column(DateTime, nullable=True)
+    concluido_em = Column(DateTime, nullable=True)
+    expira_em = Column(DateTime, nullable=True)
+
+    tamanho = Column(Integer, nullable=True)            # bytes do resultado (JSON)
+    erro = Column(String, nullable=True)
+
+    __table_args__ = (
+        # limpeza dos resultados vencidos
+        Index("ix_tarefas_relatorios_expiracao", "status", "expira_em"),
+    )
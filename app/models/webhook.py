@@ -0,0 +1,49 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
+
+from app.database import Base
+
+
+# Assinatura de webhook de um integrador (laboratório, convênio...)
+class AssinaturaWebhook(Base):
+    __tablename__ = "webhooks_assinaturas"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    url = Column(String, nullable=False)
+    eventos = Column(JSON, nullable=False)          # ex: ["consulta.cancelada", "exame.status_alterado"]
+    segredo = Column(String, nullable=False)        # chave do HMAC que assina as entregas
+    ativo = Column(Boolean, default=True, nullable=False)
+
+    criado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    entregas = relationship("EntregaWebhook", back_populates="assinatura", cascade="all, delete-orphan")
+
+
+# Fila durável (outbox) — uma linha por evento por assinatura.
+# Gravada na mesma transação da mudança de domínio; o worker entrega e apaga.
+# status: pendente, enviando (reservado por um worker até proxima_tentativa), falhou
+class EntregaWebhook(Base):
+    __tablename__ = "entregas_webhook"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    assinatura_id = Column(Integer, ForeignKey("webhooks_assinaturas.id", ondelete="CASCADE"), nullable=False)
+
+    evento = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+
+    status = Column(String, default="pendente", nullable=False)
+    tentativas = Column(Integer, default=0, nullable=False)
+    proxima_tentativa = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    lote = Column(String, nullable=True)            # token do worker que reservou a linha
+    erro = Column(String, nullable=True)
+
+    criado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    assinatura = relationship("AssinaturaWebhook", back_populates="entregas")
+
+    __table_args__ = (
+        Index("ix_entregas_webhook_fila", "status", "proxima_tentativa"),
+    )
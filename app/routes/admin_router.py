@@ -1,10 +1,20 @@
+from datetime import datetime
+from typing import Literal
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.core.auth import is_admin
 from app.models.usuario import Usuario
 from app.schemas.usuario_schema import UsuarioResponse
+from app.services.exportacao_service import (
+    preparar_exportacao_bi,
+    preparar_exportacao_remocoes,
+    exportar_bi_csv,
+    exportar_bi_ndjson
+)
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -33,3 +43,54 @@ def promover_usuario_admin(
     db.refresh(usuario)
 
     return usuario
+
+
+# EXPORTAÇÃO EM MASSA PARA BI (CSV ou NDJSON em streaming)
+# ?colunas=id,status,data_hora escolhe as colunas; ?desde= traz só o que mudou
+@router.get("/exportacoes/{entidade}")
+def exportar_entidade(
+    entidade: str,
+    formato: Literal["csv", "ndjson"] = "csv",
+    colunas: str | None = None,
+    desde: datetime | None = None,
+    admin = Depends(is_admin)
+):
+    """
+    Exporta a tabela inteira ou, com `desde`, só as linhas com atualizado_em >= desde.
+    Linhas apagadas NÃO aparecem aqui: busque-as em /admin/exportacoes/{entidade}/remocoes
+    com o mesmo `desde` e apague-as no destino.
+    """
+    lista_colunas = [c.strip() for c in colunas.split(",") if c.strip()] if colunas else None
+    consulta, lista_colunas = preparar_exportacao_bi(entidade, lista_colunas, desde)
+    return _resposta_exportacao(consulta, lista_colunas, formato, entidade)
+
+
+# MARCAS DE REMOÇÃO PARA A CARGA INCREMENTAL (id + removido_em)
+@router.get("/exportacoes/{entidade}/remocoes")
+def exportar_remocoes_entidade(
+    entidade: str,
+    formato: Literal["csv", "ndjson"] = "csv",
+    desde: datetime | None = None,
+    admin = Depends(is_admin)
+):
+    """
+    Ids apagados da entidade (consultas e agendas são removidas de verdade), com removido_em.
+    Use o maior removido_em recebido como o próximo `desde`.
+    """
+    consulta, lista_colunas = preparar_exportacao_remocoes(entidade, desde)
+    return _resposta_exportacao(consulta, lista_colunas, formato, f"{entidade}-remocoes")
+
+
+def _resposta_exportacao(consulta, colunas: list[str], formato: str, nome: str):
+    if formato == "ndjson":
+        return StreamingResponse(
+            exportar_bi_ndjson(consulta, colunas),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f'attachment; filename="{nome}.ndjson"'}
+        )
+
+    return StreamingResponse(
+        exportar_bi_csv(consulta, colunas),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{nome}.csv"'}
+    )
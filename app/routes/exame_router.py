@@ -1,20 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
 from sqlalchemy.orm import Session
+from datetime import datetime
 
 from app.database import get_db
 from app.core.auth import get_current_user, is_admin
+from app.core.armazenamento import caminho_blob, LIMITE_ARQUIVO_BYTES
 
 from app.schemas.exame_schema import (
     ExameCreate,
     ExameUpdate,
-    ExameResponse
+    ExameResponse,
+    ArquivoExameResponse,
+    ResultadoLoteCreate,
+    ResultadoLoteResponse,
+    FilaExamesPagina,
+    ReservaFilaCreate,
+    AnalitoResponse
 )
 
 from app.services.exame_service import (
     criar_exame_service,
     listar_exames_service,
     buscar_exame_service,
-    atualizar_exame_service
+    atualizar_exame_service,
+    ingerir_resultados_service,
+    listar_fila_exames_service,
+    reservar_exames_service,
+    reservar_exame_service,
+    listar_analitos_exame_service
+)
+from app.services.arquivo_exame_service import (
+    salvar_arquivo_exame_service,
+    listar_arquivos_exame_service,
+    buscar_arquivo_exame_service,
+    remover_arquivo_exame_service
 )
 
 from app.models.exame import Exame
@@ -22,6 +45,44 @@ from app.models.exame import Exame
 router = APIRouter(prefix="/exames", tags=["Exames"])
 
 
+# ---------------------------------------------------------
+# Regras de acesso a um exame (usadas também pelos anexos)
+# ---------------------------------------------------------
+def verificar_acesso_exame(exame: Exame, usuario_atual):
+    # Admin → sempre pode
+    if usuario_atual.role == "admin":
+        return
+
+    # Profissional → só exames dos seus pacientes
+    if hasattr(usuario_atual, "profissional_saude") and usuario_atual.profissional_saude:
+        prof_id = usuario_atual.profissional_saude[0].id
+        if exame.profissional_id != prof_id:
+            raise HTTPException(403, "Você não pode ver exames de outros profissionais.")
+        return
+
+    # Paciente → só seus próprios exames
+    if hasattr(usuario_atual, "paciente") and usuario_atual.paciente:
+        paciente_id = usuario_atual.paciente[0].id
+        if exame.paciente_id != paciente_id:
+            raise HTTPException(403, "Você só pode ver seus próprios exames.")
+        return
+
+    raise HTTPException(403, "Acesso não autorizado.")
+
+
+def verificar_edicao_exame(exame: Exame, usuario_atual):
+    # Admin → pode tudo; profissional → só o próprio exame
+    if usuario_atual.role == "admin":
+        return
+
+    if hasattr(usuario_atual, "profissional_saude") and usuario_atual.profissional_saude:
+        if exame.profissional_id != usuario_atual.profissional_saude[0].id:
+            raise HTTPException(403, "Você só pode alterar exames que você mesmo cadastrou.")
+        return
+
+    raise HTTPException(403, "Somente administradores e profissionais podem alterar exames.")
+
+
 # ---------------------------------------------------------
 # CRIAR EXAME — ADMIN ou PROFISSIONAL
 # ---------------------------------------------------------
@@ -41,6 +102,76 @@ def criar_exame(
     return ExameResponse.model_validate(exame)
 
 
+# ---------------------------------------------------------
+# INGESTÃO DE RESULTADOS EM LOTE — ADMIN ou PROFISSIONAL (só os próprios exames)
+# Resposta com o resultado de cada item; um item com erro não impede os outros.
+# ---------------------------------------------------------
+@router.post("/resultados/lote", response_model=ResultadoLoteResponse)
+def ingerir_resultados(
+    dados: ResultadoLoteCreate,
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    profissional_id = None
+    if usuario_atual.role != "admin":
+        if not hasattr(usuario_atual, "profissional_saude") or not usuario_atual.profissional_saude:
+            raise HTTPException(403, "Somente administradores e profissionais podem atualizar exames.")
+        profissional_id = usuario_atual.profissional_saude[0].id
+
+    return ingerir_resultados_service(db, dados.itens, profissional_id)
+
+
+# ---------------------------------------------------------
+# FILA DE TRABALHO DO LABORATÓRIO — ADMIN ou PROFISSIONAL
+# (técnicos do laboratório são cadastrados como profissionais de saúde)
+# Declarada antes de /{exame_id} para não colidir com o path.
+# ---------------------------------------------------------
+def _exigir_equipe(usuario_atual):
+    if usuario_atual.role == "admin":
+        return
+    if not hasattr(usuario_atual, "profissional_saude") or not usuario_atual.profissional_saude:
+        raise HTTPException(403, "Somente administradores e profissionais acessam a fila do laboratório.")
+
+
+# Mais antigos primeiro; filtros por status (padrão: solicitado), tipo e período
+@router.get("/fila", response_model=FilaExamesPagina)
+def listar_fila_exames(
+    status: str = "solicitado",
+    tipo_exame: str | None = None,
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    cursor: str | None = None,
+    limite: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    _exigir_equipe(usuario_atual)
+    return listar_fila_exames_service(db, status, tipo_exame, de, ate, cursor, limite)
+
+
+# Pega os próximos exames da fila (solicitado → em_andamento) sem colidir com outros técnicos
+@router.post("/fila/reservar", response_model=list[ExameResponse])
+def reservar_exames(
+    dados: ReservaFilaCreate,
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    _exigir_equipe(usuario_atual)
+    exames = reservar_exames_service(db, dados.tipo_exame, dados.quantidade)
+    return [ExameResponse.model_validate(e) for e in exames]
+
+
+# Reserva um exame específico; 409 se ele já saiu da fila
+@router.post("/{exame_id}/reservar", response_model=ExameResponse)
+def reservar_exame(
+    exame_id: int,
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    _exigir_equipe(usuario_atual)
+    return ExameResponse.model_validate(reservar_exame_service(db, exame_id))
+
+
 # ---------------------------------------------------------
 # LISTAR EXAMES (com regras por papel)
 # ---------------------------------------------------------
@@ -93,26 +224,23 @@ def buscar_exame(
 ):
 
     exame = buscar_exame_service(exame_id, db)
+    verificar_acesso_exame(exame, usuario_atual)
+    return ExameResponse.model_validate(exame)
 
-    # Admin → sempre pode
-    if usuario_atual.role == "admin":
-        return ExameResponse.model_validate(exame)
-
-    # Profissional → só exames dos seus pacientes
-    if hasattr(usuario_atual, "profissional_saude") and usuario_atual.profissional_saude:
-        prof_id = usuario_atual.profissional_saude[0].id
-        if exame.profissional_id != prof_id:
-            raise HTTPException(403, "Você não pode ver exames de outros profissionais.")
-        return ExameResponse.model_validate(exame)
-
-    # Paciente → só seus próprios exames
-    if hasattr(usuario_atual, "paciente") and usuario_atual.paciente:
-        paciente_id = usuario_atual.paciente[0].id
-        if exame.paciente_id != paciente_id:
-            raise HTTPException(403, "Você só pode ver seus próprios exames.")
-        return ExameResponse.model_validate(exame)
 
-    raise HTTPException(403, "Acesso não autorizado.")
+# ---------------------------------------------------------
+# RESULTADOS ESTRUTURADOS DO EXAME — mesmas regras do GET /exames/{exame_id}
+# (gravados pelo PATCH /exames/{exame_id} ou pela ingestão em lote, campo "analitos")
+# ---------------------------------------------------------
+@router.get("/{exame_id}/analitos", response_model=list[AnalitoResponse])
+def listar_analitos_exame(
+    exame_id: int,
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    exame = buscar_exame_service(exame_id, db)
+    verificar_acesso_exame(exame, usuario_atual)
+    return [AnalitoResponse.model_validate(a) for a in listar_analitos_exame_service(db, exame_id)]
 
 
 # ---------------------------------------------------------
@@ -142,3 +270,93 @@ def atualizar_exame(
         return ExameResponse.model_validate(exame)
 
     raise HTTPException(403, "Somente administradores e profissionais podem atualizar exames.")
+
+
+# ---------------------------------------------------------
+# ANEXOS DO EXAME (PDF, imagens...) — conteúdo em disco, endereçado por hash
+# ---------------------------------------------------------
+
+# ENVIAR — admin ou profissional responsável. O corpo da requisição é o próprio
+# arquivo (não multipart) e é gravado em pedaços, sem carregar tudo na memória.
+@router.post("/{exame_id}/arquivos", response_model=ArquivoExameResponse, status_code=201)
+async def enviar_arquivo_exame(
+    exame_id: int,
+    request: Request,
+    nome: str = Query(..., min_length=1, max_length=255),
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    # rota async só para ler o corpo em streaming: o que é síncrono vai para o threadpool
+    # (profissional_saude é carregado sob demanda, então a verificação também consulta o banco)
+    exame = await run_in_threadpool(buscar_exame_service, exame_id, db)
+    await run_in_threadpool(verificar_edicao_exame, exame, usuario_atual)
+
+    tamanho_declarado = request.headers.get("content-length")
+    if tamanho_declarado and tamanho_declarado.isdigit() and int(tamanho_declarado) > LIMITE_ARQUIVO_BYTES:
+        raise HTTPException(413, f"Arquivo maior que o limite de {LIMITE_ARQUIVO_BYTES // (1024 * 1024)} MB.")
+
+    arquivo = await salvar_arquivo_exame_service(
+        db,
+        exame,
+        nome_arquivo=os.path.basename(nome),
+        tipo_conteudo=request.headers.get("content-type") or "application/octet-stream",
+        pedacos=request.stream(),
+        usuario_id=usuario_atual.id
+    )
+    return ArquivoExameResponse.model_validate(arquivo)
+
+
+# LISTAR — mesmas regras do GET /exames/{exame_id}
+@router.get("/{exame_id}/arquivos", response_model=list[ArquivoExameResponse])
+def listar_arquivos_exame(
+    exame_id: int,
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    exame = buscar_exame_service(exame_id, db)
+    verificar_acesso_exame(exame, usuario_atual)
+    return [ArquivoExameResponse.model_validate(a) for a in listar_arquivos_exame_service(db, exame_id)]
+
+
+# BAIXAR — mesmas regras do GET /exames/{exame_id}
+# Suporta Range (download parcial/retomado) e ETag = hash do conteúdo (If-None-Match → 304).
+@router.get("/{exame_id}/arquivos/{arquivo_id}/conteudo")
+def baixar_arquivo_exame(
+    exame_id: int,
+    arquivo_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    exame = buscar_exame_service(exame_id, db)
+    verificar_acesso_exame(exame, usuario_atual)
+    arquivo = buscar_arquivo_exame_service(db, exame_id, arquivo_id)
+
+    etag = f'"{arquivo.hash_sha256}"'
+    cabecalhos = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+
+    # conteúdo nunca muda para o mesmo hash
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=cabecalhos)
+
+    # FileResponse trata Range/If-Range e usa http.response.pathsend quando o servidor oferece
+    return FileResponse(
+        caminho_blob(arquivo.hash_sha256),
+        media_type=arquivo.tipo_conteudo,
+        filename=arquivo.nome_arquivo,
+        headers=cabecalhos
+    )
+
+
+# REMOVER — admin ou profissional responsável
+@router.delete("/{exame_id}/arquivos/{arquivo_id}")
+def remover_arquivo_exame(
+    exame_id: int,
+    arquivo_id: int,
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    exame = buscar_exame_service(exame_id, db)
+    verificar_edicao_exame(exame, usuario_atual)
+    return remover_arquivo_exame_service(db, exame_id, arquivo_id)
@@ -1,20 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.core.auth import get_current_user, is_admin
 
-from app.schemas.notificacao_schema import NotificacaoCreate, NotificacaoResponse
+from app.schemas.notificacao_schema import (
+    NotificacaoCreate,
+    NotificacaoResponse,
+    NotificacaoArquivadaPagina,
+    ArquivamentoResponse,
+    NotificacaoBroadcastCreate,
+    EnvioNotificacaoResponse
+)
 from app.services.notificacao_service import (
     criar_notificacao_service,
     listar_minhas_notificacoes_service,
     listar_minhas_notificacoes_nao_lidas_service,
-    marcar_notificacao_lida_service
+    marcar_notificacao_lida_service,
+    arquivar_notificacoes_service,
+    listar_notificacoes_arquivadas_service,
+    criar_envio_service,
+    buscar_envio_service,
+    retomar_envio_service,
+    executar_envio_em_background
 )
 
 router = APIRouter(prefix="/notificacoes", tags=["Notificações"])
 
 
+# ---------------------------------------------------------
+# Rodar a política de retenção (arquivar lidas antigas) — SOMENTE ADMIN
+# (declarada antes de POST /{usuario_id} para não colidir com o path)
+# ---------------------------------------------------------
+@router.post("/arquivamento", response_model=ArquivamentoResponse)
+def arquivar_notificacoes(
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return arquivar_notificacoes_service(db)
+
+
+# ---------------------------------------------------------
+# Envio em massa (broadcast) — SOMENTE ADMIN
+# O envio roda em background; acompanhe pelo GET /notificacoes/envios/{id}
+# ---------------------------------------------------------
+@router.post("/envios", response_model=EnvioNotificacaoResponse, status_code=202)
+def criar_envio(
+    dados: NotificacaoBroadcastCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    envio = criar_envio_service(dados, db)
+    background_tasks.add_task(executar_envio_em_background, envio.id)
+    return envio
+
+
+@router.get("/envios/{envio_id}", response_model=EnvioNotificacaoResponse)
+def obter_envio(
+    envio_id: int,
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return buscar_envio_service(envio_id, db)
+
+
+# Retoma um envio interrompido (erro ou worker caiu) a partir do último checkpoint
+@router.post("/envios/{envio_id}/retomar", response_model=EnvioNotificacaoResponse, status_code=202)
+def retomar_envio(
+    envio_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    envio = retomar_envio_service(envio_id, db)
+    background_tasks.add_task(executar_envio_em_background, envio.id)
+    return envio
+
+
 # ---------------------------------------------------------
 # Criar notificação manual — SOMENTE ADMIN
 # ---------------------------------------------------------
@@ -50,6 +113,19 @@ def listar_nao_lidas(
     return listar_minhas_notificacoes_nao_lidas_service(usuario_atual.id, db)
 
 
+# ---------------------------------------------------------
+# Listar notificações ARQUIVADAS do usuário autenticado (paginado)
+# ---------------------------------------------------------
+@router.get("/arquivadas", response_model=NotificacaoArquivadaPagina)
+def listar_arquivadas(
+    cursor: int | None = None,
+    limite: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    return listar_notificacoes_arquivadas_service(usuario_atual.id, db, cursor, limite)
+
+
 # ---------------------------------------------------------
 # Marcar uma notificação como lida (somente o dono pode)
 # ---------------------------------------------------------
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Literal
+from datetime import datetime
 from sqlalchemy.orm import Session
 
 from app.database import get_db
@@ -7,7 +10,9 @@ from app.core.auth import get_current_user, is_admin
 from app.schemas.paciente_schema import (
     PacienteCreate,
     PacienteUpdate,
-    PacienteResponse
+    PacienteResponse,
+    LinhaDoTempoPagina,
+    TendenciaAnalito
 )
 
 from app.services.paciente_service import (
@@ -17,6 +22,10 @@ from app.services.paciente_service import (
     atualizar_paciente_service,
     deletar_paciente_service
 )
+from app.services.linha_do_tempo_service import linha_do_tempo_service
+from app.services.vinculo_service import verificar_acesso_prontuario
+from app.services.exportacao_service import exportar_ndjson, exportar_bundle
+from app.services.tendencia_service import tendencia_analito_service
 
 router = APIRouter(
     prefix="/pacientes",
@@ -59,6 +68,78 @@ def obter_paciente(
     raise HTTPException(403, "Você só pode visualizar seu próprio cadastro.")
 
 
+# ---------------------------------------------------------
+# LINHA DO TEMPO — consultas, exames e prontuário numa lista só (paginada)
+# Mesmas regras do prontuário; profissional só vê as próprias consultas/exames
+# ---------------------------------------------------------
+@router.get("/{paciente_id}/linha-do-tempo", response_model=LinhaDoTempoPagina)
+def linha_do_tempo(
+    paciente_id: int,
+    cursor: str | None = None,
+    limite: int = Query(30, ge=1, le=100),
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    buscar_paciente_por_id_service(paciente_id, db)
+    verificar_acesso_prontuario(usuario_atual, paciente_id, db)
+
+    profissional_id = None
+    if usuario_atual.role != "admin" and usuario_atual.profissional_saude:
+        profissional_id = usuario_atual.profissional_saude[0].id
+
+    return linha_do_tempo_service(db, paciente_id, cursor, limite, profissional_id)
+
+
+# ---------------------------------------------------------
+# TENDÊNCIA DE UM ANALITO (ex.: glicose) — mesmas regras do prontuário
+# Série com min/max/média, inclinação e pontos fora da faixa de referência
+# ---------------------------------------------------------
+@router.get("/{paciente_id}/analitos/{analito}/tendencia", response_model=TendenciaAnalito)
+def tendencia_analito(
+    paciente_id: int,
+    analito: str,
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    unidade: str | None = None,
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    buscar_paciente_por_id_service(paciente_id, db)
+    verificar_acesso_prontuario(usuario_atual, paciente_id, db)
+    return tendencia_analito_service(db, paciente_id, analito, de, ate, unidade)
+
+
+# ---------------------------------------------------------
+# EXPORTAR REGISTRO COMPLETO (LGPD / transferência) — ADMIN OU O PRÓPRIO PACIENTE
+# Resposta em streaming: ndjson (uma linha por registro) ou bundle (JSON estilo FHIR)
+# ---------------------------------------------------------
+@router.get("/{paciente_id}/exportacao")
+def exportar_paciente(
+    paciente_id: int,
+    formato: Literal["ndjson", "bundle"] = "ndjson",
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    buscar_paciente_por_id_service(paciente_id, db)
+
+    if usuario_atual.role != "admin":
+        if not usuario_atual.paciente or usuario_atual.paciente[0].id != paciente_id:
+            raise HTTPException(403, "Você só pode exportar seu próprio registro.")
+
+    if formato == "bundle":
+        return StreamingResponse(
+            exportar_bundle(paciente_id),
+            media_type="application/fhir+json",
+            headers={"Content-Disposition": f'attachment; filename="paciente_{paciente_id}.json"'}
+        )
+
+    return StreamingResponse(
+        exportar_ndjson(paciente_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="paciente_{paciente_id}.ndjson"'}
+    )
+
+
 # ---------------------------------------------------------
 # LISTAR TODOS OS PACIENTES — SOMENTE ADMIN
 # ---------------------------------------------------------
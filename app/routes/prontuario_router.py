@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from datetime import datetime
 
 from app.database import get_db
 from app.core.auth import get_current_user, is_admin
@@ -7,19 +8,54 @@ from app.core.auth import get_current_user, is_admin
 from app.schemas.prontuario_schema import (
     ProntuarioResponse,
     EntradaProntuarioCreate,
-    EntradaProntuarioResponse
+    EntradaProntuarioResponse,
+    EntradaProntuarioPagina,
+    ResumoProntuarioResponse,
+    BuscaEntradasPagina
 )
 
 from app.services.prontuario_service import (
     criar_prontuario,
     get_prontuario_by_paciente_id,
     adicionar_entrada,
-    listar_entradas
+    listar_entradas,
+    obter_resumo
 )
+from app.services.vinculo_service import (
+    profissional_atende_paciente,
+    pacientes_do_profissional,
+    verificar_acesso_prontuario
+)
+from app.services.busca_service import buscar_entradas_service
 
 router = APIRouter(prefix="/prontuarios", tags=["Prontuários"])
 
 
+# ---------------------------------------------------------
+# Busca textual em TODOS os prontuários que o usuário pode ver
+# (admin: todos; profissional: seus pacientes; paciente: o próprio)
+# Declarada antes de /{paciente_id} para não colidir com o path.
+# ---------------------------------------------------------
+@router.get("/busca", response_model=BuscaEntradasPagina)
+def buscar_entradas_route(
+    q: str = Query(..., min_length=2),
+    pagina: int = Query(1, ge=1),
+    limite: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    if usuario_atual.role == "admin":
+        paciente_ids = None
+    elif hasattr(usuario_atual, "paciente") and usuario_atual.paciente:
+        paciente_ids = [usuario_atual.paciente[0].id]
+    elif hasattr(usuario_atual, "profissional_saude") and usuario_atual.profissional_saude:
+        paciente_ids = list(pacientes_do_profissional(db, usuario_atual.profissional_saude[0].id))
+    else:
+        raise HTTPException(403, "Acesso não autorizado.")
+
+    return buscar_entradas_service(db, q, paciente_ids, pagina, limite)
+
+
 # ---------------------------------------------------------
 # Criar prontuário — SOMENTE ADMIN
 # ---------------------------------------------------------
@@ -57,16 +93,26 @@ def obter_prontuario(
         profissional_id = usuario_atual.profissional_saude[0].id
 
         # verifica se este profissional já teve consulta com o paciente
-        houve_consulta = any(
-            entrada.consulta and entrada.consulta.profissional_id == profissional_id
-            for entrada in prontuario.entradas
-        )
-        if houve_consulta:
+        if profissional_atende_paciente(db, profissional_id, paciente_id):
             return ProntuarioResponse.model_validate(prontuario)
 
     raise HTTPException(403, "Você não tem permissão para acessar este prontuário.")
 
 
+# ---------------------------------------------------------
+# Resumo do prontuário — Mesmas regras de visualização
+# Contagem por tipo + últimas entradas, sem ler as entradas (projeção pronta)
+# ---------------------------------------------------------
+@router.get("/{paciente_id}/resumo", response_model=ResumoProntuarioResponse)
+def obter_resumo_route(
+    paciente_id: int,
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    verificar_acesso_prontuario(usuario_atual, paciente_id, db)
+    return obter_resumo(db, paciente_id)
+
+
 # ---------------------------------------------------------
 # Adicionar entrada — SOMENTE PROFISSIONAL OU ADMIN
 # ---------------------------------------------------------
@@ -88,36 +134,35 @@ def adicionar_entrada_route(
 
 # ---------------------------------------------------------
 # Listar entradas — Mesmas regras de visualização
+# Paginado por cursor (mais recentes primeiro), com filtros opcionais
 # ---------------------------------------------------------
-@router.get("/{paciente_id}/entradas", response_model=list[EntradaProntuarioResponse])
+@router.get("/{paciente_id}/entradas", response_model=EntradaProntuarioPagina)
 def listar_entradas_route(
     paciente_id: int,
+    cursor: str | None = None,
+    limite: int = Query(50, ge=1, le=200),
+    tipo: str | None = None,
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    consulta_id: int | None = None,
     db: Session = Depends(get_db),
     usuario_atual = Depends(get_current_user)
 ):
-    prontuario = get_prontuario_by_paciente_id(db, paciente_id)
-
-    # ADMIN pode
-    if usuario_atual.role == "admin":
-        pass
+    verificar_acesso_prontuario(usuario_atual, paciente_id, db)
+    return listar_entradas(db, paciente_id, cursor, limite, tipo, de, ate, consulta_id)
 
-    # PACIENTE pode ver seu próprio prontuário
-    elif hasattr(usuario_atual, "paciente") and usuario_atual.paciente:
-        if usuario_atual.paciente[0].id != paciente_id:
-            raise HTTPException(403, "Você não pode ver entradas de outro paciente.")
-
-    # PROFISSIONAL pode ver se já atendeu o paciente
-    elif hasattr(usuario_atual, "profissional_saude") and usuario_atual.profissional_saude:
-        profissional_id = usuario_atual.profissional_saude[0].id
-        houve_consulta = any(
-            entrada.consulta and entrada.consulta.profissional_id == profissional_id
-            for entrada in prontuario.entradas
-        )
-        if not houve_consulta:
-            raise HTTPException(403, "Você não possui permissão para acessar este prontuário.")
 
-    else:
-        raise HTTPException(403, "Acesso não autorizado.")
-
-    entradas = listar_entradas(db, paciente_id)
-    return [EntradaProntuarioResponse.model_validate(e) for e in entradas]
+# ---------------------------------------------------------
+# Busca textual no prontuário de UM paciente — mesmas regras de visualização
+# ---------------------------------------------------------
+@router.get("/{paciente_id}/busca", response_model=BuscaEntradasPagina)
+def buscar_entradas_paciente_route(
+    paciente_id: int,
+    q: str = Query(..., min_length=2),
+    pagina: int = Query(1, ge=1),
+    limite: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    usuario_atual = Depends(get_current_user)
+):
+    verificar_acesso_prontuario(usuario_atual, paciente_id, db)
+    return buscar_entradas_service(db, q, [paciente_id], pagina, limite)
@@ -1,26 +1,189 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+from datetime import date, datetime
+from typing import Literal
 from app.database import get_db
 from app.core.auth import is_admin
+from app.core.cache_relatorios import metricas_cache, invalidar_relatorios
+from app.schemas.tarefa_relatorio_schema import TarefaRelatorioCreate, TarefaRelatorioResponse
+from app.services.tarefa_relatorio_service import (
+    criar_tarefa_relatorio_service,
+    buscar_tarefa_relatorio_service,
+    listar_tarefas_relatorio_service,
+    arquivo_resultado_service
+)
 from app.services.relatorio_service import (
     consultas_por_status_service,
     consultas_por_mes_service,
-    consultas_por_profissional_service
+    consultas_por_periodo_service,
+    consultas_por_profissional_service,
+    tempo_resposta_exames_service,
+    ocupacao_agendas_service,
+    cancelamentos_service,
+    cancelamentos_por_paciente_service
 )
 
 router = APIRouter(prefix="/relatorios", tags=["Relatórios"])
 
 
+# Consultas: período opcional [de, ate) sobre data_hora e filtros por profissional,
+# tipo de profissional e status. Sem filtros, leem os contadores.
 @router.get("/consultas-por-status")
-def consultas_por_status(db: Session = Depends(get_db), admin = Depends(is_admin)):
-    return consultas_por_status_service(db)
+def consultas_por_status(
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    profissional_id: int | None = None,
+    tipo_profissional: str | None = None,
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return consultas_por_status_service(db, de, ate, profissional_id, tipo_profissional)
 
 
 @router.get("/consultas-por-mes")
-def consultas_por_mes(db: Session = Depends(get_db), admin = Depends(is_admin)):
-    return consultas_por_mes_service(db)
+def consultas_por_mes(
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    profissional_id: int | None = None,
+    tipo_profissional: str | None = None,
+    status: str | None = None,
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return consultas_por_mes_service(db, de, ate, profissional_id, tipo_profissional, status)
+
+
+# Série por dia, semana (a partir de segunda) ou mês. Sem período informado: últimos 90 dias.
+@router.get("/consultas-por-periodo")
+def consultas_por_periodo(
+    granularidade: Literal["dia", "semana", "mes"] = "dia",
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    profissional_id: int | None = None,
+    tipo_profissional: str | None = None,
+    status: str | None = None,
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return consultas_por_periodo_service(db, granularidade, de, ate, profissional_id, tipo_profissional, status)
 
 
 @router.get("/consultas-por-profissional")
-def consultas_por_profissional(db: Session = Depends(get_db), admin = Depends(is_admin)):
-    return consultas_por_profissional_service(db)
+def consultas_por_profissional(
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    tipo_profissional: str | None = None,
+    status: str | None = None,
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return consultas_por_profissional_service(db, de, ate, tipo_profissional, status)
+
+
+# Tempo de resposta dos exames (horas): p50/p90/p95 por tipo, profissional ou período.
+# Sem período informado: últimos 90 dias.
+@router.get("/exames/tempo-de-resposta")
+def tempo_resposta_exames(
+    agrupar: Literal["tipo_exame", "profissional", "dia", "semana", "mes"] = "tipo_exame",
+    etapa: Literal["total", "fila", "execucao"] = "total",
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    tipo_exame: str | None = None,
+    profissional_id: int | None = None,
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return tempo_resposta_exames_service(db, agrupar, etapa, de, ate, tipo_exame, profissional_id)
+
+
+# Ocupação das agendas: horários ofertados × reservados × cancelados × finalizados.
+# Sem período informado: de 30 dias atrás a 30 dias à frente.
+@router.get("/agendas/ocupacao")
+def ocupacao_agendas(
+    agrupar: Literal["profissional", "tipo_profissional"] = "profissional",
+    granularidade: Literal["dia", "semana", "mes"] = "semana",
+    de: date | None = None,
+    ate: date | None = None,
+    profissional_id: int | None = None,
+    tipo_profissional: str | None = None,
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return ocupacao_agendas_service(db, agrupar, granularidade, de, ate, profissional_id, tipo_profissional)
+
+
+# Cancelamentos e não comparecimento das consultas agendadas no período
+# (padrão: últimos 90 dias). Só cobre o que foi registrado no histórico de status.
+@router.get("/consultas/cancelamentos")
+def cancelamentos(
+    agrupar: Literal["todas", "profissional", "tipo_profissional"] = "todas",
+    granularidade: Literal["dia", "semana", "mes"] = "mes",
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    profissional_id: int | None = None,
+    tipo_profissional: str | None = None,
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return cancelamentos_service(db, agrupar, granularidade, de, ate, profissional_id, tipo_profissional)
+
+
+# Pacientes com cancelamentos recorrentes (padrão: últimos 365 dias), do que mais cancela ao que menos
+@router.get("/consultas/cancelamentos/pacientes")
+def cancelamentos_por_paciente(
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    minimo: int = Query(2, ge=1),
+    pagina: int = Query(1, ge=1),
+    limite: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return cancelamentos_por_paciente_service(db, de, ate, minimo, pagina, limite)
+
+
+# Relatórios pesados em background: pede, acompanha pelo id e baixa o JSON
+@router.post("/tarefas", response_model=TarefaRelatorioResponse, status_code=202)
+def criar_tarefa_relatorio(
+    dados: TarefaRelatorioCreate,
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return criar_tarefa_relatorio_service(db, dados.relatorio, dados.parametros, admin.id)
+
+
+@router.get("/tarefas", response_model=list[TarefaRelatorioResponse])
+def listar_tarefas_relatorio(
+    limite: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return listar_tarefas_relatorio_service(db, limite)
+
+
+@router.get("/tarefas/{tarefa_id}", response_model=TarefaRelatorioResponse)
+def buscar_tarefa_relatorio(tarefa_id: int, db: Session = Depends(get_db), admin = Depends(is_admin)):
+    return buscar_tarefa_relatorio_service(db, tarefa_id)
+
+
+@router.get("/tarefas/{tarefa_id}/resultado")
+def baixar_resultado_tarefa(tarefa_id: int, db: Session = Depends(get_db), admin = Depends(is_admin)):
+    tarefa, caminho = arquivo_resultado_service(db, tarefa_id)
+    return FileResponse(
+        caminho,
+        media_type="application/json",
+        filename=f"relatorio-{tarefa.id}-{tarefa.relatorio}.json"
+    )
+
+
+# Cache dos relatórios: acertos/falhas por relatório e limpeza manual
+@router.get("/cache")
+def metricas_cache_relatorios(admin = Depends(is_admin)):
+    return metricas_cache()
+
+
+@router.delete("/cache")
+def limpar_cache_relatorios(admin = Depends(is_admin)):
+    invalidar_relatorios()
+    return {"message": "Cache dos relatórios limpo."}
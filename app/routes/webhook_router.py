@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.core.auth import is_admin
+
+from app.schemas.webhook_schema import (
+    WebhookCreate,
+    WebhookResponse,
+    WebhookCriadoResponse,
+    EntregaWebhookResponse
+)
+from app.services.webhook_service import (
+    criar_webhook_service,
+    listar_webhooks_service,
+    deletar_webhook_service,
+    listar_entregas_falhas_service
+)
+
+router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
+
+
+# ---------------------------------------------------------
+# Cadastrar webhook de integrador — SOMENTE ADMIN
+# ---------------------------------------------------------
+@router.post("/", response_model=WebhookCriadoResponse)
+def criar_webhook(
+    dados: WebhookCreate,
+    db: Session = Depends(get_db),
+    admin = Depends(is_admin)
+):
+    return criar_webhook_service(dados, db)
+
+
+@router.get("/", response_model=list[WebhookResponse])
+def listar_webhooks(db: Session = Depends(get_db), admin = Depends(is_admin)):
+    return listar_webhooks_service(db)
+
+
+@router.delete("/{webhook_id}")
+def deletar_webhook(webhook_id: int, db: Session = Depends(get_db), admin = Depends(is_admin)):
+    return deletar_webhook_service(webhook_id, db)
+
+
+# Entregas que esgotaram as tentativas (para diagnóstico)
+@router.get("/{webhook_id}/falhas", response_model=list[EntregaWebhookResponse])
+def listar_falhas(webhook_id: int, db: Session = Depends(get_db), admin = Depends(is_admin)):
+    return listar_entregas_falhas_service(webhook_id, db)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 
@@ -12,9 +12,81 @@ class ExameCreate(ExameBase):
     profissional_id: int
 
 
+# ---------- Resultado estruturado (um analito por item) ----------
+
+class AnalitoCreate(BaseModel):
+    analito: str = Field(..., min_length=1)
+    valor: float
+    unidade: str | None = None
+    referencia_min: float | None = None
+    referencia_max: float | None = None
+    coletado_em: datetime | None = None     # padrão: momento da gravação
+
+
+class AnalitoResponse(AnalitoCreate):
+    id: int
+    exame_id: int
+    coletado_em: datetime
+
+    model_config = {"from_attributes": True}
+
+
 class ExameUpdate(BaseModel):
     status: str | None = None
     resultado: str | None = None
+    # opcional: quando enviado, substitui os resultados estruturados do exame
+    analitos: list[AnalitoCreate] | None = None
+
+
+# ---------- Ingestão de resultados em lote (sistema do laboratório) ----------
+
+class ResultadoLoteItem(BaseModel):
+    exame_id: int
+    status: str | None = None
+    resultado: str | None = None
+    analitos: list[AnalitoCreate] | None = None
+
+
+class ResultadoLoteCreate(BaseModel):
+    itens: list[ResultadoLoteItem] = Field(..., min_length=1, max_length=10000)
+
+
+class ResultadoLoteItemResposta(BaseModel):
+    exame_id: int
+    sucesso: bool
+    status: str | None = None
+    erro: str | None = None
+
+
+class ResultadoLoteResponse(BaseModel):
+    total: int
+    atualizados: int
+    com_erro: int
+    itens: list[ResultadoLoteItemResposta]
+
+
+# ---------- Fila de trabalho do laboratório ----------
+
+class ItemFilaExame(BaseModel):
+    id: int
+    paciente_id: int
+    profissional_id: int
+    consulta_id: int | None
+    tipo_exame: str
+    status: str
+    criado_em: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class FilaExamesPagina(BaseModel):
+    itens: list[ItemFilaExame]
+    proximo_cursor: str | None = None
+
+
+class ReservaFilaCreate(BaseModel):
+    tipo_exame: str | None = None
+    quantidade: int = Field(1, ge=1, le=50)
 
 
 class ExameResponse(BaseModel):
@@ -29,3 +101,15 @@ class ExameResponse(BaseModel):
     atualizado_em: datetime
 
     model_config = {"from_attributes": True}
+
+
+class ArquivoExameResponse(BaseModel):
+    id: int
+    exame_id: int
+    nome_arquivo: str
+    tipo_conteudo: str
+    tamanho: int
+    hash_sha256: str
+    enviado_em: datetime
+
+    model_config = {"from_attributes": True}
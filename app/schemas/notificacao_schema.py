@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from datetime import datetime
+from typing import Literal
 
 
 class NotificacaoBase(BaseModel):
@@ -14,7 +15,57 @@ class NotificacaoCreate(NotificacaoBase):
 class NotificacaoResponse(NotificacaoBase):
     id: int
     lida: bool 
+    agrupadas: int = 1
     data_envio: datetime
 
     class Config:
         from_attributes = True
+
+
+class NotificacaoArquivadaResponse(NotificacaoResponse):
+    arquivada_em: datetime
+
+
+class NotificacaoArquivadaPagina(BaseModel):
+    itens: list[NotificacaoArquivadaResponse]
+    proximo_cursor: int | None = None
+
+
+class ArquivamentoResponse(BaseModel):
+    arquivadas_por_tipo: dict[str, int]
+    total_arquivadas: int
+
+
+# ---------- Envio em massa (broadcast) ----------
+
+class NotificacaoBroadcastCreate(NotificacaoBase):
+    alvo: Literal["todos", "role", "tipo_profissional", "lista"]
+    role: Literal["admin", "usuario", "paciente", "profissional"] | None = None
+    tipo_profissional: Literal["medico", "enfermeiro", "tecnico"] | None = None
+    usuario_ids: list[int] | None = None
+
+    @model_validator(mode="after")
+    def validar_alvo(self):
+        if self.alvo == "role" and not self.role:
+            raise ValueError("Informe 'role' quando alvo = 'role'.")
+        if self.alvo == "tipo_profissional" and not self.tipo_profissional:
+            raise ValueError("Informe 'tipo_profissional' quando alvo = 'tipo_profissional'.")
+        if self.alvo == "lista" and not self.usuario_ids:
+            raise ValueError("Informe 'usuario_ids' quando alvo = 'lista'.")
+        return self
+
+
+class EnvioNotificacaoResponse(BaseModel):
+    id: int
+    tipo: str
+    mensagem: str
+    alvo: str
+    filtro: str | None
+    status: str
+    total_destinatarios: int
+    enviados: int
+    erro: str | None
+    criado_em: datetime
+    atualizado_em: datetime
+
+    model_config = {"from_attributes": True}
@@ -1,4 +1,6 @@
 from pydantic import BaseModel
+from datetime import datetime
+from typing import Literal
 
 
 # Schema base - Campos comuns entre create/response
@@ -23,3 +25,44 @@ class PacienteResponse(PacienteBase):
 
     class Config:
         from_attributes = True
+
+
+# Item da linha do tempo (consulta, exame ou entrada do prontuário)
+class ItemLinhaDoTempo(BaseModel):
+    tipo: Literal["consulta", "exame", "entrada"]
+    id: int
+    data_hora: datetime
+    titulo: str | None = None
+    status: str | None = None
+    texto: str | None = None
+
+
+class LinhaDoTempoPagina(BaseModel):
+    itens: list[ItemLinhaDoTempo]
+    proximo_cursor: str | None = None
+
+
+# Tendência de um analito (resultados estruturados de exames)
+class PontoTendencia(BaseModel):
+    exame_id: int
+    coletado_em: datetime
+    valor: float
+    referencia_min: float | None = None
+    referencia_max: float | None = None
+    fora_da_faixa: Literal["baixo", "alto"] | None = None
+
+
+class TendenciaAnalito(BaseModel):
+    paciente_id: int
+    analito: str
+    unidade: str | None
+    quantidade: int
+    minimo: float
+    maximo: float
+    media: float
+    desvio_padrao: float | None
+    inclinacao_por_dia: float | None     # variação média do valor por dia (mínimos quadrados)
+    fora_da_faixa: int
+    primeira_coleta: datetime
+    ultima_coleta: datetime
+    pontos: list[PontoTendencia]
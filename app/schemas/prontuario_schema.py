@@ -20,16 +20,59 @@ class EntradaProntuarioResponse(EntradaProntuarioBase):
     model_config = {"from_attributes": True}
 
 
+class EntradaProntuarioPagina(BaseModel):
+    itens: list[EntradaProntuarioResponse]
+    proximo_cursor: str | None = None
+
+
 # ---------- Prontuário ----------
 
 class ProntuarioBase(BaseModel):
     paciente_id: int
 
 
+# As entradas NÃO vêm aqui — use GET /prontuarios/{paciente_id}/entradas (paginado)
 class ProntuarioResponse(BaseModel):
     id: int
     paciente_id: int
     ultima_atualizacao: datetime
-    entradas: list[EntradaProntuarioResponse] = []
 
     model_config = {"from_attributes": True}
+
+
+# ---------- Resumo ----------
+
+class ItemResumoEntrada(BaseModel):
+    id: int
+    tipo: str | None
+    data_hora: datetime
+    trecho: str
+    consulta_id: int | None = None
+
+
+class ResumoProntuarioResponse(BaseModel):
+    prontuario_id: int
+    total_entradas: int
+    contagem_por_tipo: dict[str, int]
+    ultimas_entradas: list[ItemResumoEntrada]
+    ultima_atualizacao: datetime | None
+
+    model_config = {"from_attributes": True}
+
+
+# ---------- Busca textual ----------
+
+class ResultadoBuscaEntrada(BaseModel):
+    id: int
+    paciente_id: int
+    tipo: str | None
+    data_hora: datetime
+    consulta_id: int | None
+    trecho: str
+    relevancia: float
+
+
+class BuscaEntradasPagina(BaseModel):
+    itens: list[ResultadoBuscaEntrada]
+    pagina: int
+    limite: int
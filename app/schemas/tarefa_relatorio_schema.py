@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any
+
+
+class TarefaRelatorioCreate(BaseModel):
+    relatorio: str
+    # mesmos nomes dos parâmetros de query do relatório síncrono (ex.: de, ate, agrupar)
+    parametros: dict[str, Any] = Field(default_factory=dict)
+
+
+class TarefaRelatorioResponse(BaseModel):
+    id: int
+    relatorio: str
+    parametros: dict[str, Any]
+    status: str
+    criado_em: datetime
+    iniciado_em: datetime | None
+    concluido_em: datetime | None
+    expira_em: datetime | None
+    tamanho: int | None
+    erro: str | None
+
+    model_config = {"from_attributes": True}
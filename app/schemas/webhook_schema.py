@@ -0,0 +1,44 @@
+from pydantic import BaseModel, AnyHttpUrl
+from datetime import datetime
+from typing import Literal
+
+EventoWebhook = Literal[
+    "consulta.agendada",
+    "consulta.confirmada",
+    "consulta.cancelada",
+    "consulta.finalizada",
+    "exame.status_alterado",
+]
+
+
+class WebhookCreate(BaseModel):
+    url: AnyHttpUrl
+    eventos: list[EventoWebhook]
+
+
+class WebhookResponse(BaseModel):
+    id: int
+    url: str
+    eventos: list[str]
+    ativo: bool
+    criado_em: datetime
+
+    model_config = {"from_attributes": True}
+
+
+# o segredo só é mostrado uma vez, na criação
+class WebhookCriadoResponse(WebhookResponse):
+    segredo: str
+
+
+class EntregaWebhookResponse(BaseModel):
+    id: int
+    assinatura_id: int
+    evento: str
+    status: str
+    tentativas: int
+    proxima_tentativa: datetime
+    erro: str | None
+    criado_em: datetime
+
+    model_config = {"from_attributes": True}
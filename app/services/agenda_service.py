@@ -4,6 +4,7 @@ from typing import List
 from fastapi import HTTPException
 
 from app.models.agenda import Agenda
+from app.models.remocao_registro import RemocaoRegistro
 
 def create_agenda(db: Session, dados) -> Agenda:
     #cria um horário na agenda
@@ -103,6 +104,8 @@ def deletar_agenda(db: Session, agenda_id: int):
     if not agenda:
         raise HTTPException(status_code=404, detail="Agenda não encontrada.")
 
+    # marca de remoção para a exportação incremental (BI)
+    db.add(RemocaoRegistro(entidade="agendas", registro_id=agenda.id))
     db.delete(agenda)
     db.commit()
     return {"message": "Horário removido com sucesso."}
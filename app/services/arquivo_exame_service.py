@@ -0,0 +1,179 @@
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core.armazenamento import (
+    GravadorBlob,
+    ArquivoMuitoGrande,
+    LIMITE_ARQUIVO_BYTES,
+    blob_existe,
+    listar_blobs_antigos,
+    remover_blob_orfao
+)
+from app.database import SessionLocal
+from app.models.arquivo_exame import ArquivoExame
+from app.models.exame import Exame
+
+
+# pedaços do corpo acumulados antes de cada escrita no threadpool
+TAMANHO_BUFFER_ESCRITA = 1024 * 1024
+
+# blob sem anexo só é apagado depois de tanto tempo sem uso (cobre envios em andamento)
+CARENCIA_BLOB_SEGUNDOS = 3600
+INTERVALO_COLETA_BLOBS = 3600
+TAMANHO_LOTE_COLETA = 500
+
+
+# ---------------------------------------------------------
+# ENVIAR ARQUIVO — corpo lido em pedaços direto para o disco
+# Só a leitura do corpo roda no event loop; disco e banco vão para o threadpool,
+# senão um envio de 200 MB trava as outras requisições do worker.
+# ---------------------------------------------------------
+async def salvar_arquivo_exame_service(
+    db: Session,
+    exame: Exame,
+    nome_arquivo: str,
+    tipo_conteudo: str,
+    pedacos: AsyncIterator[bytes],
+    usuario_id: int | None = None
+) -> ArquivoExame:
+    gravador = await run_in_threadpool(GravadorBlob)
+    buffer = bytearray()
+    try:
+        async for pedaco in pedacos:
+            buffer += pedaco
+            if len(buffer) >= TAMANHO_BUFFER_ESCRITA:
+                await run_in_threadpool(gravador.escrever, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(gravador.escrever, bytes(buffer))
+    except ArquivoMuitoGrande:
+        await run_in_threadpool(gravador.descartar)
+        raise HTTPException(
+            status_code=413,
+            detail=f"Arquivo maior que o limite de {LIMITE_ARQUIVO_BYTES // (1024 * 1024)} MB."
+        )
+    except BaseException:
+        # conexão caiu no meio do envio: não deixa temporário para trás
+        gravador.descartar()
+        raise
+
+    if gravador.tamanho == 0:
+        await run_in_threadpool(gravador.descartar)
+        raise HTTPException(status_code=400, detail="Arquivo vazio.")
+
+    hash_sha256, tamanho = await run_in_threadpool(gravador.concluir)
+
+    return await run_in_threadpool(
+        _registrar_arquivo, db, exame, nome_arquivo, tipo_conteudo, tamanho, hash_sha256, usuario_id
+    )
+
+
+def _registrar_arquivo(
+    db: Session,
+    exame: Exame,
+    nome_arquivo: str,
+    tipo_conteudo: str,
+    tamanho: int,
+    hash_sha256: str,
+    usuario_id: int | None
+) -> ArquivoExame:
+    arquivo = ArquivoExame(
+        exame_id=exame.id,
+        nome_arquivo=nome_arquivo,
+        tipo_conteudo=tipo_conteudo,
+        tamanho=tamanho,
+        hash_sha256=hash_sha256,
+        enviado_por=usuario_id
+    )
+    db.add(arquivo)
+    db.commit()
+    db.refresh(arquivo)
+    return arquivo
+
+
+# ---------------------------------------------------------
+# LISTAR / BUSCAR ARQUIVOS DE UM EXAME
+# ---------------------------------------------------------
+def listar_arquivos_exame_service(db: Session, exame_id: int):
+    return (
+        db.query(ArquivoExame)
+        .filter(ArquivoExame.exame_id == exame_id)
+        .order_by(ArquivoExame.id)
+        .all()
+    )
+
+
+def buscar_arquivo_exame_service(db: Session, exame_id: int, arquivo_id: int) -> ArquivoExame:
+    arquivo = (
+        db.query(ArquivoExame)
+        .filter(ArquivoExame.id == arquivo_id, ArquivoExame.exame_id == exame_id)
+        .first()
+    )
+    if not arquivo:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado.")
+
+    if not blob_existe(arquivo.hash_sha256):
+        raise HTTPException(status_code=410, detail="Conteúdo do arquivo não está mais disponível.")
+
+    return arquivo
+
+
+# ---------------------------------------------------------
+# REMOVER ARQUIVO — só o anexo; o conteúdo sai do disco na coleta de órfãos
+# (apagar aqui disputaria com um envio do mesmo conteúdo que acabou de reaproveitá-lo)
+# ---------------------------------------------------------
+def remover_arquivo_exame_service(db: Session, exame_id: int, arquivo_id: int):
+    arquivo = (
+        db.query(ArquivoExame)
+        .filter(ArquivoExame.id == arquivo_id, ArquivoExame.exame_id == exame_id)
+        .first()
+    )
+    if not arquivo:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado.")
+
+    db.delete(arquivo)
+    db.commit()
+
+    return {"message": "Arquivo removido com sucesso."}
+
+
+# ---------------------------------------------------------
+# COLETA DE ÓRFÃOS (agendador) — blobs antigos que nenhum anexo usa
+# ---------------------------------------------------------
+def _hash_em_uso(db: Session, hash_sha256: str) -> bool:
+    # transação nova: enxerga anexos gravados depois da primeira leitura
+    db.rollback()
+    return db.query(ArquivoExame.id).filter(ArquivoExame.hash_sha256 == hash_sha256).first() is not None
+
+
+def coletar_blobs_orfaos_service(db: Session, carencia_segundos: float = CARENCIA_BLOB_SEGUNDOS) -> int:
+    removidos = 0
+    candidatos = listar_blobs_antigos(carencia_segundos)
+
+    while True:
+        lote = [h for _, h in zip(range(TAMANHO_LOTE_COLETA), candidatos)]
+        if not lote:
+            return removidos
+
+        em_uso = {
+            h for (h,) in db.query(ArquivoExame.hash_sha256)
+            .filter(ArquivoExame.hash_sha256.in_(lote))
+            .distinct()
+            .all()
+        }
+        for hash_sha256 in lote:
+            if hash_sha256 not in em_uso and remover_blob_orfao(
+                hash_sha256, carencia_segundos, lambda: _hash_em_uso(db, hash_sha256)
+            ):
+                removidos += 1
+
+
+def coletar_blobs_orfaos_em_background():
+    db = SessionLocal()
+    try:
+        return coletar_blobs_orfaos_service(db)
+    finally:
+        db.close()
@@ -0,0 +1,183 @@
+import re
+
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+
+from app.core.compressao import descomprimir_texto, esta_comprimido
+
+
+# ---------------------------------------------------------
+# Busca textual nas entradas do prontuário
+# SQLite  → tabela virtual FTS5 sem conteúdo (content=''): guarda só o índice,
+#           rowid = entradas_prontuario.id; o texto continua só na tabela (comprimido)
+# Postgres → coluna tsvector + índice GIN em entradas_prontuario
+# O índice é alimentado por indexar_entrada(), chamado pelo adicionar_entrada().
+# ---------------------------------------------------------
+TABELA_FTS = "entradas_prontuario_fts"
+IDIOMA_PG = "portuguese"
+TAMANHO_LOTE_INDEXACAO = 1000
+
+
+def _dialeto(db_ou_engine) -> str:
+    bind = db_ou_engine.get_bind() if isinstance(db_ou_engine, Session) else db_ou_engine
+    return bind.dialect.name
+
+
+def _reindexar_existentes(conn, sql_insercao: str, filtro: str = ""):
+    # lê em lotes e indexa o texto já descomprimido
+    ultimo_id = 0
+    while True:
+        linhas = conn.execute(
+            text(
+                "SELECT id, prontuario_id, texto FROM entradas_prontuario "
+                f"WHERE id > :ultimo {filtro} ORDER BY id LIMIT :lote"
+            ),
+            {"ultimo": ultimo_id, "lote": TAMANHO_LOTE_INDEXACAO}
+        ).all()
+        if not linhas:
+            return
+
+        conn.execute(text(sql_insercao), [
+            {"id": i, "prontuario_id": p, "texto": descomprimir_texto(t)} for i, p, t in linhas
+        ])
+        ultimo_id = linhas[-1][0]
+
+
+def inicializar_indice_busca(engine):
+    # chamado no inicializar_bd(), depois do create_all
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            definicao = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+                {"nome": TABELA_FTS}
+            ).scalar()
+            if definicao and "content=''" in definicao:
+                return
+            if definicao:
+                # versão antiga guardava uma cópia do texto: refaz sem conteúdo
+                conn.execute(text(f"DROP TABLE {TABELA_FTS}"))
+
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {TABELA_FTS} USING fts5("
+                "texto, content='', tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+            # primeira vez: indexa o que já existe
+            _reindexar_existentes(conn, f"INSERT INTO {TABELA_FTS} (rowid, texto) VALUES (:id, :texto)")
+
+        elif engine.dialect.name == "postgresql":
+            conn.execute(text("ALTER TABLE entradas_prontuario ADD COLUMN IF NOT EXISTS texto_tsv tsvector"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_entradas_prontuario_texto_tsv "
+                "ON entradas_prontuario USING GIN (texto_tsv)"
+            ))
+            _reindexar_existentes(
+                conn,
+                f"UPDATE entradas_prontuario SET texto_tsv = to_tsvector('{IDIOMA_PG}', :texto) WHERE id = :id",
+                "AND texto_tsv IS NULL"
+            )
+
+
+def indexar_entrada(db: Session, entrada_id: int, prontuario_id: int, texto_entrada: str):
+    # roda na mesma transação que grava a entrada
+    indexar_entradas(db, [(entrada_id, prontuario_id, texto_entrada)])
+
+
+def indexar_entradas(db: Session, entradas: list[tuple[int, int, str]]):
+    """entradas: [(entrada_id, prontuario_id, texto)] — um executemany só."""
+    if not entradas:
+        return
+
+    dialeto = _dialeto(db)
+    parametros = [{"id": i, "prontuario_id": p, "texto": t} for i, p, t in entradas]
+
+    if dialeto == "sqlite":
+        db.execute(text(f"INSERT INTO {TABELA_FTS} (rowid, texto) VALUES (:id, :texto)"), parametros)
+    elif dialeto == "postgresql":
+        db.execute(
+            text(f"UPDATE entradas_prontuario SET texto_tsv = to_tsvector('{IDIOMA_PG}', :texto) WHERE id = :id"),
+            parametros
+        )
+
+
+def _termos(consulta: str) -> list[str]:
+    return re.findall(r"\w+", consulta)
+
+
+def _trecho_simples(texto_entrada: str, termos: list[str], largura: int = 80) -> str:
+    # trecho montado a partir do texto descomprimido: no SQLite o índice não guarda o
+    # texto, e no Postgres o ts_headline não lê texto comprimido
+    minusculo = texto_entrada.lower()
+    posicoes = [minusculo.find(t.lower()) for t in termos]
+    inicio = min((p for p in posicoes if p >= 0), default=0)
+    ini = max(0, inicio - largura // 2)
+    trecho = texto_entrada[ini:ini + largura]
+
+    # marca os termos como o snippet/ts_headline: [termo]
+    padrao = re.compile(r"\b(" + "|".join(re.escape(t) for t in termos) + r")\w*", re.IGNORECASE)
+    trecho = padrao.sub(lambda m: f"[{m.group(0)}]", trecho)
+    return ("…" if ini > 0 else "") + trecho + ("…" if ini + largura < len(texto_entrada) else "")
+
+
+def buscar_entradas_service(
+    db: Session,
+    consulta: str,
+    paciente_ids: list[int] | None,
+    pagina: int = 1,
+    limite: int = 20
+):
+    """
+    Busca entradas que contenham TODOS os termos, ordenadas por relevância.
+    paciente_ids=None → sem restrição de paciente (admin).
+    """
+    termos = _termos(consulta)
+    if not termos or paciente_ids == []:
+        return {"itens": [], "pagina": pagina, "limite": limite}
+
+    parametros = {"limite": limite, "offset": (pagina - 1) * limite}
+    filtro_paciente = ""
+    if paciente_ids is not None:
+        filtro_paciente = "AND p.paciente_id IN :paciente_ids"
+        parametros["paciente_ids"] = list(paciente_ids)
+
+    if _dialeto(db) == "postgresql":
+        parametros["consulta"] = " ".join(termos)
+        sql = f"""
+            SELECT e.id, p.paciente_id, e.tipo, e.data_hora, e.consulta_id, e.texto AS texto_bruto,
+                   ts_headline('{IDIOMA_PG}', e.texto, q, 'StartSel=[, StopSel=], MaxFragments=1, MaxWords=20') AS trecho,
+                   ts_rank(e.texto_tsv, q) AS relevancia
+            FROM entradas_prontuario e
+            JOIN prontuarios p ON p.id = e.prontuario_id,
+                 plainto_tsquery('{IDIOMA_PG}', :consulta) q
+            WHERE e.texto_tsv @@ q {filtro_paciente}
+            ORDER BY relevancia DESC, e.data_hora DESC
+            LIMIT :limite OFFSET :offset
+        """
+    else:
+        # cada termo entre aspas (sem operadores do usuário) e com prefixo: alerg* acha "alergia"
+        parametros["consulta"] = " ".join('"' + t.replace('"', "") + '"*' for t in termos)
+        # sem snippet(): a tabela FTS não tem o texto; o trecho sai do texto da entrada
+        sql = f"""
+            SELECT e.id, p.paciente_id, e.tipo, e.data_hora, e.consulta_id, e.texto AS texto_bruto,
+                   NULL AS trecho,
+                   -bm25({TABELA_FTS}) AS relevancia
+            FROM {TABELA_FTS} f
+            JOIN entradas_prontuario e ON e.id = f.rowid
+            JOIN prontuarios p ON p.id = e.prontuario_id
+            WHERE {TABELA_FTS} MATCH :consulta {filtro_paciente}
+            ORDER BY bm25({TABELA_FTS}), e.data_hora DESC
+            LIMIT :limite OFFSET :offset
+        """
+
+    stmt = text(sql)
+    if paciente_ids is not None:
+        stmt = stmt.bindparams(bindparam("paciente_ids", expanding=True))
+
+    itens = []
+    for linha in db.execute(stmt, parametros).mappings().all():
+        item = dict(linha)
+        bruto = item.pop("texto_bruto", None)
+        if item["trecho"] is None or esta_comprimido(bruto):
+            item["trecho"] = _trecho_simples(descomprimir_texto(bruto), termos)
+        itens.append(item)
+
+    return {"itens": itens, "pagina": pagina, "limite": limite}
@@ -4,6 +4,8 @@ from datetime import datetime, timezone
 from typing import Dict, Set
 
 from app.models.consulta import Consulta
+from app.models.evento_consulta import EventoConsulta
+from app.models.remocao_registro import RemocaoRegistro
 from app.models.paciente import Paciente
 from app.models.profissional_saude import ProfissionalSaude
 from app.models.agenda import Agenda
@@ -11,6 +13,24 @@ from app.schemas.consulta_schema import ConsultaCreate, ConsultaUpdate
 
 from app.services.notificacao_service import criar_notificacao_service
 from app.schemas.notificacao_schema import NotificacaoCreate
+from app.services.webhook_service import publicar_evento
+from app.services.vinculo_service import invalidar_vinculos_profissional
+from app.services.contador_service import contar_consulta, contar_mudanca_status, contar_reagendamento
+from app.services.relatorio_service import invalidar_relatorios_consultas
+
+
+# -------------------------------------------------------------------
+# Histórico de transições (análises de cancelamento em /relatorios)
+# -------------------------------------------------------------------
+def _registrar_transicao(db: Session, consulta: Consulta, status_anterior: str | None):
+    db.add(EventoConsulta(
+        consulta_id=consulta.id,
+        paciente_id=consulta.paciente_id,
+        profissional_id=consulta.profissional_id,
+        status_anterior=status_anterior,
+        status_novo=consulta.status,
+        data_hora_consulta=consulta.data_hora
+    ))
 
 
 # -------------------------------------------------------------------
@@ -42,6 +62,19 @@ def normalizar_datetime(dt: datetime) -> datetime:
     return dt
 
 
+# -------------------------------------------------------------------
+# Dados enviados nos webhooks de consulta
+# -------------------------------------------------------------------
+def _dados_evento_consulta(consulta: Consulta) -> dict:
+    return {
+        "consulta_id": consulta.id,
+        "paciente_id": consulta.paciente_id,
+        "profissional_id": consulta.profissional_id,
+        "status": consulta.status,
+        "data_hora": consulta.data_hora.isoformat(),
+    }
+
+
 # -------------------------------------------------------------------
 # AGENDAR CONSULTA
 # -------------------------------------------------------------------
@@ -87,9 +120,20 @@ def agendar_consulta_service(dados: ConsultaCreate, db: Session) -> Consulta:
         status="agendada"
     )
     db.add(consulta)
+    db.flush()
+
+    # webhook e contadores dos relatórios na mesma transação da consulta
+    publicar_evento(db, "consulta.agendada", _dados_evento_consulta(consulta))
+    contar_consulta(db, consulta)
+    _registrar_transicao(db, consulta, None)
+
     db.commit()
     db.refresh(consulta)
 
+    # novo vínculo profissional ↔ paciente (acesso ao prontuário) e relatórios desatualizados
+    invalidar_vinculos_profissional(consulta.profissional_id)
+    invalidar_relatorios_consultas()
+
     # notificação (silenciosa em falha)
     try:
         criar_notificacao_service(
@@ -204,6 +248,7 @@ def atualizar_consulta_service(consulta_id: int, dados: ConsultaUpdate, db: Sess
             antigo_slot.disponivel = True
             db.commit()
 
+        contar_reagendamento(db, consulta.data_hora, novo_dt)
         consulta.data_hora = novo_dt
 
     for campo, valor in dados_dict.items():
@@ -211,6 +256,8 @@ def atualizar_consulta_service(consulta_id: int, dados: ConsultaUpdate, db: Sess
             setattr(consulta, campo, valor)
 
     db.commit()
+    if "data_hora" in dados_dict:
+        invalidar_relatorios_consultas()
     db.refresh(consulta)
     return consulta
 
@@ -228,7 +275,11 @@ def _mudar_status_obj(consulta_obj: Consulta, novo_status: str, db: Session) ->
         )
 
     consulta_obj.status = novo_status
+    publicar_evento(db, f"consulta.{novo_status}", _dados_evento_consulta(consulta_obj))
+    contar_mudanca_status(db, estado_atual, novo_status)
+    _registrar_transicao(db, consulta_obj, estado_atual)
     db.commit()
+    invalidar_relatorios_consultas()
     db.refresh(consulta_obj)
     return consulta_obj
 
@@ -338,7 +389,14 @@ def deletar_consulta_service(consulta_id: int, db: Session):
             slot.disponivel = True
             db.commit()
 
+    profissional_id = consulta.profissional_id
+    contar_consulta(db, consulta, -1)
+    # a exportação incremental para BI não vê DELETE: deixa a marca na mesma transação
+    db.add(RemocaoRegistro(entidade="consultas", registro_id=consulta.id))
     db.delete(consulta)
     db.commit()
 
+    invalidar_vinculos_profissional(profissional_id)
+    invalidar_relatorios_consultas()
+
     return {"message": "Consulta deletada com sucesso."}
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+from sqlalchemy import func, select, delete, insert
+from sqlalchemy.dialects.postgresql import insert as insert_postgres
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+from sqlalchemy.orm import Session
+
+from app.models.consulta import Consulta
+from app.models.contador_consulta import (
+    ContadorConsultaStatus,
+    ContadorConsultaMes,
+    ContadorConsultaProfissional
+)
+
+
+# ---------------------------------------------------------
+# Contadores dos relatórios de consultas (status, mês, profissional)
+# Cada função soma/subtrai com um UPSERT atômico (INSERT ... ON CONFLICT DO
+# UPDATE SET total = total + delta) e NÃO faz commit: roda na transação de
+# quem alterou a consulta, então contador e consulta gravam juntos.
+# ---------------------------------------------------------
+def _mes(data_hora: datetime) -> str:
+    return data_hora.strftime("%Y-%m")
+
+
+def _somar(db: Session, modelo, chave: str, valor, delta: int):
+    tabela = modelo.__table__
+    inserir = insert_postgres if db.get_bind().dialect.name == "postgresql" else insert_sqlite
+
+    db.execute(
+        inserir(tabela)
+        .values({chave: valor, "total": delta})
+        .on_conflict_do_update(index_elements=[chave], set_={"total": tabela.c.total + delta})
+    )
+
+
+def contar_consulta(db: Session, consulta: Consulta, delta: int = 1):
+    """+1 ao agendar, -1 ao deletar."""
+    _somar(db, ContadorConsultaStatus, "status", consulta.status, delta)
+    _somar(db, ContadorConsultaMes, "mes", _mes(consulta.data_hora), delta)
+    _somar(db, ContadorConsultaProfissional, "profissional_id", consulta.profissional_id, delta)
+
+
+def contar_mudanca_status(db: Session, status_anterior: str, novo_status: str):
+    if status_anterior == novo_status:
+        return
+    _somar(db, ContadorConsultaStatus, "status", status_anterior, -1)
+    _somar(db, ContadorConsultaStatus, "status", novo_status, 1)
+
+
+def contar_reagendamento(db: Session, data_anterior: datetime, nova_data: datetime):
+    if _mes(data_anterior) == _mes(nova_data):
+        return
+    _somar(db, ContadorConsultaMes, "mes", _mes(data_anterior), -1)
+    _somar(db, ContadorConsultaMes, "mes", _mes(nova_data), 1)
+
+
+# ---------------------------------------------------------
+# Reconstrução a partir da tabela de consultas (correção de divergência)
+# ---------------------------------------------------------
+def _expressao_mes(db: Session, coluna):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(coluna, "YYYY-MM")
+    return func.strftime("%Y-%m", coluna)
+
+
+def reconstruir_contadores(db: Session) -> dict:
+    """Recalcula os três contadores com GROUP BY numa transação só."""
+    mes = _expressao_mes(db, Consulta.data_hora)
+
+    for modelo in (ContadorConsultaStatus, ContadorConsultaMes, ContadorConsultaProfissional):
+        db.execute(delete(modelo))
+
+    db.execute(insert(ContadorConsultaStatus).from_select(
+        ["status", "total"],
+        select(Consulta.status, func.count(Consulta.id)).group_by(Consulta.status)
+    ))
+    db.execute(insert(ContadorConsultaMes).from_select(
+        ["mes", "total"],
+        select(mes, func.count(Consulta.id)).group_by(mes)
+    ))
+    db.execute(insert(ContadorConsultaProfissional).from_select(
+        ["profissional_id", "total"],
+        select(Consulta.profissional_id, func.count(Consulta.id)).group_by(Consulta.profissional_id)
+    ))
+    db.commit()
+
+    return {
+        "status": db.query(ContadorConsultaStatus).count(),
+        "meses": db.query(ContadorConsultaMes).count(),
+        "profissionais": db.query(ContadorConsultaProfissional).count(),
+    }
+
+
+def inicializar_contadores(db: Session):
+    # primeira vez (tabelas novas num banco que já tem consultas): monta do zero
+    if db.query(ContadorConsultaStatus).first() is None and db.query(Consulta.id).first() is not None:
+        reconstruir_contadores(db)
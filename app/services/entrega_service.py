@@ -0,0 +1,416 @@
+import json
+import logging
+import os
+import smtplib
+import threading
+import time
+import uuid
+import http.client
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from urllib.parse import urlsplit
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, delete, update, bindparam
+from sqlalchemy.dialects.postgresql import insert as insert_postgres
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.notificacao import Notificacao
+from app.models.usuario import Usuario
+from app.models.entrega_notificacao import EntregaNotificacao
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------
+# Configuração (variáveis de ambiente)
+# ---------------------------------------------------------
+# canais ligados, separados por vírgula: "log", "smtp", "http". Vazio = nenhuma entrega externa.
+CANAIS_ENTREGA = [c.strip() for c in os.getenv("SGHSS_CANAIS_ENTREGA", "").split(",") if c.strip()]
+
+SMTP_HOST = os.getenv("SGHSS_SMTP_HOST", "localhost")
+SMTP_PORTA = int(os.getenv("SGHSS_SMTP_PORTA", "25"))
+SMTP_USUARIO = os.getenv("SGHSS_SMTP_USUARIO")
+SMTP_SENHA = os.getenv("SGHSS_SMTP_SENHA")
+SMTP_TLS = os.getenv("SGHSS_SMTP_TLS", "0") == "1"
+SMTP_REMETENTE = os.getenv("SGHSS_SMTP_REMETENTE", "nao-responda@sghss.com")
+
+# gateway HTTP genérico (ex.: SMS) — recebe um POST JSON com o lote de mensagens
+HTTP_GATEWAY_URL = os.getenv("SGHSS_HTTP_GATEWAY_URL", "http://localhost:8025/mensagens")
+HTTP_GATEWAY_TOKEN = os.getenv("SGHSS_HTTP_GATEWAY_TOKEN")
+
+TAMANHO_LOTE_ENTREGA = 100
+MENSAGENS_POR_SEGUNDO = 20          # limite de taxa por canal
+INTERVALO_ENTREGA = 5               # segundos entre varreduras do worker
+RESERVA_ENTREGA = timedelta(minutes=2)  # quanto tempo um lote fica reservado para um worker
+
+MAX_TENTATIVAS_ENTREGA = 6
+BACKOFF_BASE_SEGUNDOS = 30          # 30s, 60s, 120s, 240s...
+BACKOFF_MAXIMO = timedelta(hours=1)
+
+
+# ---------------------------------------------------------
+# Limitador de taxa (token bucket)
+# ---------------------------------------------------------
+class LimitadorTaxa:
+    def __init__(self, por_segundo: float):
+        self.por_segundo = por_segundo
+        self._tokens = por_segundo
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def aguardar(self, quantidade: int = 1):
+        restante = quantidade
+        while restante > 0:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.por_segundo, self._tokens + (agora - self._ultimo) * self.por_segundo)
+                self._ultimo = agora
+
+                # lote maior que o balde é consumido em partes
+                parte = min(restante, self.por_segundo)
+                if self._tokens >= parte:
+                    self._tokens -= parte
+                    restante -= parte
+                    continue
+                espera = (parte - self._tokens) / self.por_segundo
+
+            # dorme fora do lock: os outros remetentes do canal continuam
+            time.sleep(espera)
+
+
+# ---------------------------------------------------------
+# Canais de entrega
+# Cada canal recebe um lote de itens e devolve {notificacao_id: erro} só das que falharam.
+# ---------------------------------------------------------
+class CanalEntrega(ABC):
+    nome = "base"
+
+    def __init__(self, mensagens_por_segundo: float = MENSAGENS_POR_SEGUNDO):
+        self.limitador = LimitadorTaxa(mensagens_por_segundo)
+
+    @abstractmethod
+    def enviar_lote(self, itens: list[dict]) -> dict[int, str]:
+        ...
+
+    def fechar(self):
+        pass
+
+
+class CanalLog(CanalEntrega):
+    nome = "log"
+
+    def enviar_lote(self, itens: list[dict]) -> dict[int, str]:
+        for item in itens:
+            logger.info(
+                "Notificação %s para usuário %s [%s]: %s",
+                item["notificacao_id"], item["usuario_id"], item["tipo"], item["mensagem"]
+            )
+        return {}
+
+
+class CanalSMTP(CanalEntrega):
+    nome = "smtp"
+
+    def __init__(self, host: str = SMTP_HOST, porta: int = SMTP_PORTA, **kwargs):
+        super().__init__(**kwargs)
+        self.host = host
+        self.porta = porta
+        self._conexao = None
+
+    def _conectar(self):
+        # a mesma conexão é reaproveitada entre lotes
+        if self._conexao is None:
+            self._conexao = smtplib.SMTP(self.host, self.porta, timeout=30)
+            if SMTP_TLS:
+                self._conexao.starttls()
+            if SMTP_USUARIO:
+                self._conexao.login(SMTP_USUARIO, SMTP_SENHA)
+        return self._conexao
+
+    def _montar_email(self, item: dict) -> EmailMessage:
+        email = EmailMessage()
+        email["From"] = SMTP_REMETENTE
+        email["To"] = item["email"]
+        email["Subject"] = f"SGHSS - Notificação ({item['tipo']})"
+        email.set_content(item["mensagem"])
+        return email
+
+    def enviar_lote(self, itens: list[dict]) -> dict[int, str]:
+        falhas = {}
+
+        for item in itens:
+            if not item.get("email"):
+                continue  # usuário sem e-mail: nada a entregar neste canal
+
+            self.limitador.aguardar()
+            email = self._montar_email(item)
+
+            try:
+                self._conectar().send_message(email)
+            except smtplib.SMTPServerDisconnected:
+                # servidor fechou a conexão ociosa — reconecta uma vez
+                self._conexao = None
+                try:
+                    self._conectar().send_message(email)
+                except (smtplib.SMTPException, OSError) as e:
+                    self._conexao = None
+                    falhas[item["notificacao_id"]] = str(e)
+            except (smtplib.SMTPException, OSError) as e:
+                self._conexao = None
+                falhas[item["notificacao_id"]] = str(e)
+
+        return falhas
+
+    def fechar(self):
+        if self._conexao is not None:
+            try:
+                self._conexao.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._conexao = None
+
+
+class CanalHTTP(CanalEntrega):
+    nome = "http"
+
+    def __init__(self, url: str = HTTP_GATEWAY_URL, **kwargs):
+        super().__init__(**kwargs)
+        self.url = urlsplit(url)
+        self._conexao = None
+
+    def _conectar(self):
+        # conexão keep-alive reaproveitada entre lotes
+        if self._conexao is None:
+            classe = http.client.HTTPSConnection if self.url.scheme == "https" else http.client.HTTPConnection
+            self._conexao = classe(self.url.hostname, self.url.port, timeout=30)
+        return self._conexao
+
+    def enviar_lote(self, itens: list[dict]) -> dict[int, str]:
+        mensagens = [
+            {
+                "id": item["notificacao_id"],
+                "destino": item["telefone"],
+                "tipo": item["tipo"],
+                "texto": item["mensagem"]
+            }
+            for item in itens
+            if item.get("telefone")
+        ]
+        if not mensagens:
+            return {}
+
+        self.limitador.aguardar(len(mensagens))
+
+        corpo = json.dumps({"mensagens": mensagens}).encode("utf-8")
+        cabecalhos = {"Content-Type": "application/json"}
+        if HTTP_GATEWAY_TOKEN:
+            cabecalhos["Authorization"] = f"Bearer {HTTP_GATEWAY_TOKEN}"
+
+        try:
+            conexao = self._conectar()
+            conexao.request("POST", self.url.path or "/", body=corpo, headers=cabecalhos)
+            resposta = conexao.getresponse()
+            resposta.read()
+            erro = None if resposta.status < 400 else f"HTTP {resposta.status}"
+        except (http.client.HTTPException, OSError) as e:
+            self.fechar()
+            erro = str(e) or e.__class__.__name__
+
+        if erro:
+            return {m["id"]: erro for m in mensagens}
+        return {}
+
+    def fechar(self):
+        if self._conexao is not None:
+            self._conexao.close()
+            self._conexao = None
+
+
+CANAIS_DISPONIVEIS = {
+    "log": CanalLog,
+    "smtp": CanalSMTP,
+    "http": CanalHTTP,
+}
+
+
+def criar_canais_configurados() -> list[CanalEntrega]:
+    canais = []
+    for nome in CANAIS_ENTREGA:
+        if nome not in CANAIS_DISPONIVEIS:
+            logger.warning("Canal de entrega desconhecido: '%s'.", nome)
+            continue
+        canais.append(CANAIS_DISPONIVEIS[nome]())
+    return canais
+
+
+# ---------------------------------------------------------
+# Fila de entrega (outbox)
+# Quem grava uma notificação chama enfileirar_entregas na MESMA transação: uma
+# linha por canal ligado. Se a notificação já tinha linha (agrupamento reescreveu
+# a mensagem), a linha volta para pendente com versao + 1.
+# ---------------------------------------------------------
+def canais_ativos() -> list[str]:
+    return [nome for nome in CANAIS_ENTREGA if nome in CANAIS_DISPONIVEIS]
+
+
+def enfileirar_entregas(db: Session, notificacao_ids: list[int]):
+    canais = canais_ativos()
+    if not canais or not notificacao_ids:
+        return
+
+    tabela = EntregaNotificacao.__table__
+    agora = datetime.now(timezone.utc)
+    inserir = insert_postgres if db.get_bind().dialect.name == "postgresql" else insert_sqlite
+
+    db.execute(
+        inserir(tabela).on_conflict_do_update(
+            index_elements=["canal", "notificacao_id"],
+            set_={
+                "status": "pendente",
+                "tentativas": 0,
+                "proxima_tentativa": agora,
+                "lote": None,
+                "erro": None,
+                "versao": tabela.c.versao + 1,
+            }
+        ),
+        [
+            {"canal": canal, "notificacao_id": nid, "status": "pendente", "tentativas": 0,
+             "proxima_tentativa": agora, "versao": 1, "criado_em": agora}
+            for canal in canais
+            for nid in notificacao_ids
+        ]
+    )
+
+
+# ---------------------------------------------------------
+# Worker — reserva um lote da fila do canal, envia e só depois apaga
+# Entrega "pelo menos uma vez": se o worker cair no meio, a reserva vence
+# (RESERVA_ENTREGA) e o lote é enviado de novo.
+# ---------------------------------------------------------
+def _calcular_backoff(tentativas: int) -> timedelta:
+    return min(timedelta(seconds=BACKOFF_BASE_SEGUNDOS * (2 ** (tentativas - 1))), BACKOFF_MAXIMO)
+
+
+def _montar_itens(db: Session, notificacao_ids: list[int]) -> list[dict]:
+    linhas = (
+        db.query(
+            Notificacao.id, Notificacao.usuario_id, Notificacao.tipo, Notificacao.mensagem,
+            Usuario.email, Usuario.telefone
+        )
+        .join(Usuario, Usuario.id == Notificacao.usuario_id)
+        .filter(Notificacao.id.in_(notificacao_ids))
+        .order_by(Notificacao.id)
+        .all()
+    )
+    return [
+        {
+            "notificacao_id": nid,
+            "usuario_id": usuario_id,
+            "tipo": tipo,
+            "mensagem": mensagem,
+            "email": email,
+            "telefone": telefone
+        }
+        for nid, usuario_id, tipo, mensagem, email, telefone in linhas
+    ]
+
+
+def _reservar_lote(db: Session, canal: str, agora: datetime, tamanho_lote: int) -> list[tuple[int, int, int, int]]:
+    """Retorna [(id, notificacao_id, versao, tentativas)] das linhas que ESTE worker reservou."""
+    disponivel = or_(EntregaNotificacao.status == "pendente", EntregaNotificacao.status == "enviando")
+
+    ids = [
+        i for (i,) in db.query(EntregaNotificacao.id)
+        .filter(
+            EntregaNotificacao.canal == canal,
+            disponivel,
+            EntregaNotificacao.proxima_tentativa <= agora
+        )
+        .order_by(EntregaNotificacao.proxima_tentativa, EntregaNotificacao.id)
+        .limit(tamanho_lote)
+        .all()
+    ]
+    if not ids:
+        return []
+
+    # UPDATE condicional com token, como nos webhooks: dois workers nunca levam a mesma linha
+    token = uuid.uuid4().hex
+    (
+        db.query(EntregaNotificacao)
+        .filter(EntregaNotificacao.id.in_(ids), disponivel, EntregaNotificacao.proxima_tentativa <= agora)
+        .update(
+            {"status": "enviando", "lote": token, "proxima_tentativa": agora + RESERVA_ENTREGA},
+            synchronize_session=False
+        )
+    )
+    db.commit()
+
+    return (
+        db.query(
+            EntregaNotificacao.id, EntregaNotificacao.notificacao_id,
+            EntregaNotificacao.versao, EntregaNotificacao.tentativas
+        )
+        .filter(EntregaNotificacao.lote == token)
+        .all()
+    )
+
+
+def _entregar_lote(canal: CanalEntrega, db: Session, tamanho_lote: int) -> int:
+    reservadas = _reservar_lote(db, canal.nome, datetime.now(timezone.utc), tamanho_lote)
+    if not reservadas:
+        return 0
+
+    falhas = canal.enviar_lote(_montar_itens(db, [nid for _, nid, _, _ in reservadas]))
+
+    # só a versão enviada: uma linha rearmada durante o envio continua na fila
+    tabela = EntregaNotificacao.__table__
+    mesma_versao = (tabela.c.id == bindparam("b_id")) & (tabela.c.versao == bindparam("b_versao"))
+    agora = datetime.now(timezone.utc)
+
+    entregues = [
+        {"b_id": id_, "b_versao": versao}
+        for id_, nid, versao, _ in reservadas if nid not in falhas   # inclui notificação que não existe mais
+    ]
+    if entregues:
+        db.execute(delete(tabela).where(mesma_versao), entregues)
+
+    falharam = [
+        {
+            "b_id": id_, "b_versao": versao,
+            "tentativas": tentativas + 1,
+            "status": "falhou" if tentativas + 1 >= MAX_TENTATIVAS_ENTREGA else "pendente",
+            "proxima_tentativa": agora + _calcular_backoff(tentativas + 1),
+            "erro": falhas[nid],
+        }
+        for id_, nid, versao, tentativas in reservadas if nid in falhas
+    ]
+    if falharam:
+        db.execute(update(tabela).where(mesma_versao).values(lote=None), falharam)
+
+    db.commit()
+    return len(reservadas)
+
+
+def processar_entregas_service(canal: CanalEntrega, db: Session, tamanho_lote: int = TAMANHO_LOTE_ENTREGA):
+    # esvazia o que estiver vencido, lote a lote
+    total = 0
+    while True:
+        processadas = _entregar_lote(canal, db, tamanho_lote)
+        total += processadas
+        if processadas < tamanho_lote:
+            break
+
+    return total
+
+
+def executar_entregas_em_background(canal: CanalEntrega):
+    # roda na thread do agendador, nunca na thread da requisição
+    db = SessionLocal()
+    try:
+        return processar_entregas_service(canal, db)
+    finally:
+        db.close()
@@ -1,18 +1,31 @@
 from fastapi import HTTPException
+from sqlalchemy import update, insert, delete, func, or_, and_
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 
+from app.core.paginacao import codificar_cursor, decodificar_cursor
 from app.models.exame import Exame
+from app.models.resultado_analito import ResultadoAnalito
 from app.models.paciente import Paciente
 from app.models.profissional_saude import ProfissionalSaude
 
-from app.schemas.exame_schema import ExameCreate, ExameUpdate
-from app.services.prontuario_service import adicionar_entrada
+from app.schemas.exame_schema import ExameCreate, ExameUpdate, ResultadoLoteItem
+from app.services.prontuario_service import adicionar_entrada, adicionar_entradas_em_lote
 from app.schemas.prontuario_schema import EntradaProntuarioCreate
 
 # Imports do módulo notificação
-from app.services.notificacao_service import criar_notificacao_service
+from app.services.notificacao_service import criar_notificacao_service, criar_notificacoes_em_lote
 from app.schemas.notificacao_schema import NotificacaoCreate
+from app.services.webhook_service import publicar_evento, publicar_eventos
+
+
+# ingestão em lote: quantos resultados por transação
+TAMANHO_LOTE_INGESTAO = 500
+
+# fila do laboratório: quantas vezes tentar de novo quando outro técnico
+# reservou os mesmos exames no meio do caminho
+TENTATIVAS_RESERVA = 3
 
 
 # ---------------------------------------------------------
@@ -75,12 +88,70 @@ def buscar_exame_service(exame_id: int, db: Session) -> Exame:
 
 
 # ---------------------------------------------------------
-# ATUALIZAR EXAME (status ou resultado)
+# TRANSIÇÕES DE STATUS — guarda quando o exame começou e terminou
+# ---------------------------------------------------------
+def _registrar_transicao(exame: Exame, status_anterior: str, agora: datetime):
+    if exame.status == status_anterior:
+        return
+    if exame.status == "em_andamento" and exame.iniciado_em is None:
+        exame.iniciado_em = agora
+    elif exame.status == "concluido":
+        exame.concluido_em = agora
+
+
+# texto da entrada no prontuário quando o exame conclui (PATCH e ingestão em lote)
+def _texto_entrada_resultado(exame: Exame) -> str:
+    return f"Resultado do exame {exame.tipo_exame}: {exame.resultado or 'sem resultado informado.'}"
+
+
+# ---------------------------------------------------------
+# RESULTADOS ESTRUTURADOS (analitos)
+# Enviar "analitos" num PATCH/lote substitui os do exame; sem o campo, nada muda.
+# ---------------------------------------------------------
+def _linhas_analitos(exame: Exame, analitos: list[dict], agora: datetime) -> list[dict]:
+    return [
+        {
+            "exame_id": exame.id,
+            "paciente_id": exame.paciente_id,
+            "analito": a["analito"].strip().lower(),
+            "valor": a["valor"],
+            "unidade": a.get("unidade"),
+            "referencia_min": a.get("referencia_min"),
+            "referencia_max": a.get("referencia_max"),
+            "coletado_em": a.get("coletado_em") or agora,
+        }
+        for a in analitos
+    ]
+
+
+def _substituir_analitos(db: Session, linhas_por_exame: dict[int, list[dict]]):
+    # sem commit: entra na transação da atualização do exame
+    if not linhas_por_exame:
+        return
+
+    db.execute(delete(ResultadoAnalito).where(ResultadoAnalito.exame_id.in_(list(linhas_por_exame))))
+    linhas = [l for ls in linhas_por_exame.values() for l in ls]
+    if linhas:
+        db.execute(insert(ResultadoAnalito), linhas)
+
+
+def listar_analitos_exame_service(db: Session, exame_id: int):
+    return (
+        db.query(ResultadoAnalito)
+        .filter(ResultadoAnalito.exame_id == exame_id)
+        .order_by(ResultadoAnalito.analito, ResultadoAnalito.id)
+        .all()
+    )
+
+
+# ---------------------------------------------------------
+# ATUALIZAR EXAME (status, resultado e/ou analitos)
 # ---------------------------------------------------------
 def atualizar_exame_service(exame_id: int, dados: ExameUpdate, db: Session) -> Exame:
     exame = buscar_exame_service(exame_id, db)
 
     dados_dict = dados.model_dump(exclude_unset=True)
+    analitos = dados_dict.pop("analitos", None)
     status_anterior = exame.status  # guardar status antes da atualização
 
     # aplicar alterações no objeto Exame
@@ -88,6 +159,22 @@ def atualizar_exame_service(exame_id: int, dados: ExameUpdate, db: Session) -> E
         setattr(exame, campo, valor)
 
     exame.atualizado_em = datetime.now(timezone.utc)
+    _registrar_transicao(exame, status_anterior, exame.atualizado_em)
+
+    if analitos is not None:
+        _substituir_analitos(db, {exame.id: _linhas_analitos(exame, analitos, exame.atualizado_em)})
+
+    # webhook para integradores (mesma transação da atualização)
+    if exame.status != status_anterior:
+        publicar_evento(db, "exame.status_alterado", {
+            "exame_id": exame.id,
+            "paciente_id": exame.paciente_id,
+            "profissional_id": exame.profissional_id,
+            "tipo_exame": exame.tipo_exame,
+            "status_anterior": status_anterior,
+            "status": exame.status,
+        })
+
     db.commit()
     db.refresh(exame)
 
@@ -95,16 +182,11 @@ def atualizar_exame_service(exame_id: int, dados: ExameUpdate, db: Session) -> E
     # INTEGRAÇÃO EXAME -> PRONTUÁRIO
     # ---------------------------------------------------------
     if exame.status == "concluido" and status_anterior != "concluido":
-        texto = (
-            f"Resultado do exame {exame.tipo_exame}: "
-            f"{exame.resultado or 'sem resultado informado.'}"
-        )
-
         adicionar_entrada(
             db=db,
             paciente_id=exame.paciente_id,
             dados=EntradaProntuarioCreate(
-                texto=texto,
+                texto=_texto_entrada_resultado(exame),
                 tipo="exame",
                 consulta_id=exame.consulta_id
             )
@@ -128,3 +210,251 @@ def atualizar_exame_service(exame_id: int, dados: ExameUpdate, db: Session) -> E
             pass
 
     return exame
+
+
+# ---------------------------------------------------------
+# INGESTÃO DE RESULTADOS EM LOTE (sistema do laboratório)
+# Mesmo efeito do atualizar_exame_service para cada item — status/resultado,
+# webhook, entrada no prontuário e notificação quando conclui — mas com uma
+# transação e poucas consultas por lote de TAMANHO_LOTE_INGESTAO itens.
+# ---------------------------------------------------------
+def _ingerir_lote(db: Session, itens: list[ResultadoLoteItem], profissional_id: int | None) -> list[dict]:
+    exames = {
+        e.id: e for e in
+        db.query(Exame).filter(Exame.id.in_({i.exame_id for i in itens})).with_for_update()
+    }
+
+    agora = datetime.now(timezone.utc)
+    respostas = []
+    eventos = []
+    concluidos = []
+    analitos_por_exame = {}
+
+    for item in itens:
+        exame = exames.get(item.exame_id)
+        if not exame:
+            respostas.append({"exame_id": item.exame_id, "sucesso": False, "erro": "Exame não encontrado."})
+            continue
+
+        if profissional_id is not None and exame.profissional_id != profissional_id:
+            respostas.append({
+                "exame_id": item.exame_id, "sucesso": False,
+                "erro": "Você só pode atualizar exames que você mesmo cadastrou."
+            })
+            continue
+
+        dados = item.model_dump(exclude_none=True, exclude={"exame_id"})
+        analitos = dados.pop("analitos", None)
+        if not dados and analitos is None:
+            respostas.append({
+                "exame_id": item.exame_id, "sucesso": False,
+                "erro": "Informe status, resultado e/ou analitos."
+            })
+            continue
+
+        status_anterior = exame.status
+        for campo, valor in dados.items():
+            setattr(exame, campo, valor)
+        exame.atualizado_em = agora
+        _registrar_transicao(exame, status_anterior, agora)
+
+        if analitos is not None:
+            analitos_por_exame[exame.id] = _linhas_analitos(exame, analitos, agora)
+
+        if exame.status != status_anterior:
+            eventos.append({
+                "exame_id": exame.id,
+                "paciente_id": exame.paciente_id,
+                "profissional_id": exame.profissional_id,
+                "tipo_exame": exame.tipo_exame,
+                "status_anterior": status_anterior,
+                "status": exame.status,
+            })
+            if exame.status == "concluido" and status_anterior != "concluido":
+                concluidos.append(exame)
+
+        respostas.append({"exame_id": exame.id, "sucesso": True, "status": exame.status})
+
+    try:
+        _substituir_analitos(db, analitos_por_exame)
+        publicar_eventos(db, "exame.status_alterado", eventos)
+
+        _, sem_prontuario = adicionar_entradas_em_lote(db, [
+            {
+                "paciente_id": e.paciente_id,
+                "texto": _texto_entrada_resultado(e),
+                "tipo": "exame",
+                "consulta_id": e.consulta_id,
+            }
+            for e in concluidos
+        ])
+
+        # como no PATCH /exames/{id}: o exame fica concluído, mas sem prontuário não há
+        # entrada nem notificação, e o item volta com erro
+        if sem_prontuario:
+            sem_entrada = {e.id for e in concluidos if e.paciente_id in sem_prontuario}
+            concluidos = [e for e in concluidos if e.id not in sem_entrada]
+            for r in respostas:
+                if r["exame_id"] in sem_entrada and r["sucesso"]:
+                    r.update(
+                        sucesso=False,
+                        erro="Exame atualizado, mas o paciente não tem prontuário: o resultado não foi registrado nele."
+                    )
+
+        if concluidos:
+            usuarios = dict(
+                db.query(Paciente.id, Paciente.usuario_id)
+                .filter(Paciente.id.in_({e.paciente_id for e in concluidos}))
+                .all()
+            )
+            criar_notificacoes_em_lote(db, "exame", [
+                (usuarios[e.paciente_id], f"Resultado do exame '{e.tipo_exame}' está disponível.")
+                for e in concluidos if e.paciente_id in usuarios
+            ])
+
+        db.commit()
+    except SQLAlchemyError:
+        # o lote inteiro volta; os demais lotes seguem
+        db.rollback()
+        for r in respostas:
+            if "status" in r:   # itens aplicados (inclusive os sem prontuário)
+                r.update(sucesso=False, status=None, erro="Falha ao gravar o lote; nenhuma alteração aplicada.")
+
+    return respostas
+
+
+def ingerir_resultados_service(
+    db: Session,
+    itens: list[ResultadoLoteItem],
+    profissional_id: int | None = None
+) -> dict:
+    """
+    profissional_id: quando informado, só os exames desse profissional são
+    alterados (os demais voltam com erro, como no PATCH /exames/{id}).
+    """
+    respostas = []
+    for inicio in range(0, len(itens), TAMANHO_LOTE_INGESTAO):
+        respostas.extend(_ingerir_lote(db, itens[inicio:inicio + TAMANHO_LOTE_INGESTAO], profissional_id))
+
+    atualizados = sum(1 for r in respostas if r["sucesso"])
+    return {
+        "total": len(respostas),
+        "atualizados": atualizados,
+        "com_erro": len(respostas) - atualizados,
+        "itens": respostas,
+    }
+
+
+# ---------------------------------------------------------
+# FILA DE TRABALHO DO LABORATÓRIO
+# Mais antigos primeiro (criado_em, id), usando o índice ix_exames_fila.
+# ---------------------------------------------------------
+def listar_fila_exames_service(
+    db: Session,
+    status: str = "solicitado",
+    tipo_exame: str | None = None,
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    cursor: str | None = None,
+    limite: int = 50
+):
+    query = db.query(Exame).filter(Exame.status == status)
+
+    if tipo_exame:
+        query = query.filter(Exame.tipo_exame == tipo_exame)
+    if de:
+        query = query.filter(Exame.criado_em >= de)
+    if ate:
+        query = query.filter(Exame.criado_em < ate)
+
+    # keyset: continua logo depois do último exame da página anterior
+    if cursor:
+        cursor_data, cursor_id = decodificar_cursor(cursor)[:2]
+        query = query.filter(or_(
+            Exame.criado_em > cursor_data,
+            and_(Exame.criado_em == cursor_data, Exame.id > cursor_id)
+        ))
+
+    exames = query.order_by(Exame.criado_em, Exame.id).limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(exames) > limite:
+        exames = exames[:limite]
+        proximo_cursor = codificar_cursor(exames[-1].criado_em, exames[-1].id)
+
+    return {"itens": exames, "proximo_cursor": proximo_cursor}
+
+
+def _marcar_em_andamento(db: Session, ids: list[int]) -> list[int]:
+    """
+    UPDATE condicional: só muda quem AINDA está "solicitado". Se outro técnico
+    levou o exame antes, a linha simplesmente não volta no RETURNING.
+    """
+    if not ids:
+        return []
+
+    agora = datetime.now(timezone.utc)
+    reservados = list(db.scalars(
+        update(Exame)
+        .where(Exame.id.in_(ids), Exame.status == "solicitado")
+        .values(
+            status="em_andamento",
+            atualizado_em=agora,
+            iniciado_em=func.coalesce(Exame.iniciado_em, agora)
+        )
+        .returning(Exame.id),
+        execution_options={"synchronize_session": False}
+    ))
+
+    exames = db.query(Exame).filter(Exame.id.in_(reservados)).all() if reservados else []
+    publicar_eventos(db, "exame.status_alterado", [
+        {
+            "exame_id": e.id,
+            "paciente_id": e.paciente_id,
+            "profissional_id": e.profissional_id,
+            "tipo_exame": e.tipo_exame,
+            "status_anterior": "solicitado",
+            "status": "em_andamento",
+        }
+        for e in exames
+    ])
+    return reservados
+
+
+def reservar_exames_service(db: Session, tipo_exame: str | None = None, quantidade: int = 1) -> list[Exame]:
+    """Pega os `quantidade` exames solicitados mais antigos (opcionalmente de um tipo) e passa para em_andamento."""
+    reservados: list[int] = []
+
+    for _ in range(TENTATIVAS_RESERVA):
+        faltam = quantidade - len(reservados)
+        if faltam <= 0:
+            break
+
+        query = db.query(Exame.id).filter(Exame.status == "solicitado")
+        if tipo_exame:
+            query = query.filter(Exame.tipo_exame == tipo_exame)
+        candidatos = [i for (i,) in query.order_by(Exame.criado_em, Exame.id).limit(faltam).all()]
+        if not candidatos:
+            break
+
+        reservados += _marcar_em_andamento(db, candidatos)
+        db.commit()
+
+    if not reservados:
+        return []
+
+    return db.query(Exame).filter(Exame.id.in_(reservados)).order_by(Exame.criado_em, Exame.id).all()
+
+
+def reservar_exame_service(db: Session, exame_id: int) -> Exame:
+    exame = buscar_exame_service(exame_id, db)
+
+    if not _marcar_em_andamento(db, [exame_id]):
+        db.rollback()
+        # o exame carregado acima pode estar velho: a mensagem usa o status do banco
+        db.refresh(exame)
+        raise HTTPException(status_code=409, detail=f"Exame não está mais na fila (status atual: {exame.status}).")
+
+    db.commit()
+    db.refresh(exame)
+    return exame
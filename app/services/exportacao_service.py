@@ -0,0 +1,284 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, SessionLeitura
+from app.models.agenda import Agenda
+from app.models.paciente import Paciente
+from app.models.usuario import Usuario
+from app.models.consulta import Consulta
+from app.models.exame import Exame
+from app.models.prontuario import Prontuario
+from app.models.entrada_prontuario import EntradaProntuario
+from app.models.remocao_registro import RemocaoRegistro
+
+
+# ---------------------------------------------------------
+# Exportação completa do registro de um paciente (portabilidade LGPD / transferência)
+# Tudo é lido com yield_per e escrito linha a linha: a memória não cresce com o
+# tamanho do prontuário.
+# ---------------------------------------------------------
+TAMANHO_LOTE_EXPORTACAO = 500
+
+
+def _json_padrao(valor):
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, default=_json_padrao)
+
+
+def _dados_paciente(paciente: Paciente, usuario: Usuario) -> dict:
+    return {
+        "paciente_id": paciente.id,
+        "usuario_id": usuario.id,
+        "nome": usuario.nome,
+        "cpf": usuario.cpf,
+        "email": usuario.email,
+        "telefone": usuario.telefone,
+        "endereco": usuario.endereco,
+        "sexo": usuario.sexo,
+        "data_nascimento": usuario.data_nascimento,
+        "criado_em": usuario.criado_em,
+    }
+
+
+def _registros_paciente(db, paciente_id: int):
+    """Gera (tipo, dados) na ordem: usuário, consultas, exames, entradas."""
+    paciente, usuario = (
+        db.query(Paciente, Usuario)
+        .join(Usuario, Usuario.id == Paciente.usuario_id)
+        .filter(Paciente.id == paciente_id)
+        .one()
+    )
+
+    yield "paciente", _dados_paciente(paciente, usuario)
+
+    consultas = (
+        db.query(Consulta)
+        .filter(Consulta.paciente_id == paciente_id)
+        .order_by(Consulta.data_hora)
+        .yield_per(TAMANHO_LOTE_EXPORTACAO)
+    )
+    for c in consultas:
+        yield "consulta", {
+            "id": c.id,
+            "data_hora": c.data_hora,
+            "status": c.status,
+            "observacoes": c.observacoes,
+            "profissional_id": c.profissional_id,
+        }
+
+    exames = (
+        db.query(Exame)
+        .filter(Exame.paciente_id == paciente_id)
+        .order_by(Exame.criado_em)
+        .yield_per(TAMANHO_LOTE_EXPORTACAO)
+    )
+    for e in exames:
+        yield "exame", {
+            "id": e.id,
+            "tipo_exame": e.tipo_exame,
+            "status": e.status,
+            "resultado": e.resultado,
+            "consulta_id": e.consulta_id,
+            "profissional_id": e.profissional_id,
+            "criado_em": e.criado_em,
+            "atualizado_em": e.atualizado_em,
+        }
+
+    entradas = (
+        db.query(EntradaProntuario)
+        .join(Prontuario, Prontuario.id == EntradaProntuario.prontuario_id)
+        .filter(Prontuario.paciente_id == paciente_id)
+        .order_by(EntradaProntuario.data_hora)
+        .yield_per(TAMANHO_LOTE_EXPORTACAO)
+    )
+    for en in entradas:
+        yield "entrada_prontuario", {
+            "id": en.id,
+            "tipo": en.tipo,
+            "texto": en.texto,
+            "data_hora": en.data_hora,
+            "consulta_id": en.consulta_id,
+        }
+
+
+# ---------- Formato NDJSON: uma linha JSON por registro ----------
+
+def exportar_ndjson(paciente_id: int):
+    # sessão própria: o gerador roda depois que a rota já retornou
+    db = SessionLocal()
+    try:
+        for tipo, dados in _registros_paciente(db, paciente_id):
+            yield _dumps({"tipo": tipo, "dados": dados}) + "\n"
+    finally:
+        db.close()
+
+
+# ---------- Formato "FHIR-like": Bundle com um resource por registro ----------
+
+RECURSOS_FHIR = {
+    "paciente": "Patient",
+    "consulta": "Encounter",
+    "exame": "DiagnosticReport",
+    "entrada_prontuario": "DocumentReference",
+}
+
+
+def exportar_bundle(paciente_id: int):
+    db = SessionLocal()
+    try:
+        yield '{"resourceType": "Bundle", "type": "collection", "entry": [\n'
+
+        primeiro = True
+        for tipo, dados in _registros_paciente(db, paciente_id):
+            # dados primeiro: o "id" do recurso é texto e não pode ser sobrescrito pelo id inteiro
+            recurso = {**dados, "resourceType": RECURSOS_FHIR[tipo], "id": str(dados.get("id", dados.get("paciente_id")))}
+            yield ("" if primeiro else ",\n") + _dumps({"resource": recurso})
+            primeiro = False
+
+        yield "\n]}\n"
+    finally:
+        db.close()
+
+
+# ---------- Cadastro de todos os pacientes (tarefa de relatório "exportacao_pacientes") ----------
+
+def exportar_pacientes_service(db: Session, ativos: bool | None = None):
+    # gerador: a tarefa em background grava um paciente por vez no arquivo do resultado
+    consulta = (
+        db.query(Paciente, Usuario)
+        .join(Usuario, Usuario.id == Paciente.usuario_id)
+        .order_by(Paciente.id)
+    )
+    if ativos is not None:
+        consulta = consulta.filter(Usuario.ativo == ativos)
+
+    for paciente, usuario in consulta.yield_per(TAMANHO_LOTE_EXPORTACAO):
+        yield _dados_paciente(paciente, usuario)
+
+
+# ---------------------------------------------------------
+# Exportação em massa para BI (/admin/exportacoes/{entidade})
+# Uma tabela inteira (ou só o que mudou desde ?desde=) em CSV ou NDJSON.
+# Consulta Core só das colunas pedidas, com stream_results/yield_per: o driver
+# entrega LOTE_EXPORTACAO_BI linhas por vez e cada lote vira UM pedaço da
+# resposta (chunked). A memória fica no tamanho de um lote, não da tabela.
+#
+# Incremental: desde filtra atualizado_em >= desde, em ordem (atualizado_em, id).
+# Use o maior atualizado_em recebido como próximo desde; as linhas desse
+# instante vêm de novo, então o destino deve gravar por id (upsert).
+# Linhas apagadas não aparecem aqui: saem como marcas de remoção (RemocaoRegistro)
+# em /admin/exportacoes/{entidade}/remocoes, com o mesmo esquema de desde.
+# ---------------------------------------------------------
+LOTE_EXPORTACAO_BI = 5000
+
+# entidade → (modelo, colunas permitidas, na ordem padrão)
+ENTIDADES_EXPORTACAO = {
+    "consultas": (Consulta, (
+        "id", "data_hora", "status", "paciente_id", "profissional_id", "observacoes", "atualizado_em",
+    )),
+    # sem "resultado": texto livre (às vezes comprimido); vai pelo export do paciente
+    "exames": (Exame, (
+        "id", "paciente_id", "profissional_id", "consulta_id", "tipo_exame", "status",
+        "criado_em", "iniciado_em", "concluido_em", "atualizado_em",
+    )),
+    "agendas": (Agenda, (
+        "id", "profissional_id", "data", "hora", "disponivel", "atualizado_em",
+    )),
+}
+
+
+def preparar_exportacao_bi(entidade: str, colunas: list[str] | None, desde: datetime | None):
+    """Valida o pedido antes de a resposta começar (depois do primeiro byte não dá mais para devolver 400)."""
+    if entidade not in ENTIDADES_EXPORTACAO:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Entidade desconhecida. Disponíveis: {', '.join(ENTIDADES_EXPORTACAO)}."
+        )
+    modelo, permitidas = ENTIDADES_EXPORTACAO[entidade]
+
+    colunas = colunas or list(permitidas)
+    invalidas = [c for c in colunas if c not in permitidas]
+    if invalidas:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Colunas inválidas para {entidade}: {', '.join(invalidas)}. Permitidas: {', '.join(permitidas)}."
+        )
+    if len(set(colunas)) != len(colunas):
+        raise HTTPException(status_code=400, detail="Colunas repetidas.")
+
+    tabela = modelo.__table__
+    consulta = select(*(tabela.c[c] for c in colunas))
+    if desde is not None:
+        consulta = consulta.where(tabela.c.atualizado_em >= _normalizar_desde(desde)).order_by(tabela.c.atualizado_em, tabela.c.id)
+    else:
+        consulta = consulta.order_by(tabela.c.id)
+
+    return consulta, colunas
+
+
+def _normalizar_desde(desde: datetime) -> datetime:
+    # as datas são gravadas em UTC sem fuso
+    if desde.tzinfo is not None:
+        desde = desde.astimezone(timezone.utc).replace(tzinfo=None)
+    return desde
+
+
+def preparar_exportacao_remocoes(entidade: str, desde: datetime | None):
+    """Marcas de remoção (id, removido_em) de uma entidade, em ordem de removido_em."""
+    if entidade not in ENTIDADES_EXPORTACAO:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Entidade desconhecida. Disponíveis: {', '.join(ENTIDADES_EXPORTACAO)}."
+        )
+
+    consulta = (
+        select(RemocaoRegistro.registro_id.label("id"), RemocaoRegistro.removido_em)
+        .where(RemocaoRegistro.entidade == entidade)
+        .order_by(RemocaoRegistro.removido_em, RemocaoRegistro.id)
+    )
+    if desde is not None:
+        consulta = consulta.where(RemocaoRegistro.removido_em >= _normalizar_desde(desde))
+
+    return consulta, ["id", "removido_em"]
+
+
+def _lotes_exportacao(consulta):
+    # sessão de leitura própria: o gerador roda depois que a rota já retornou
+    db = SessionLeitura()
+    try:
+        resultado = db.execute(consulta.execution_options(stream_results=True, yield_per=LOTE_EXPORTACAO_BI))
+        yield from resultado.partitions()
+    finally:
+        db.close()
+
+
+def exportar_bi_csv(consulta, colunas: list[str]):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+
+    escritor.writerow(colunas)
+    for lote in _lotes_exportacao(consulta):
+        escritor.writerows(lote)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # tabela vazia: ainda manda o cabeçalho
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def exportar_bi_ndjson(consulta, colunas: list[str]):
+    for lote in _lotes_exportacao(consulta):
+        yield "".join(_dumps(dict(zip(colunas, linha))) + "\n" for linha in lote)
@@ -0,0 +1,101 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta, timezone
+
+from app.database import SessionLocal
+from app.models.consulta import Consulta
+from app.models.paciente import Paciente
+from app.models.lembrete_consulta import LembreteConsulta
+from app.models.notificacao import Notificacao
+from app.services.entrega_service import enfileirar_entregas
+
+
+# lembrar consultas que acontecem nas próximas X horas
+LEMBRETE_ANTECEDENCIA = timedelta(hours=24)
+
+# consultas processadas por commit
+TAMANHO_LOTE_LEMBRETES = 200
+
+STATUS_LEMBRAVEIS = ("agendada", "confirmada")
+
+
+def gerar_lembretes_service(
+    db: Session,
+    agora: datetime | None = None,
+    tamanho_lote: int = TAMANHO_LOTE_LEMBRETES
+):
+    agora = agora or datetime.now(timezone.utc)
+    # consultas.data_hora é gravada em UTC sem fuso: a janela também (senão o SQLite
+    # compara textos em formatos diferentes e o Postgres mistura timestamp com timestamptz)
+    if agora.tzinfo is not None:
+        agora = agora.astimezone(timezone.utc).replace(tzinfo=None)
+    fim_janela = agora + LEMBRETE_ANTECEDENCIA
+
+    # só a janela (agora, agora + antecedência] — usa ix_consultas_data_hora_status
+    ja_lembrada = (
+        db.query(LembreteConsulta.id)
+        .filter(
+            LembreteConsulta.consulta_id == Consulta.id,
+            LembreteConsulta.data_hora == Consulta.data_hora
+        )
+        .exists()
+    )
+
+    enviados = 0
+    ultimo_id = 0
+
+    while True:
+        lote = (
+            db.query(Consulta.id, Consulta.data_hora, Paciente.usuario_id)
+            .join(Paciente, Paciente.id == Consulta.paciente_id)
+            .filter(
+                Consulta.data_hora > agora,
+                Consulta.data_hora <= fim_janela,
+                Consulta.status.in_(STATUS_LEMBRAVEIS),
+                Consulta.id > ultimo_id,
+                ~ja_lembrada
+            )
+            .order_by(Consulta.id)
+            .limit(tamanho_lote)
+            .all()
+        )
+        if not lote:
+            break
+
+        notificacoes = []
+        for consulta_id, data_hora, usuario_id in lote:
+            # savepoint por consulta: se outro worker já registrou o lembrete,
+            # a unique estoura e só essa consulta é pulada
+            try:
+                with db.begin_nested():
+                    db.add(LembreteConsulta(consulta_id=consulta_id, data_hora=data_hora, enviado_em=agora))
+                    db.flush()
+            except IntegrityError:
+                continue
+
+            notif = Notificacao(
+                usuario_id=usuario_id,
+                tipo="consulta",
+                mensagem=f"Lembrete: você tem uma consulta marcada para {data_hora}.",
+                data_envio=agora
+            )
+            db.add(notif)
+            notificacoes.append(notif)
+            enviados += 1
+
+        db.flush()
+        enfileirar_entregas(db, [n.id for n in notificacoes])
+
+        # lembretes + notificações + fila de entrega do lote no mesmo commit
+        db.commit()
+        ultimo_id = lote[-1][0]
+
+    return enviados
+
+
+def executar_lembretes_em_background():
+    db = SessionLocal()
+    try:
+        return gerar_lembretes_service(db)
+    finally:
+        db.close()
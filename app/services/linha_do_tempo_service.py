@@ -0,0 +1,119 @@
+import heapq
+from itertools import islice
+
+from fastapi import HTTPException
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+
+from app.core.paginacao import codificar_cursor, decodificar_cursor
+from app.models.consulta import Consulta
+from app.models.exame import Exame
+from app.models.entrada_prontuario import EntradaProntuario
+from app.models.prontuario import Prontuario
+
+
+# ---------------------------------------------------------
+# Linha do tempo do paciente: consultas + exames + entradas do prontuário,
+# mais recentes primeiro. Cada fonte é uma consulta por faixa (índice por
+# paciente + data) limitada a "limite + 1"; o merge é feito em memória (k-way).
+#
+# Desempate entre itens com a mesma data: fonte (ORDEM_FONTE) e depois id.
+# ---------------------------------------------------------
+ORDEM_FONTE = {"consulta": 3, "exame": 2, "entrada": 1}
+
+
+def _apos_cursor(coluna_data, coluna_id, fonte: str, cursor):
+    """Filtro keyset: itens que vêm DEPOIS do cursor na ordem (data, fonte, id) decrescente."""
+    if cursor is None:
+        return None
+
+    c_data, c_id, c_fonte = cursor
+    ordem, c_ordem = ORDEM_FONTE[fonte], ORDEM_FONTE[c_fonte]
+
+    if ordem < c_ordem:
+        return coluna_data <= c_data
+    if ordem > c_ordem:
+        return coluna_data < c_data
+    return or_(coluna_data < c_data, and_(coluna_data == c_data, coluna_id < c_id))
+
+
+def _buscar_fonte(query, coluna_data, coluna_id, fonte, cursor, limite, montar):
+    filtro = _apos_cursor(coluna_data, coluna_id, fonte, cursor)
+    if filtro is not None:
+        query = query.filter(filtro)
+
+    linhas = query.order_by(coluna_data.desc(), coluna_id.desc()).limit(limite + 1).all()
+    return [montar(l) for l in linhas]
+
+
+def _chave(item: dict):
+    # mesma ordem das consultas SQL (usada com reverse=True no merge)
+    return (item["data_hora"], ORDEM_FONTE[item["tipo"]], item["id"])
+
+
+def linha_do_tempo_service(
+    db: Session,
+    paciente_id: int,
+    cursor: str | None = None,
+    limite: int = 30,
+    profissional_id: int | None = None
+):
+    """
+    profissional_id: quando informado, consultas e exames ficam restritos aos
+    daquele profissional (mesma regra dos endpoints /consultas e /exames).
+    """
+    posicao = None
+    if cursor:
+        c_data, c_id, *extras = decodificar_cursor(cursor)
+        if not extras or extras[0] not in ORDEM_FONTE:
+            raise HTTPException(status_code=400, detail="Cursor inválido.")
+        posicao = (c_data, c_id, extras[0])
+
+    # --- consultas ---
+    q_consultas = db.query(Consulta).filter(Consulta.paciente_id == paciente_id)
+    if profissional_id is not None:
+        q_consultas = q_consultas.filter(Consulta.profissional_id == profissional_id)
+
+    consultas = _buscar_fonte(
+        q_consultas, Consulta.data_hora, Consulta.id, "consulta", posicao, limite,
+        lambda c: {
+            "tipo": "consulta", "id": c.id, "data_hora": c.data_hora,
+            "titulo": "Consulta", "status": c.status, "texto": c.observacoes
+        }
+    )
+
+    # --- exames ---
+    q_exames = db.query(Exame).filter(Exame.paciente_id == paciente_id)
+    if profissional_id is not None:
+        q_exames = q_exames.filter(Exame.profissional_id == profissional_id)
+
+    exames = _buscar_fonte(
+        q_exames, Exame.criado_em, Exame.id, "exame", posicao, limite,
+        lambda e: {
+            "tipo": "exame", "id": e.id, "data_hora": e.criado_em,
+            "titulo": e.tipo_exame, "status": e.status, "texto": e.resultado
+        }
+    )
+
+    # --- entradas do prontuário ---
+    prontuario_id = db.query(Prontuario.id).filter(Prontuario.paciente_id == paciente_id).scalar()
+    q_entradas = db.query(EntradaProntuario).filter(EntradaProntuario.prontuario_id == prontuario_id)
+
+    entradas = [] if prontuario_id is None else _buscar_fonte(
+        q_entradas, EntradaProntuario.data_hora, EntradaProntuario.id, "entrada", posicao, limite,
+        lambda e: {
+            "tipo": "entrada", "id": e.id, "data_hora": e.data_hora,
+            "titulo": e.tipo, "status": None, "texto": e.texto
+        }
+    )
+
+    # k-way merge das três listas já ordenadas
+    mesclados = list(islice(heapq.merge(consultas, exames, entradas, key=_chave, reverse=True), limite + 1))
+
+    proximo_cursor = None
+    if len(mesclados) > limite:
+        mesclados = mesclados[:limite]
+        ultimo = mesclados[-1]
+        proximo_cursor = codificar_cursor(ultimo["data_hora"], ultimo["id"], ultimo["tipo"])
+
+    return {"itens": mesclados, "proximo_cursor": proximo_cursor}
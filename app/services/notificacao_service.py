@@ -1,23 +1,153 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import insert, delete, update, literal, cast, String
+from sqlalchemy.dialects.postgresql import insert as insert_postgres
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
 from fastapi import HTTPException
+from datetime import datetime, timedelta, timezone
+from bisect import bisect_right
 
+from app.database import SessionLocal
 from app.models.notificacao import Notificacao
-from app.schemas.notificacao_schema import NotificacaoCreate
+from app.models.notificacao_arquivada import NotificacaoArquivada
+from app.models.envio_notificacao import EnvioNotificacao
+from app.models.usuario import Usuario
+from app.models.paciente import Paciente
+from app.models.profissional_saude import ProfissionalSaude
+from app.schemas.notificacao_schema import NotificacaoCreate, NotificacaoBroadcastCreate
+from app.services.entrega_service import enfileirar_entregas
+
+
+# ---------------------------------------------------------
+# Política de retenção — dias que uma notificação LIDA fica na tabela ativa
+# ---------------------------------------------------------
+RETENCAO_POR_TIPO_DIAS = {
+    "consulta": 90,
+    "exame": 180,
+    "sistema": 30,
+}
+RETENCAO_PADRAO_DIAS = 90
+
+# lotes pequenos = transações curtas, sem segurar lock da tabela por muito tempo
+TAMANHO_LOTE_ARQUIVAMENTO = 500
+
+# Agrupamento (digest): eventos do mesmo tipo para o mesmo usuário dentro da janela
+# (em segundos) viram UMA notificação. Tipos fora do dicionário não são agrupados.
+JANELA_AGRUPAMENTO_POR_TIPO = {
+    "exame": 60,
+}
+
+# envio em massa: quantos destinatários por INSERT/commit
+TAMANHO_LOTE_BROADCAST = 1000
+
+# envio "em_andamento" sem progresso há mais que isso é considerado travado (worker caiu)
+ENVIO_TRAVADO_APOS = timedelta(minutes=5)
 
 
 # Criar notificação
 def criar_notificacao_service(usuario_id: int, dados: NotificacaoCreate, db: Session):
+    if dados.tipo in JANELA_AGRUPAMENTO_POR_TIPO:
+        notif_id = _agrupar_notificacao(db, usuario_id, dados.tipo, [dados.mensagem], datetime.now(timezone.utc))
+        enfileirar_entregas(db, [notif_id])
+        db.commit()
+        return db.get(Notificacao, notif_id, populate_existing=True)
+
     notif = Notificacao(
         usuario_id=usuario_id,
         tipo=dados.tipo,
         mensagem=dados.mensagem
     )
     db.add(notif)
+    db.flush()
+    enfileirar_entregas(db, [notif.id])
     db.commit()
     db.refresh(notif)
     return notif
 
 
+def _mensagem_resumo(total: int, tipo: str, ultima: str) -> str:
+    return f"Você tem {total} novas notificações ({tipo}). Última: {ultima}"
+
+
+# Eventos de um tipo com janela entram no grupo ABERTO do usuário (uma notificação não
+# lida que vira resumo). A janela conta do último evento: cada evento agrupado renova
+# data_envio. O índice único parcial garante um grupo aberto por (usuário, tipo), então
+# dois eventos simultâneos caem no mesmo UPSERT em vez de criar duas linhas.
+# Não faz commit nem enfileira a entrega. Retorna o id da notificação criada ou atualizada.
+def _agrupar_notificacao(db: Session, usuario_id: int, tipo: str, mensagens: list[str], agora: datetime) -> int:
+    limite = agora - timedelta(seconds=JANELA_AGRUPAMENTO_POR_TIPO[tipo])
+    tabela = Notificacao.__table__
+
+    # grupo com a janela vencida fecha; o próximo evento abre outro
+    db.execute(
+        update(tabela)
+        .where(
+            tabela.c.usuario_id == usuario_id,
+            tabela.c.tipo == tipo,
+            tabela.c.agrupando == True,
+            tabela.c.data_envio < limite
+        )
+        .values(agrupando=False)
+    )
+
+    quantidade = len(mensagens)
+    inserir = insert_postgres if db.get_bind().dialect.name == "postgresql" else insert_sqlite
+    comando = (
+        inserir(tabela)
+        .values(
+            usuario_id=usuario_id, tipo=tipo, lida=False, agrupando=True, data_envio=agora,
+            agrupadas=quantidade,
+            mensagem=mensagens[0] if quantidade == 1 else _mensagem_resumo(quantidade, tipo, mensagens[-1])
+        )
+        .on_conflict_do_update(
+            index_elements=["usuario_id", "tipo"],
+            index_where=tabela.c.agrupando == True,
+            set_={
+                "agrupadas": tabela.c.agrupadas + quantidade,
+                "mensagem": (
+                    literal("Você tem ") + cast(tabela.c.agrupadas + quantidade, String)
+                    + literal(f" novas notificações ({tipo}). Última: {mensagens[-1]}")
+                ),
+                "data_envio": agora,
+            }
+        )
+        .returning(tabela.c.id)
+    )
+    return db.execute(comando).scalar_one()
+
+
+# Versão em lote do criar_notificacao_service (ex.: ingestão de resultados de exame).
+# Não faz commit: roda dentro da transação de quem chamou (notificações e fila de
+# entrega gravam juntas). Mesma regra de agrupamento; sem janela, um INSERT só.
+def criar_notificacoes_em_lote(db: Session, tipo: str, eventos: list[tuple[int, str]]) -> list[int]:
+    """eventos: [(usuario_id, mensagem)], na ordem em que aconteceram. Retorna os ids gravados."""
+    if not eventos:
+        return []
+
+    agora = datetime.now(timezone.utc)
+
+    if tipo not in JANELA_AGRUPAMENTO_POR_TIPO:
+        ids = list(db.execute(
+            insert(Notificacao).returning(Notificacao.id),
+            [
+                {"usuario_id": u, "tipo": tipo, "mensagem": m, "lida": False, "agrupadas": 1, "data_envio": agora}
+                for u, m in eventos
+            ]
+        ).scalars())
+    else:
+        # eventos do mesmo usuário neste lote já viram um só
+        por_usuario: dict[int, list[str]] = {}
+        for usuario_id, mensagem in eventos:
+            por_usuario.setdefault(usuario_id, []).append(mensagem)
+
+        ids = [
+            _agrupar_notificacao(db, usuario_id, tipo, mensagens, agora)
+            for usuario_id, mensagens in por_usuario.items()
+        ]
+
+    enfileirar_entregas(db, ids)
+    return ids
+
+
 # Listar notificações do usuário atual
 def listar_minhas_notificacoes_service(usuario_id: int, db: Session):
     return (
@@ -48,6 +178,273 @@ def marcar_notificacao_lida_service(notificacao_id: int, usuario_id: int, db: Se
         raise HTTPException(status_code=404, detail="Notificação não encontrada.")
 
     notif.lida = True
+    notif.agrupando = False
     db.commit()
     db.refresh(notif)
     return notif
+
+
+# ---------------------------------------------------------
+# Arquivamento — move notificações lidas e vencidas para notificacoes_arquivadas
+# ---------------------------------------------------------
+def _arquivar_lote(db: Session, ids: list[int], agora: datetime) -> int:
+    # INSERT ... SELECT + DELETE do mesmo lote na mesma transação
+    origem = (
+        db.query(
+            Notificacao.id,
+            Notificacao.usuario_id,
+            Notificacao.tipo,
+            Notificacao.mensagem,
+            Notificacao.lida,
+            Notificacao.agrupadas,
+            Notificacao.data_envio,
+            literal(agora).label("arquivada_em"),
+        )
+        .filter(Notificacao.id.in_(ids))
+        .statement
+    )
+
+    db.execute(
+        insert(NotificacaoArquivada).from_select(
+            ["id", "usuario_id", "tipo", "mensagem", "lida", "agrupadas", "data_envio", "arquivada_em"],
+            origem
+        )
+    )
+    db.execute(delete(Notificacao).where(Notificacao.id.in_(ids)))
+    db.commit()
+    return len(ids)
+
+
+def arquivar_notificacoes_service(
+    db: Session,
+    agora: datetime | None = None,
+    tamanho_lote: int = TAMANHO_LOTE_ARQUIVAMENTO
+):
+    agora = agora or datetime.now(timezone.utc)
+
+    tipos = [t for (t,) in db.query(Notificacao.tipo).distinct().all()]
+    arquivadas = {}
+
+    for tipo in tipos:
+        dias = RETENCAO_POR_TIPO_DIAS.get(tipo, RETENCAO_PADRAO_DIAS)
+        limite = agora - timedelta(days=dias)
+        total = 0
+
+        while True:
+            ids = [
+                i for (i,) in db.query(Notificacao.id)
+                .filter(
+                    Notificacao.tipo == tipo,
+                    Notificacao.lida == True,
+                    Notificacao.data_envio < limite
+                )
+                .order_by(Notificacao.id)
+                .limit(tamanho_lote)
+                .all()
+            ]
+            if not ids:
+                break
+            total += _arquivar_lote(db, ids, agora)
+
+        if total:
+            arquivadas[tipo] = total
+
+    return {
+        "arquivadas_por_tipo": arquivadas,
+        "total_arquivadas": sum(arquivadas.values())
+    }
+
+
+# Listar notificações arquivadas do usuário (paginação por cursor = último id recebido)
+def listar_notificacoes_arquivadas_service(
+    usuario_id: int,
+    db: Session,
+    cursor: int | None = None,
+    limite: int = 50
+):
+    query = db.query(NotificacaoArquivada).filter(NotificacaoArquivada.usuario_id == usuario_id)
+
+    if cursor is not None:
+        query = query.filter(NotificacaoArquivada.id < cursor)
+
+    # busca um a mais só pra saber se existe próxima página
+    itens = query.order_by(NotificacaoArquivada.id.desc()).limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo_cursor = itens[-1].id
+
+    return {"itens": itens, "proximo_cursor": proximo_cursor}
+
+
+# ---------------------------------------------------------
+# Envio em massa (broadcast) — todos, role, tipo_profissional ou lista
+# ---------------------------------------------------------
+def _query_destinatarios(db: Session, envio: EnvioNotificacao):
+    query = db.query(Usuario.id).filter(Usuario.ativo == True)
+
+    if envio.alvo == "role":
+        if envio.filtro == "paciente":
+            query = query.join(Paciente, Paciente.usuario_id == Usuario.id)
+        elif envio.filtro == "profissional":
+            query = query.join(ProfissionalSaude, ProfissionalSaude.usuario_id == Usuario.id)
+        else:
+            query = query.filter(Usuario.role == envio.filtro)
+
+    elif envio.alvo == "tipo_profissional":
+        query = (
+            query.join(ProfissionalSaude, ProfissionalSaude.usuario_id == Usuario.id)
+            .filter(ProfissionalSaude.tipo_profissional == envio.filtro)
+        )
+
+    return query
+
+
+def _proximo_lote(db: Session, envio: EnvioNotificacao, tamanho_lote: int):
+    """
+    Retorna (ids_destinatarios, novo_checkpoint). Percorre os usuários por id crescente
+    a partir do checkpoint, então nunca reenvia para quem já recebeu.
+    """
+    if envio.alvo == "lista":
+        ids = envio.usuario_ids  # já salvo ordenado e sem repetição
+        inicio = bisect_right(ids, envio.ultimo_usuario_id)
+        candidatos = ids[inicio:inicio + tamanho_lote]
+        if not candidatos:
+            return [], envio.ultimo_usuario_id
+
+        existentes = [
+            i for (i,) in db.query(Usuario.id)
+            .filter(Usuario.id.in_(candidatos), Usuario.ativo == True)
+            .order_by(Usuario.id)
+            .all()
+        ]
+        return existentes, candidatos[-1]
+
+    ids = [
+        i for (i,) in _query_destinatarios(db, envio)
+        .filter(Usuario.id > envio.ultimo_usuario_id)
+        .order_by(Usuario.id)
+        .limit(tamanho_lote)
+        .all()
+    ]
+    return ids, (ids[-1] if ids else envio.ultimo_usuario_id)
+
+
+def criar_envio_service(dados: NotificacaoBroadcastCreate, db: Session) -> EnvioNotificacao:
+    filtro = None
+    if dados.alvo == "role":
+        filtro = dados.role
+    elif dados.alvo == "tipo_profissional":
+        filtro = dados.tipo_profissional
+
+    envio = EnvioNotificacao(
+        tipo=dados.tipo,
+        mensagem=dados.mensagem,
+        alvo=dados.alvo,
+        filtro=filtro,
+        usuario_ids=sorted(set(dados.usuario_ids)) if dados.alvo == "lista" else None,
+        status="pendente"
+    )
+
+    if envio.alvo == "lista":
+        envio.total_destinatarios = len(envio.usuario_ids)
+    else:
+        envio.total_destinatarios = _query_destinatarios(db, envio).count()
+
+    db.add(envio)
+    db.commit()
+    db.refresh(envio)
+    return envio
+
+
+def buscar_envio_service(envio_id: int, db: Session) -> EnvioNotificacao:
+    envio = db.query(EnvioNotificacao).filter(EnvioNotificacao.id == envio_id).first()
+    if not envio:
+        raise HTTPException(status_code=404, detail="Envio não encontrado.")
+    return envio
+
+
+def processar_envio_service(envio_id: int, db: Session, tamanho_lote: int = TAMANHO_LOTE_BROADCAST):
+    # "reserva" o envio com UPDATE condicional — dois workers nunca processam o mesmo envio
+    reservado = (
+        db.query(EnvioNotificacao)
+        .filter(EnvioNotificacao.id == envio_id, EnvioNotificacao.status == "pendente")
+        .update({"status": "em_andamento", "erro": None}, synchronize_session=False)
+    )
+    db.commit()
+    if not reservado:
+        return None
+
+    envio = buscar_envio_service(envio_id, db)
+
+    try:
+        while True:
+            ids, checkpoint = _proximo_lote(db, envio, tamanho_lote)
+
+            if ids:
+                agora = datetime.now(timezone.utc)
+                # executemany — um INSERT em lote por chunk
+                notificacao_ids = db.execute(
+                    insert(Notificacao).returning(Notificacao.id),
+                    [
+                        {
+                            "usuario_id": usuario_id,
+                            "tipo": envio.tipo,
+                            "mensagem": envio.mensagem,
+                            "lida": False,
+                            "data_envio": agora
+                        }
+                        for usuario_id in ids
+                    ]
+                ).scalars().all()
+                enfileirar_entregas(db, notificacao_ids)
+                envio.enviados += len(ids)
+
+            if checkpoint == envio.ultimo_usuario_id:
+                break
+
+            # notificações do lote + fila de entrega + checkpoint no mesmo commit
+            envio.ultimo_usuario_id = checkpoint
+            db.commit()
+
+        envio.status = "concluido"
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        envio.status = "erro"
+        envio.erro = str(e)
+        db.commit()
+
+    db.refresh(envio)
+    return envio
+
+
+def executar_envio_em_background(envio_id: int):
+    # roda fora da requisição, com sessão própria
+    db = SessionLocal()
+    try:
+        processar_envio_service(envio_id, db)
+    finally:
+        db.close()
+
+
+def retomar_envio_service(envio_id: int, db: Session) -> EnvioNotificacao:
+    envio = buscar_envio_service(envio_id, db)
+
+    if envio.status == "concluido":
+        raise HTTPException(status_code=400, detail="Este envio já foi concluído.")
+
+    if envio.status == "em_andamento":
+        atualizado = envio.atualizado_em
+        if atualizado.tzinfo is None:
+            atualizado = atualizado.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) - atualizado < ENVIO_TRAVADO_APOS:
+            raise HTTPException(status_code=409, detail="Este envio ainda está em andamento.")
+
+    # volta para pendente; o processamento continua a partir do checkpoint
+    envio.status = "pendente"
+    db.commit()
+    db.refresh(envio)
+    return envio
@@ -1,12 +1,25 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_, func, insert
+from sqlalchemy.dialects.postgresql import insert as insert_postgres
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
 from fastapi import HTTPException
 from datetime import datetime, timezone
 
+from app.core.compressao import comprimir_texto
+from app.core.paginacao import codificar_cursor, decodificar_cursor
+from app.services.busca_service import indexar_entrada, indexar_entradas
+
 from app.models.prontuario import Prontuario
 from app.models.entrada_prontuario import EntradaProntuario
+from app.models.resumo_prontuario import ResumoProntuario
 from app.schemas.prontuario_schema import EntradaProntuarioCreate
 
 
+# Resumo: quantas entradas recentes guardar e o tamanho do trecho de cada uma
+ULTIMAS_ENTRADAS_RESUMO = 5
+TAMANHO_TRECHO_RESUMO = 200
+
+
 # ---------- Buscar Prontuário ----------
 
 def get_prontuario_by_paciente_id(db: Session, paciente_id: int) -> Prontuario:
@@ -55,25 +68,224 @@ def adicionar_entrada(db: Session, paciente_id: int, dados: EntradaProntuarioCre
     )
 
     db.add(entrada)
+    db.flush()
+
+    # índice de busca textual na mesma transação
+    indexar_entrada(db, entrada.id, prontuario.id, entrada.texto)
 
     # atualizar timestamp do prontuário
     prontuario.ultima_atualizacao = datetime.now(timezone.utc)
     db.add(prontuario)
 
+    # resumo também na mesma transação
+    _atualizar_resumos(db, {prontuario.id: prontuario}, {
+        prontuario.id: [_item_resumo(entrada.id, entrada.tipo, entrada.data_hora, dados.texto, entrada.consulta_id)]
+    })
+
     db.commit()
     db.refresh(entrada)
     return entrada
 
 
-# ---------- Listar Entradas ----------
-def listar_entradas(db: Session, paciente_id: int):
-    prontuario = get_prontuario_by_paciente_id(db, paciente_id)
+# ---------- Adicionar Entradas em lote ----------
 
-    entradas = (
+def adicionar_entradas_em_lote(db: Session, entradas: list[dict]) -> tuple[list[int], set[int]]:
+    """
+    Versão set-based do adicionar_entrada (ex.: ingestão de resultados de exame).
+    entradas: [{"paciente_id", "texto", "tipo", "consulta_id"}]. Não faz commit:
+    roda na transação de quem chamou.
+    Retorna (ids criados, paciente_ids sem prontuário). As entradas desses pacientes
+    não são gravadas; quem chamou reporta o erro (o adicionar_entrada devolve 404).
+    """
+    if not entradas:
+        return [], set()
+
+    prontuarios = {
+        p.paciente_id: p for p in
+        db.query(Prontuario).filter(Prontuario.paciente_id.in_({e["paciente_id"] for e in entradas}))
+    }
+    agora = datetime.now(timezone.utc)
+
+    linhas = [
+        {
+            "prontuario_id": prontuarios[e["paciente_id"]].id,
+            "_texto": comprimir_texto(e["texto"]),
+            "tipo": e.get("tipo") or "anotacao",
+            "consulta_id": e.get("consulta_id"),
+            "data_hora": agora,
+        }
+        for e in entradas if e["paciente_id"] in prontuarios
+    ]
+    sem_prontuario = {e["paciente_id"] for e in entradas} - prontuarios.keys()
+    if not linhas:
+        return [], sem_prontuario
+
+    # um INSERT ... RETURNING para o lote inteiro (ids na ordem das linhas)
+    ids = list(db.scalars(
+        insert(EntradaProntuario).returning(EntradaProntuario.id, sort_by_parameter_order=True),
+        linhas
+    ))
+
+    textos = [e["texto"] for e in entradas if e["paciente_id"] in prontuarios]
+    indexar_entradas(db, [(i, l["prontuario_id"], t) for i, l, t in zip(ids, linhas, textos)])
+
+    itens_por_prontuario: dict[int, list[dict]] = {}
+    for i, l, t in zip(ids, linhas, textos):
+        itens_por_prontuario.setdefault(l["prontuario_id"], []).append(
+            _item_resumo(i, l["tipo"], agora, t, l["consulta_id"])
+        )
+
+    por_id = {p.id: p for p in prontuarios.values() if p.id in itens_por_prontuario}
+    for prontuario in por_id.values():
+        prontuario.ultima_atualizacao = agora
+    _atualizar_resumos(db, por_id, itens_por_prontuario)
+
+    return ids, sem_prontuario
+
+
+# ---------- Resumo do Prontuário ----------
+
+def _item_resumo(id_: int, tipo: str, data_hora: datetime, texto: str | None, consulta_id: int | None) -> dict:
+    texto = texto or ""
+    if len(texto) > TAMANHO_TRECHO_RESUMO:
+        texto = texto[:TAMANHO_TRECHO_RESUMO] + "…"
+    return {
+        "id": id_,
+        "tipo": tipo,
+        # sem fuso, igual ao que volta da coluna DateTime (entrada recém-criada ainda tem tzinfo)
+        "data_hora": data_hora.replace(tzinfo=None).isoformat(),
+        "trecho": texto,
+        "consulta_id": consulta_id,
+    }
+
+
+def _reconstruir_resumo(db: Session, resumo: ResumoProntuario, prontuario: Prontuario):
+    # só roda para resumos recém-criados (ex.: prontuário anterior ao resumo)
+    contagem = dict(
+        db.query(EntradaProntuario.tipo, func.count(EntradaProntuario.id))
+        .filter(EntradaProntuario.prontuario_id == prontuario.id)
+        .group_by(EntradaProntuario.tipo)
+        .all()
+    )
+    ultimas = (
         db.query(EntradaProntuario)
         .filter(EntradaProntuario.prontuario_id == prontuario.id)
-        .order_by(EntradaProntuario.data_hora.desc())
+        .order_by(EntradaProntuario.data_hora.desc(), EntradaProntuario.id.desc())
+        .limit(ULTIMAS_ENTRADAS_RESUMO)
+        .all()
+    )
+
+    resumo.total_entradas = sum(contagem.values())
+    resumo.contagem_por_tipo = contagem
+    resumo.ultimas_entradas = [_item_resumo(e.id, e.tipo, e.data_hora, e.texto, e.consulta_id) for e in ultimas]
+    resumo.ultima_atualizacao = prontuario.ultima_atualizacao
+
+
+def _criar_resumos_faltantes(db: Session, prontuario_ids: list[int]) -> set[int]:
+    """
+    INSERT ... ON CONFLICT DO NOTHING das linhas de resumo (vazias). Duas primeiras
+    entradas simultâneas não colidem na PK: a segunda espera a primeira e não insere.
+    Retorna os prontuario_id criados por ESTA transação (são reconstruídos).
+    """
+    inserir = insert_postgres if db.get_bind().dialect.name == "postgresql" else insert_sqlite
+
+    return set(db.scalars(
+        inserir(ResumoProntuario)
+        .values([
+            {"prontuario_id": i, "total_entradas": 0, "contagem_por_tipo": {}, "ultimas_entradas": []}
+            for i in prontuario_ids
+        ])
+        .on_conflict_do_nothing(index_elements=["prontuario_id"])
+        .returning(ResumoProntuario.prontuario_id)
+    ))
+
+
+def _atualizar_resumos(db: Session, prontuarios: dict[int, Prontuario], itens_por_prontuario: dict[int, list[dict]]):
+    """itens_por_prontuario: {prontuario_id: [item do resumo, do mais antigo ao mais novo]}"""
+    criados = _criar_resumos_faltantes(db, list(prontuarios))
+
+    # FOR UPDATE: duas entradas simultâneas no mesmo prontuário não perdem contagem (Postgres)
+    resumos = {
+        r.prontuario_id: r for r in
+        db.query(ResumoProntuario)
+        .filter(ResumoProntuario.prontuario_id.in_(list(prontuarios)))
+        .with_for_update()
+    }
+
+    for prontuario_id, itens in itens_por_prontuario.items():
+        resumo = resumos[prontuario_id]
+        if prontuario_id in criados:
+            # as entradas já foram gravadas (flush), então a reconstrução já conta com elas
+            _reconstruir_resumo(db, resumo, prontuarios[prontuario_id])
+            continue
+        if not itens:
+            continue
+
+        # JSON: atribui objetos novos para o SQLAlchemy detectar a mudança
+        contagem = dict(resumo.contagem_por_tipo)
+        for item in itens:
+            contagem[item["tipo"]] = contagem.get(item["tipo"], 0) + 1
+        resumo.contagem_por_tipo = contagem
+        resumo.total_entradas += len(itens)
+        resumo.ultimas_entradas = (itens[::-1] + list(resumo.ultimas_entradas))[:ULTIMAS_ENTRADAS_RESUMO]
+        resumo.ultima_atualizacao = prontuarios[prontuario_id].ultima_atualizacao
+
+
+def obter_resumo(db: Session, paciente_id: int) -> ResumoProntuario:
+    prontuario = get_prontuario_by_paciente_id(db, paciente_id)
+
+    resumo = db.query(ResumoProntuario).filter(ResumoProntuario.prontuario_id == prontuario.id).first()
+    if not resumo:
+        # mesmo caminho da escrita: se outra requisição criar o resumo antes, só lê o dela
+        _atualizar_resumos(db, {prontuario.id: prontuario}, {prontuario.id: []})
+        db.commit()
+        resumo = db.query(ResumoProntuario).filter(ResumoProntuario.prontuario_id == prontuario.id).one()
+
+    return resumo
+
+
+# ---------- Listar Entradas (paginado por cursor) ----------
+def listar_entradas(
+    db: Session,
+    paciente_id: int,
+    cursor: str | None = None,
+    limite: int = 50,
+    tipo: str | None = None,
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    consulta_id: int | None = None
+):
+    prontuario = get_prontuario_by_paciente_id(db, paciente_id)
+
+    query = db.query(EntradaProntuario).filter(EntradaProntuario.prontuario_id == prontuario.id)
+
+    if tipo:
+        query = query.filter(EntradaProntuario.tipo == tipo)
+    if de:
+        query = query.filter(EntradaProntuario.data_hora >= de)
+    if ate:
+        query = query.filter(EntradaProntuario.data_hora < ate)
+    if consulta_id is not None:
+        query = query.filter(EntradaProntuario.consulta_id == consulta_id)
+
+    # keyset: continua logo depois da última entrada da página anterior
+    if cursor:
+        cursor_data, cursor_id = decodificar_cursor(cursor)[:2]
+        query = query.filter(or_(
+            EntradaProntuario.data_hora < cursor_data,
+            and_(EntradaProntuario.data_hora == cursor_data, EntradaProntuario.id < cursor_id)
+        ))
+
+    entradas = (
+        query.order_by(EntradaProntuario.data_hora.desc(), EntradaProntuario.id.desc())
+        .limit(limite + 1)
         .all()
     )
 
-    return entradas
+    proximo_cursor = None
+    if len(entradas) > limite:
+        entradas = entradas[:limite]
+        ultima = entradas[-1]
+        proximo_cursor = codificar_cursor(ultima.data_hora, ultima.id)
+
+    return {"itens": entradas, "proximo_cursor": proximo_cursor}
@@ -1,17 +1,125 @@
+from datetime import date, datetime, time, timedelta, timezone
+
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select, text, literal_column, bindparam, Date, DateTime
+from app.core.cache_relatorios import em_cache, invalidar_relatorios
 from app.models.consulta import Consulta
+from app.models.evento_consulta import EventoConsulta
 from app.models.profissional_saude import ProfissionalSaude
+from app.models.contador_consulta import (
+    ContadorConsultaStatus,
+    ContadorConsultaMes,
+    ContadorConsultaProfissional
+)
+
+
+# Relatórios calculados sobre consultas: as escritas de consulta invalidam o cache deles
+RELATORIOS_CONSULTAS = (
+    "consultas_por_status", "consultas_por_mes", "consultas_por_periodo", "consultas_por_profissional",
+    "ocupacao_agendas", "cancelamentos_consultas", "cancelamentos_pacientes"
+)
+
 
+def invalidar_relatorios_consultas():
+    invalidar_relatorios(*RELATORIOS_CONSULTAS)
 
-# 1) Consultas por status
-def consultas_por_status_service(db: Session):
-    resultados = (
-        db.query(Consulta.status, func.count(Consulta.id))
-        .group_by(Consulta.status)
+
+# ---------------------------------------------------------
+# Período (dia / semana / mês) em SQL de cada banco
+# dia → "AAAA-MM-DD"; semana → segunda-feira da semana (ISO), "AAAA-MM-DD";
+# mês → "AAAA-MM". Mesmo texto no SQLite e no PostgreSQL.
+# ---------------------------------------------------------
+GRANULARIDADES = ("dia", "semana", "mes")
+
+
+def _periodo_de(dialeto: str, coluna: str, granularidade: str) -> str:
+    if dialeto == "postgresql":
+        return {
+            "dia": f"to_char({coluna}, 'YYYY-MM-DD')",
+            "semana": f"to_char(date_trunc('week', {coluna}), 'YYYY-MM-DD')",
+            "mes": f"to_char({coluna}, 'YYYY-MM')",
+        }[granularidade]
+    return {
+        "dia": f"date({coluna})",
+        # volta 6 dias e avança até a próxima segunda (ou fica, se já for segunda)
+        "semana": f"date({coluna}, '-6 days', 'weekday 1')",
+        "mes": f"strftime('%Y-%m', {coluna})",
+    }[granularidade]
+
+
+def _validar_periodo(de: date | datetime | None, ate: date | datetime | None):
+    if de and ate and de >= ate:
+        raise HTTPException(status_code=400, detail="'de' deve ser anterior a 'ate'.")
+
+
+def _filtrar_consultas(
+    query,
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    profissional_id: int | None = None,
+    tipo_profissional: str | None = None,
+    status: str | None = None
+):
+    # faixa em data_hora (meio-aberta): usa ix_consultas_data_hora_status ou
+    # ix_consultas_profissional_data, nunca uma função sobre a coluna
+    if de:
+        query = query.filter(Consulta.data_hora >= de)
+    if ate:
+        query = query.filter(Consulta.data_hora < ate)
+    if profissional_id:
+        query = query.filter(Consulta.profissional_id == profissional_id)
+    if tipo_profissional:
+        query = query.filter(Consulta.profissional_id.in_(
+            select(ProfissionalSaude.id).where(ProfissionalSaude.tipo_profissional == tipo_profissional)
+        ))
+    if status:
+        query = query.filter(Consulta.status == status)
+    return query
+
+
+def _contar_por_periodo(db: Session, granularidade: str, **filtros) -> list[tuple[str, int]]:
+    periodo = literal_column(_periodo_de(db.get_bind().dialect.name, "consultas.data_hora", granularidade))
+    return (
+        _filtrar_consultas(db.query(periodo.label("periodo"), func.count(Consulta.id)), **filtros)
+        .group_by(periodo)
+        .order_by(periodo)
         .all()
     )
 
+
+# ---------------------------------------------------------
+# 1) a 3) Consultas por status / período / profissional
+# Sem filtros, leem os contadores mantidos pelo consulta_service
+# (contador_service): poucas linhas, qualquer que seja o volume de consultas.
+# Com período ou filtros, agregam só a faixa pedida da tabela de consultas.
+# ---------------------------------------------------------
+@em_cache("consultas_por_status")
+def consultas_por_status_service(
+    db: Session,
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    profissional_id: int | None = None,
+    tipo_profissional: str | None = None
+):
+    _validar_periodo(de, ate)
+
+    if not (de or ate or profissional_id or tipo_profissional):
+        resultados = (
+            db.query(ContadorConsultaStatus.status, ContadorConsultaStatus.total)
+            .filter(ContadorConsultaStatus.total > 0)
+            .all()
+        )
+    else:
+        resultados = (
+            _filtrar_consultas(
+                db.query(Consulta.status, func.count(Consulta.id)),
+                de, ate, profissional_id, tipo_profissional
+            )
+            .group_by(Consulta.status)
+            .all()
+        )
+
     return {
         "consultas_por_status": {
             status: quantidade for status, quantidade in resultados
@@ -19,17 +127,29 @@ def consultas_por_status_service(db: Session):
     }
 
 
-# 2) Consultas por mês
-def consultas_por_mes_service(db: Session):
-    resultados = (
-        db.query(
-            func.strftime("%Y-%m", Consulta.data_hora).label("mes"),
-            func.count(Consulta.id)
+@em_cache("consultas_por_mes")
+def consultas_por_mes_service(
+    db: Session,
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    profissional_id: int | None = None,
+    tipo_profissional: str | None = None,
+    status: str | None = None
+):
+    _validar_periodo(de, ate)
+
+    if not (de or ate or profissional_id or tipo_profissional or status):
+        resultados = (
+            db.query(ContadorConsultaMes.mes, ContadorConsultaMes.total)
+            .filter(ContadorConsultaMes.total > 0)
+            .order_by(ContadorConsultaMes.mes)
+            .all()
+        )
+    else:
+        resultados = _contar_por_periodo(
+            db, "mes", de=de, ate=ate, profissional_id=profissional_id,
+            tipo_profissional=tipo_profissional, status=status
         )
-        .group_by("mes")
-        .order_by("mes")
-        .all()
-    )
 
     return {
         "consultas_por_mes": [
@@ -39,19 +159,79 @@ def consultas_por_mes_service(db: Session):
     }
 
 
-# 3) Consultas por profissional
-def consultas_por_profissional_service(db: Session):
-    resultados = (
-        db.query(
-            ProfissionalSaude.id,
-            ProfissionalSaude.tipo_profissional,
-            func.count(Consulta.id)
-        )
-        .join(Consulta, Consulta.profissional_id == ProfissionalSaude.id)
-        .group_by(ProfissionalSaude.id)
-        .all()
+@em_cache("consultas_por_periodo")
+def consultas_por_periodo_service(
+    db: Session,
+    granularidade: str = "dia",
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    profissional_id: int | None = None,
+    tipo_profissional: str | None = None,
+    status: str | None = None
+):
+    if granularidade not in GRANULARIDADES:
+        raise HTTPException(status_code=400, detail="Granularidade inválida.")
+    _validar_periodo(de, ate)
+
+    # sem período: últimos 90 dias (evita varrer a tabela toda em granularidade diária)
+    ate = ate or datetime.now(timezone.utc)
+    de = de or ate - timedelta(days=90)
+
+    resultados = _contar_por_periodo(
+        db, granularidade, de=de, ate=ate, profissional_id=profissional_id,
+        tipo_profissional=tipo_profissional, status=status
     )
 
+    return {
+        "granularidade": granularidade,
+        "de": de,
+        "ate": ate,
+        "consultas_por_periodo": [
+            {"periodo": periodo, "total": total}
+            for periodo, total in resultados
+        ]
+    }
+
+
+@em_cache("consultas_por_profissional")
+def consultas_por_profissional_service(
+    db: Session,
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    tipo_profissional: str | None = None,
+    status: str | None = None
+):
+    _validar_periodo(de, ate)
+
+    if not (de or ate or status):
+        query = (
+            db.query(
+                ProfissionalSaude.id,
+                ProfissionalSaude.tipo_profissional,
+                ContadorConsultaProfissional.total
+            )
+            .join(ContadorConsultaProfissional, ContadorConsultaProfissional.profissional_id == ProfissionalSaude.id)
+            .filter(ContadorConsultaProfissional.total > 0)
+        )
+    else:
+        totais = (
+            _filtrar_consultas(
+                db.query(Consulta.profissional_id, func.count(Consulta.id).label("total")),
+                de, ate, status=status
+            )
+            .group_by(Consulta.profissional_id)
+            .subquery()
+        )
+        query = (
+            db.query(ProfissionalSaude.id, ProfissionalSaude.tipo_profissional, totais.c.total)
+            .join(totais, totais.c.profissional_id == ProfissionalSaude.id)
+        )
+
+    if tipo_profissional:
+        query = query.filter(ProfissionalSaude.tipo_profissional == tipo_profissional)
+
+    resultados = query.order_by(ProfissionalSaude.id).all()
+
     return {
         "consultas_por_profissional": [
             {
@@ -62,3 +242,455 @@ def consultas_por_profissional_service(db: Session):
             for prof_id, tipo, total in resultados
         ]
     }
+
+
+# ---------------------------------------------------------
+# 4) Tempo de resposta dos exames (turnaround), em horas
+# Percentis por tipo de exame, profissional solicitante ou período (dia/semana/mês).
+#
+# etapa:
+#   total    → criado_em    até concluido_em
+#   fila     → criado_em    até iniciado_em  (esperando o laboratório)
+#   execucao → iniciado_em  até concluido_em
+#
+# O período filtra a coluna do FIM da etapa, numa faixa do índice
+# ix_exames_concluido / ix_exames_iniciado (que já têm as demais colunas).
+#
+# Percentis: o banco agrupa as durações em faixas de FAIXA_HORAS (histograma) e
+# o Python acumula as contagens. Fica exato até 6 minutos e evita ordenar todas
+# as linhas (ROW_NUMBER por grupo levava ~2x mais tempo em 5M exames).
+# ---------------------------------------------------------
+ETAPAS_EXAME = {
+    "total": ("criado_em", "concluido_em"),
+    "fila": ("criado_em", "iniciado_em"),
+    "execucao": ("iniciado_em", "concluido_em"),
+}
+
+AGRUPAMENTOS_EXAME = {"tipo_exame", "profissional", *GRANULARIDADES}
+PERCENTIS = (50, 90, 95)
+FAIXA_HORAS = 0.1
+
+
+def _horas_entre(dialeto: str, inicio: str, fim: str) -> str:
+    if dialeto == "postgresql":
+        return f"EXTRACT(EPOCH FROM ({fim} - {inicio})) / 3600.0"
+    return f"(julianday({fim}) - julianday({inicio})) * 24.0"
+
+
+def _faixa(dialeto: str, expressao: str) -> str:
+    # CAST no Postgres arredonda; FLOOR deixa igual ao SQLite (trunca)
+    if dialeto == "postgresql":
+        return f"FLOOR({expressao} / {FAIXA_HORAS})"
+    return f"CAST({expressao} / {FAIXA_HORAS} AS INTEGER)"
+
+
+def _percentis_do_histograma(faixas: list[tuple[int, int]], total: int, maximo: float) -> dict:
+    """faixas: [(faixa, quantidade)] em ordem. Nearest-rank; devolve o fim da faixa (limitado ao máximo)."""
+    resultado = {}
+    acumulado = 0
+    pendentes = list(PERCENTIS)
+    for faixa, quantidade in faixas:
+        acumulado += quantidade
+        while pendentes and acumulado * 100 >= pendentes[0] * total:
+            resultado[f"p{pendentes.pop(0)}"] = round(min((faixa + 1) * FAIXA_HORAS, maximo), 2)
+        if not pendentes:
+            break
+    return resultado
+
+
+# sem invalidação: as mudanças de exame aparecem em até TTL_RELATORIOS_SEGUNDOS
+@em_cache("tempo_resposta_exames")
+def tempo_resposta_exames_service(
+    db: Session,
+    agrupar: str = "tipo_exame",
+    etapa: str = "total",
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    tipo_exame: str | None = None,
+    profissional_id: int | None = None
+):
+    _validar_periodo(de, ate)
+    if agrupar not in AGRUPAMENTOS_EXAME or etapa not in ETAPAS_EXAME:
+        raise HTTPException(status_code=400, detail="Agrupamento ou etapa inválidos.")
+
+    ate = ate or datetime.now(timezone.utc)
+    de = de or ate - timedelta(days=90)
+    dialeto = db.get_bind().dialect.name
+
+    inicio, fim = ETAPAS_EXAME[etapa]
+    grupo = {
+        "tipo_exame": "tipo_exame",
+        "profissional": "profissional_id",
+    }.get(agrupar) or _periodo_de(dialeto, fim, agrupar)
+
+    parametros = {"de": de, "ate": ate}
+    filtros = ""
+    if tipo_exame:
+        filtros += " AND tipo_exame = :tipo_exame"
+        parametros["tipo_exame"] = tipo_exame
+    if profissional_id:
+        filtros += " AND profissional_id = :profissional_id"
+        parametros["profissional_id"] = profissional_id
+
+    sql = f"""
+        SELECT grupo, {_faixa(dialeto, "horas")} AS faixa,
+               COUNT(*) AS quantidade, SUM(horas) AS soma, MAX(horas) AS maximo
+        FROM (
+            SELECT {grupo} AS grupo, {_horas_entre(dialeto, inicio, fim)} AS horas
+            FROM exames
+            WHERE {fim} >= :de AND {fim} < :ate
+              AND {inicio} IS NOT NULL{filtros}
+        ) base
+        GROUP BY grupo, faixa
+        ORDER BY grupo, faixa
+    """
+
+    # DateTime tipado: o SQLite compara no mesmo formato de texto em que grava
+    stmt = text(sql).bindparams(bindparam("de", type_=DateTime), bindparam("ate", type_=DateTime))
+
+    histogramas: dict = {}
+    for linha in db.execute(stmt, parametros):
+        h = histogramas.setdefault(linha.grupo, {"faixas": [], "quantidade": 0, "soma": 0.0, "maximo": 0.0})
+        h["faixas"].append((linha.faixa, linha.quantidade))
+        h["quantidade"] += linha.quantidade
+        h["soma"] += linha.soma
+        h["maximo"] = max(h["maximo"], linha.maximo)
+
+    grupos = [
+        {
+            "grupo": g,
+            "quantidade": h["quantidade"],
+            "media": round(h["soma"] / h["quantidade"], 2),
+            "maximo": round(h["maximo"], 2),
+            **_percentis_do_histograma(h["faixas"], h["quantidade"], h["maximo"]),
+        }
+        for g, h in histogramas.items()
+    ]
+
+    return {
+        "agrupar": agrupar,
+        "etapa": etapa,
+        "de": de,
+        "ate": ate,
+        "unidade": "horas",
+        "grupos": grupos,
+    }
+
+
+# ---------------------------------------------------------
+# 5) Ocupação das agendas: horários ofertados × consultas
+# Por profissional ou por tipo de profissional, em dia/semana/mês.
+#
+# Uma consulta só: cada tabela é agregada na sua faixa de índice
+# (ix_agendas_data / ix_consultas_*) e as duas agregações se juntam por
+# UNION ALL + GROUP BY. Não há JOIN horário a horário entre agendas
+# (data, hora) e consultas (data_hora).
+# Um ano de 500 profissionais (2,1M horários, 1,6M consultas): ~3 s no SQLite;
+# por isso o período padrão é curto e o resultado fica no cache.
+#
+#   ofertados   → horários na agenda
+#   livres      → horários ainda disponíveis
+#   reservados  → consultas não canceladas (agendada, confirmada, finalizada)
+# ---------------------------------------------------------
+AGRUPAMENTOS_OCUPACAO = {"profissional", "tipo_profissional"}
+
+
+def _taxa(parte: int, todo: int) -> float | None:
+    return round(parte / todo, 3) if todo else None
+
+
+@em_cache("ocupacao_agendas")
+def ocupacao_agendas_service(
+    db: Session,
+    agrupar: str = "profissional",
+    granularidade: str = "semana",
+    de: date | None = None,
+    ate: date | None = None,
+    profissional_id: int | None = None,
+    tipo_profissional: str | None = None
+):
+    if agrupar not in AGRUPAMENTOS_OCUPACAO or granularidade not in GRANULARIDADES:
+        raise HTTPException(status_code=400, detail="Agrupamento ou granularidade inválidos.")
+
+    # sem período: 30 dias para trás e 30 para frente (inclui o que já está marcado)
+    hoje = date.today()
+    de = de or hoje - timedelta(days=30)
+    ate = ate or hoje + timedelta(days=30)
+    _validar_periodo(de, ate)
+
+    dialeto = db.get_bind().dialect.name
+
+    filtros = ""
+    parametros = {
+        "de": de, "ate": ate,
+        "de_hora": datetime.combine(de, time.min), "ate_hora": datetime.combine(ate, time.min),
+    }
+    if profissional_id:
+        filtros += " AND profissional_id = :profissional_id"
+        parametros["profissional_id"] = profissional_id
+    if tipo_profissional:
+        filtros += " AND profissional_id IN (SELECT id FROM profissionais_saude WHERE tipo_profissional = :tipo_profissional)"
+        parametros["tipo_profissional"] = tipo_profissional
+
+    grupo = "p.id" if agrupar == "profissional" else "p.tipo_profissional"
+
+    sql = f"""
+        SELECT {grupo} AS grupo, MIN(p.tipo_profissional) AS tipo, u.periodo AS periodo,
+               SUM(u.ofertados) AS ofertados, SUM(u.livres) AS livres,
+               SUM(u.reservados) AS reservados, SUM(u.cancelados) AS cancelados,
+               SUM(u.finalizados) AS finalizados
+        FROM (
+            SELECT profissional_id, {_periodo_de(dialeto, "data", granularidade)} AS periodo,
+                   SUM(ofertados) AS ofertados, SUM(livres) AS livres,
+                   0 AS reservados, 0 AS cancelados, 0 AS finalizados
+            FROM (
+                -- por (data, profissional) na ordem do ix_agendas_data, sem ordenar;
+                -- o período é calculado depois, sobre poucas linhas
+                SELECT profissional_id, data, COUNT(*) AS ofertados,
+                       SUM(CASE WHEN disponivel THEN 1 ELSE 0 END) AS livres
+                FROM agendas
+                WHERE data >= :de AND data < :ate{filtros}
+                GROUP BY data, profissional_id
+            ) a
+            GROUP BY profissional_id, periodo
+
+            UNION ALL
+
+            SELECT profissional_id, {_periodo_de(dialeto, "data_hora", granularidade)} AS periodo,
+                   0, 0,
+                   SUM(CASE WHEN status <> 'cancelada' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN status = 'cancelada' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN status = 'finalizada' THEN 1 ELSE 0 END)
+            FROM consultas
+            WHERE data_hora >= :de_hora AND data_hora < :ate_hora{filtros}
+            GROUP BY profissional_id, periodo
+        ) u
+        JOIN profissionais_saude p ON p.id = u.profissional_id
+        GROUP BY {grupo}, u.periodo
+        ORDER BY {grupo}, u.periodo
+    """
+
+    stmt = text(sql).bindparams(
+        bindparam("de", type_=Date), bindparam("ate", type_=Date),
+        bindparam("de_hora", type_=DateTime), bindparam("ate_hora", type_=DateTime)
+    )
+
+    grupos = [
+        {
+            "grupo": linha.grupo,
+            **({"tipo": linha.tipo} if agrupar == "profissional" else {}),
+            "periodo": linha.periodo,
+            "ofertados": linha.ofertados,
+            "livres": linha.livres,
+            "reservados": linha.reservados,
+            "cancelados": linha.cancelados,
+            "finalizados": linha.finalizados,
+            "taxa_ocupacao": _taxa(linha.reservados, linha.ofertados),
+            "taxa_cancelamento": _taxa(linha.cancelados, linha.reservados + linha.cancelados),
+        }
+        for linha in db.execute(stmt, parametros)
+    ]
+
+    return {
+        "agrupar": agrupar,
+        "granularidade": granularidade,
+        "de": de,
+        "ate": ate,
+        "grupos": grupos,
+    }
+
+
+# ---------------------------------------------------------
+# 6) Cancelamentos e não comparecimento (histórico eventos_consultas)
+#
+# Coorte: consultas AGENDADAS no período (evento "agendada", sempre o primeiro).
+# O desfecho de cada uma é o último evento (LAST_VALUE por consulta), mesmo que
+# tenha acontecido depois do período. O custo cresce com o período, não com a
+# tabela: ~2 s por mês com 130 mil agendamentos (3,5M eventos no total, SQLite).
+#
+#   nao_compareceu        → a data da consulta passou e ela ficou agendada/confirmada
+#   cancelamentos_tardios → canceladas a menos de HORAS_CANCELAMENTO_TARDIO da consulta
+# ---------------------------------------------------------
+AGRUPAMENTOS_CANCELAMENTO = {"todas", "profissional", "tipo_profissional"}
+HORAS_CANCELAMENTO_TARDIO = 24
+
+
+def _media(valor: float | None) -> float | None:
+    return round(valor, 2) if valor is not None else None
+
+
+@em_cache("cancelamentos_consultas")
+def cancelamentos_service(
+    db: Session,
+    agrupar: str = "todas",
+    granularidade: str = "mes",
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    profissional_id: int | None = None,
+    tipo_profissional: str | None = None
+):
+    if agrupar not in AGRUPAMENTOS_CANCELAMENTO or granularidade not in GRANULARIDADES:
+        raise HTTPException(status_code=400, detail="Agrupamento ou granularidade inválidos.")
+    _validar_periodo(de, ate)
+
+    agora = datetime.now(timezone.utc)
+    ate = ate or agora
+    de = de or ate - timedelta(days=90)
+    dialeto = db.get_bind().dialect.name
+
+    parametros = {"de": de, "ate": ate, "agora": agora, "tardio": HORAS_CANCELAMENTO_TARDIO}
+    filtros = ""
+    if profissional_id:
+        filtros += " AND profissional_id = :profissional_id"
+        parametros["profissional_id"] = profissional_id
+    if tipo_profissional:
+        filtros += " AND profissional_id IN (SELECT id FROM profissionais_saude WHERE tipo_profissional = :tipo_profissional)"
+        parametros["tipo_profissional"] = tipo_profissional
+
+    grupo = {"todas": "'todas'", "profissional": "p.id", "tipo_profissional": "p.tipo_profissional"}[agrupar]
+    cancelada = "c.status_final = 'cancelada'"
+    antecedencia = _horas_entre(dialeto, "c.desfecho_em", "c.data_hora_final")
+
+    # Uma passada com janela por consulta, na ordem do ix_eventos_consultas_consulta:
+    # a 1ª linha é o agendamento e LAST_VALUE traz o desfecho (status, quando, data da consulta).
+    sql = f"""
+        WITH consultas_do_periodo AS (
+            SELECT consulta_id, profissional_id, ocorrido_em AS agendada_em,
+                   ROW_NUMBER() OVER w AS ordem,
+                   LAST_VALUE(status_novo) OVER inteira AS status_final,
+                   LAST_VALUE(ocorrido_em) OVER inteira AS desfecho_em,
+                   LAST_VALUE(data_hora_consulta) OVER inteira AS data_hora_final
+            FROM eventos_consultas
+            WHERE consulta_id IN (
+                SELECT consulta_id FROM eventos_consultas
+                WHERE status_novo = 'agendada' AND ocorrido_em >= :de AND ocorrido_em < :ate{filtros}
+            )
+            WINDOW w AS (PARTITION BY consulta_id ORDER BY ocorrido_em, id),
+                   inteira AS (w ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+        )
+        SELECT {grupo} AS grupo, {_periodo_de(dialeto, "c.agendada_em", granularidade)} AS periodo,
+               COUNT(*) AS agendadas,
+               SUM(CASE WHEN {cancelada} THEN 1 ELSE 0 END) AS canceladas,
+               SUM(CASE WHEN {cancelada} AND {antecedencia} < :tardio THEN 1 ELSE 0 END) AS cancelamentos_tardios,
+               SUM(CASE WHEN c.status_final = 'finalizada' THEN 1 ELSE 0 END) AS finalizadas,
+               SUM(CASE WHEN c.status_final IN ('agendada', 'confirmada') AND c.data_hora_final < :agora
+                        THEN 1 ELSE 0 END) AS nao_compareceu,
+               AVG(CASE WHEN {cancelada} THEN {_horas_entre(dialeto, "c.agendada_em", "c.desfecho_em")} END) AS horas_ate_cancelar,
+               AVG(CASE WHEN {cancelada} THEN {antecedencia} END) AS antecedencia_horas
+        FROM consultas_do_periodo c
+        JOIN profissionais_saude p ON p.id = c.profissional_id
+        WHERE c.ordem = 1
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """
+
+    stmt = text(sql).bindparams(
+        bindparam("de", type_=DateTime), bindparam("ate", type_=DateTime), bindparam("agora", type_=DateTime)
+    )
+
+    grupos = [
+        {
+            "grupo": linha.grupo,
+            "periodo": linha.periodo,
+            "agendadas": linha.agendadas,
+            "canceladas": linha.canceladas,
+            "finalizadas": linha.finalizadas,
+            "nao_compareceu": linha.nao_compareceu,
+            "cancelamentos_tardios": linha.cancelamentos_tardios,
+            "taxa_cancelamento": _taxa(linha.canceladas, linha.agendadas),
+            "taxa_nao_comparecimento": _taxa(linha.nao_compareceu, linha.agendadas),
+            "horas_ate_cancelar": _media(linha.horas_ate_cancelar),
+            "antecedencia_horas": _media(linha.antecedencia_horas),
+        }
+        for linha in db.execute(stmt, parametros)
+    ]
+
+    return {
+        "agrupar": agrupar,
+        "granularidade": granularidade,
+        "de": de,
+        "ate": ate,
+        "grupos": grupos,
+    }
+
+
+# Pacientes que cancelam com frequência: ranking por número de cancelamentos no
+# período. COUNT/LAG por paciente (janela) dão o total e o intervalo entre
+# cancelamentos seguidos sem subconsulta por paciente. Paginado por pagina/limite.
+@em_cache("cancelamentos_pacientes")
+def cancelamentos_por_paciente_service(
+    db: Session,
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    minimo: int = 2,
+    pagina: int = 1,
+    limite: int = 50
+):
+    _validar_periodo(de, ate)
+
+    ate = ate or datetime.now(timezone.utc)
+    de = de or ate - timedelta(days=365)
+    dialeto = db.get_bind().dialect.name
+
+    parametros = {
+        "de": de, "ate": ate, "minimo": minimo, "tardio": HORAS_CANCELAMENTO_TARDIO,
+        "limite": limite, "offset": (pagina - 1) * limite,
+    }
+
+    sql = f"""
+        WITH cancelamentos AS (
+            SELECT paciente_id, ocorrido_em, data_hora_consulta,
+                   COUNT(*) OVER (PARTITION BY paciente_id) AS total,
+                   LAG(ocorrido_em) OVER (PARTITION BY paciente_id ORDER BY ocorrido_em) AS anterior
+            FROM eventos_consultas
+            WHERE status_novo = 'cancelada' AND ocorrido_em >= :de AND ocorrido_em < :ate
+        )
+        SELECT paciente_id, total,
+               RANK() OVER (ORDER BY total DESC) AS posicao,
+               MIN(ocorrido_em) AS primeiro, MAX(ocorrido_em) AS ultimo,
+               AVG({_horas_entre(dialeto, "anterior", "ocorrido_em")}) / 24.0 AS dias_entre,
+               SUM(CASE WHEN {_horas_entre(dialeto, "ocorrido_em", "data_hora_consulta")} < :tardio
+                        THEN 1 ELSE 0 END) AS tardios
+        FROM cancelamentos
+        WHERE total >= :minimo
+        GROUP BY paciente_id, total
+        ORDER BY total DESC, paciente_id
+        LIMIT :limite OFFSET :offset
+    """
+
+    stmt = text(sql).bindparams(
+        bindparam("de", type_=DateTime), bindparam("ate", type_=DateTime)
+    ).columns(primeiro=DateTime, ultimo=DateTime)
+    linhas = db.execute(stmt, parametros).all()
+
+    # agendamentos no mesmo período, só dos pacientes desta página
+    agendamentos = {}
+    if linhas:
+        agendamentos = dict(
+            db.query(EventoConsulta.paciente_id, func.count(EventoConsulta.id))
+            .filter(
+                EventoConsulta.paciente_id.in_([l.paciente_id for l in linhas]),
+                EventoConsulta.status_novo == "agendada",
+                EventoConsulta.ocorrido_em >= de,
+                EventoConsulta.ocorrido_em < ate
+            )
+            .group_by(EventoConsulta.paciente_id)
+            .all()
+        )
+
+    itens = [
+        {
+            "paciente_id": l.paciente_id,
+            "posicao": l.posicao,
+            "cancelamentos": l.total,
+            "agendamentos": agendamentos.get(l.paciente_id, 0),
+            "taxa_cancelamento": _taxa(l.total, agendamentos.get(l.paciente_id, 0)),
+            "cancelamentos_tardios": l.tardios,
+            "dias_entre_cancelamentos": _media(l.dias_entre),
+            "primeiro_cancelamento": l.primeiro,
+            "ultimo_cancelamento": l.ultimo,
+        }
+        for l in linhas
+    ]
+
+    return {"itens": itens, "pagina": pagina, "limite": limite, "de": de, "ate": ate}
@@ -0,0 +1,314 @@
+import inspect
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, SessionLeitura
+from app.models.tarefa_relatorio import TarefaRelatorio
+from app.services import relatorio_service
+from app.services.exportacao_service import exportar_pacientes_service
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------
+# Relatórios em background
+# POST cria a tarefa e devolve o id na hora; um pool pequeno de threads roda o
+# relatório numa sessão de LEITURA (SessionLeitura) e grava o JSON em disco.
+# O cliente consulta o status e baixa o resultado até expira_em.
+#
+# O pool é por processo: TAREFAS_SIMULTANEAS relatórios rodando e no máximo
+# MAXIMO_TAREFAS_EM_ABERTO aceitas (na fila + rodando); acima disso, 429.
+#
+# Com vários workers/instâncias no mesmo banco, cada tarefa guarda a instância
+# que a aceitou e uma reserva (reservada_ate) que essa instância renova a cada
+# INTERVALO_RENOVACAO segundos. Só vira erro a tarefa cuja reserva venceu — a
+# dona caiu — nunca a que está na fila de outro processo vivo.
+# ---------------------------------------------------------
+DIRETORIO_RELATORIOS = os.getenv("SGHSS_DIRETORIO_RELATORIOS", "./resultados_relatorios")
+TAREFAS_SIMULTANEAS = int(os.getenv("SGHSS_TAREFAS_RELATORIOS", "2"))
+MAXIMO_TAREFAS_EM_ABERTO = 20
+VALIDADE_RESULTADO_HORAS = 24
+INTERVALO_EXPIRACAO = 600
+INTERVALO_RENOVACAO = 30
+DURACAO_RESERVA = timedelta(minutes=2)
+
+# fixe SGHSS_INSTANCIA para que um reinício recupere na hora as tarefas da instância anterior
+INSTANCIA = os.getenv("SGHSS_INSTANCIA") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+RELATORIOS_ASSINCRONOS = {
+    "consultas_por_status": relatorio_service.consultas_por_status_service,
+    "consultas_por_mes": relatorio_service.consultas_por_mes_service,
+    "consultas_por_periodo": relatorio_service.consultas_por_periodo_service,
+    "consultas_por_profissional": relatorio_service.consultas_por_profissional_service,
+    "tempo_resposta_exames": relatorio_service.tempo_resposta_exames_service,
+    "ocupacao_agendas": relatorio_service.ocupacao_agendas_service,
+    "cancelamentos_consultas": relatorio_service.cancelamentos_service,
+    "cancelamentos_pacientes": relatorio_service.cancelamentos_por_paciente_service,
+    "exportacao_pacientes": exportar_pacientes_service,
+}
+
+_executor: ThreadPoolExecutor | None = None
+_em_aberto = 0
+_lock = threading.Lock()
+
+
+def caminho_resultado(tarefa_id: int) -> str:
+    return os.path.join(DIRETORIO_RELATORIOS, f"{tarefa_id}.json")
+
+
+def _converter_parametros(relatorio: str, parametros: dict) -> dict:
+    """Valida nomes e tipos pela assinatura da função do relatório (datas chegam como texto)."""
+    funcao = RELATORIOS_ASSINCRONOS.get(relatorio)
+    if funcao is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Relatório desconhecido. Disponíveis: {', '.join(sorted(RELATORIOS_ASSINCRONOS))}."
+        )
+
+    assinatura = inspect.signature(funcao).parameters
+    convertidos = {}
+    for nome, valor in parametros.items():
+        if nome == "db" or nome not in assinatura:
+            raise HTTPException(status_code=400, detail=f"Parâmetro '{nome}' não existe em '{relatorio}'.")
+        try:
+            convertidos[nome] = TypeAdapter(assinatura[nome].annotation).validate_python(valor)
+        except ValidationError:
+            raise HTTPException(status_code=400, detail=f"Valor inválido para '{nome}'.")
+    return convertidos
+
+
+def _escrever_json(arquivo, resultado):
+    # relatório que devolve um gerador (ex.: exportação de todos os pacientes)
+    # vira uma lista JSON escrita item a item, sem montar tudo na memória
+    if not inspect.isgenerator(resultado):
+        json.dump(jsonable_encoder(resultado), arquivo, ensure_ascii=False)
+        return
+
+    arquivo.write("[")
+    for i, item in enumerate(resultado):
+        if i:
+            arquivo.write(",\n")
+        json.dump(jsonable_encoder(item), arquivo, ensure_ascii=False)
+    arquivo.write("]")
+
+
+def _gravar_resultado(tarefa_id: int, resultado) -> int:
+    # temporário + os.replace: quem baixa nunca vê um arquivo pela metade
+    os.makedirs(DIRETORIO_RELATORIOS, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=DIRETORIO_RELATORIOS, prefix=".tarefa-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as arquivo:
+            _escrever_json(arquivo, resultado)
+        os.replace(temporario, caminho_resultado(tarefa_id))
+    except BaseException:
+        os.remove(temporario)
+        raise
+    return os.path.getsize(caminho_resultado(tarefa_id))
+
+
+def _tarefa_desta_instancia(db: Session, tarefa_id: int, status: str):
+    # só mexe na tarefa se ela ainda é desta instância e está no status esperado:
+    # se a reserva venceu e outra instância já a marcou como erro, nada é sobrescrito
+    return db.query(TarefaRelatorio).filter(
+        TarefaRelatorio.id == tarefa_id,
+        TarefaRelatorio.status == status,
+        TarefaRelatorio.instancia == INSTANCIA
+    )
+
+
+def _executar_tarefa(tarefa_id: int):
+    global _em_aberto
+    db = SessionLocal()
+    leitura = SessionLeitura()
+    try:
+        agora = datetime.now(timezone.utc)
+        iniciada = _tarefa_desta_instancia(db, tarefa_id, "pendente").update(
+            {"status": "executando", "iniciado_em": agora, "reservada_ate": agora + DURACAO_RESERVA},
+            synchronize_session=False
+        )
+        db.commit()
+        if not iniciada:
+            return
+
+        tarefa = db.get(TarefaRelatorio, tarefa_id)
+        final = {}
+        try:
+            # sem o cache: o resultado vai para o disco, não para a memória do processo
+            funcao = RELATORIOS_ASSINCRONOS[tarefa.relatorio]
+            funcao = getattr(funcao, "__wrapped__", funcao)
+            resultado = funcao(leitura, **_converter_parametros(tarefa.relatorio, tarefa.parametros))
+            final["tamanho"] = _gravar_resultado(tarefa_id, resultado)
+        except Exception as erro:
+            logger.exception("Erro na tarefa de relatório %s.", tarefa_id)
+            final["status"] = "erro"
+            final["erro"] = str(erro.detail if isinstance(erro, HTTPException) else erro)[:500]
+        else:
+            final["status"] = "concluida"
+            final["expira_em"] = datetime.now(timezone.utc) + timedelta(hours=VALIDADE_RESULTADO_HORAS)
+        finally:
+            leitura.close()
+
+        final["concluido_em"] = datetime.now(timezone.utc)
+        concluida = _tarefa_desta_instancia(db, tarefa_id, "executando").update(final, synchronize_session=False)
+        db.commit()
+
+        if not concluida:
+            logger.warning("Tarefa de relatório %s foi dada como interrompida antes de terminar.", tarefa_id)
+            if final["status"] == "concluida":
+                try:
+                    os.remove(caminho_resultado(tarefa_id))
+                except FileNotFoundError:
+                    pass
+    finally:
+        db.close()
+        with _lock:
+            _em_aberto -= 1
+
+
+# ---------------------------------------------------------
+# API
+# ---------------------------------------------------------
+def criar_tarefa_relatorio_service(db: Session, relatorio: str, parametros: dict, usuario_id: int) -> TarefaRelatorio:
+    global _executor, _em_aberto
+    _converter_parametros(relatorio, parametros)
+
+    with _lock:
+        if _em_aberto >= MAXIMO_TAREFAS_EM_ABERTO:
+            raise HTTPException(status_code=429, detail="Muitos relatórios na fila. Tente novamente em alguns minutos.")
+        _em_aberto += 1
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TAREFAS_SIMULTANEAS, thread_name_prefix="relatorio")
+
+    try:
+        tarefa = TarefaRelatorio(
+            relatorio=relatorio,
+            parametros=parametros,
+            solicitado_por=usuario_id,
+            instancia=INSTANCIA,
+            reservada_ate=datetime.now(timezone.utc) + DURACAO_RESERVA
+        )
+        db.add(tarefa)
+        db.commit()
+        db.refresh(tarefa)
+        _executor.submit(_executar_tarefa, tarefa.id)
+    except BaseException:
+        with _lock:
+            _em_aberto -= 1
+        raise
+
+    return tarefa
+
+
+def buscar_tarefa_relatorio_service(db: Session, tarefa_id: int) -> TarefaRelatorio:
+    tarefa = db.get(TarefaRelatorio, tarefa_id)
+    if not tarefa:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada.")
+    return tarefa
+
+
+def listar_tarefas_relatorio_service(db: Session, limite: int = 50) -> list[TarefaRelatorio]:
+    return db.query(TarefaRelatorio).order_by(TarefaRelatorio.id.desc()).limit(limite).all()
+
+
+def arquivo_resultado_service(db: Session, tarefa_id: int) -> tuple[TarefaRelatorio, str]:
+    tarefa = buscar_tarefa_relatorio_service(db, tarefa_id)
+
+    if tarefa.status == "expirada":
+        raise HTTPException(status_code=410, detail="O resultado expirou. Peça o relatório de novo.")
+    if tarefa.status != "concluida":
+        raise HTTPException(status_code=409, detail=f"Tarefa ainda não concluída (status: {tarefa.status}).")
+
+    caminho = caminho_resultado(tarefa.id)
+    if not os.path.isfile(caminho):
+        raise HTTPException(status_code=410, detail="O resultado não está mais disponível.")
+    return tarefa, caminho
+
+
+# ---------------------------------------------------------
+# Manutenção (agendador / ciclo de vida da API)
+# ---------------------------------------------------------
+def expirar_resultados_em_background():
+    db = SessionLocal()
+    try:
+        vencidas = (
+            db.query(TarefaRelatorio)
+            .filter(TarefaRelatorio.status == "concluida", TarefaRelatorio.expira_em <= datetime.now(timezone.utc))
+            .all()
+        )
+        for tarefa in vencidas:
+            try:
+                os.remove(caminho_resultado(tarefa.id))
+            except FileNotFoundError:
+                pass
+            tarefa.status = "expirada"
+        db.commit()
+    finally:
+        db.close()
+
+
+def _marcar_interrompidas(db: Session, *condicoes) -> int:
+    marcadas = db.query(TarefaRelatorio).filter(
+        TarefaRelatorio.status.in_(["pendente", "executando"]), *condicoes
+    ).update(
+        {"status": "erro", "erro": "Interrompida: a instância da API parou antes de concluir.",
+         "concluido_em": datetime.now(timezone.utc)},
+        synchronize_session=False
+    )
+    db.commit()
+    return marcadas
+
+
+def _reserva_vencida(agora: datetime):
+    return or_(TarefaRelatorio.reservada_ate.is_(None), TarefaRelatorio.reservada_ate < agora)
+
+
+def recuperar_tarefas_interrompidas():
+    # na subida: o pool não sobrevive a um reinício, então as tarefas com o mesmo
+    # SGHSS_INSTANCIA não vão terminar; as de outras instâncias só se a reserva venceu
+    db = SessionLocal()
+    try:
+        _marcar_interrompidas(
+            db, or_(TarefaRelatorio.instancia == INSTANCIA, _reserva_vencida(datetime.now(timezone.utc)))
+        )
+    finally:
+        db.close()
+
+
+def renovar_tarefas_em_background():
+    db = SessionLocal()
+    try:
+        agora = datetime.now(timezone.utc)
+        db.query(TarefaRelatorio).filter(
+            TarefaRelatorio.status.in_(["pendente", "executando"]),
+            TarefaRelatorio.instancia == INSTANCIA
+        ).update({"reservada_ate": agora + DURACAO_RESERVA}, synchronize_session=False)
+        db.commit()
+
+        # tarefas de instâncias que pararam de renovar (caíram sem desligar)
+        # (as desta instância acabaram de ser renovadas)
+        marcadas = _marcar_interrompidas(db, _reserva_vencida(agora))
+        if marcadas:
+            logger.warning("%s tarefa(s) de relatório órfã(s) marcadas como erro.", marcadas)
+    finally:
+        db.close()
+
+
+def encerrar_tarefas_relatorios():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
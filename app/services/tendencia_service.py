@@ -0,0 +1,101 @@
+from datetime import datetime
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.models.resultado_analito import ResultadoAnalito
+
+
+# ---------------------------------------------------------
+# Tendência de um analito do paciente (ex.: glicose nos últimos 2 anos)
+# A série vem inteira do índice (paciente_id, analito, coletado_em) e as
+# estatísticas são calculadas de uma vez com NumPy, sem loop por ponto.
+# ---------------------------------------------------------
+def tendencia_analito_service(
+    db: Session,
+    paciente_id: int,
+    analito: str,
+    de: datetime | None = None,
+    ate: datetime | None = None,
+    unidade: str | None = None
+):
+    analito = analito.strip().lower()
+
+    query = db.query(
+        ResultadoAnalito.exame_id,
+        ResultadoAnalito.coletado_em,
+        ResultadoAnalito.valor,
+        ResultadoAnalito.unidade,
+        ResultadoAnalito.referencia_min,
+        ResultadoAnalito.referencia_max,
+    ).filter(ResultadoAnalito.paciente_id == paciente_id, ResultadoAnalito.analito == analito)
+
+    if de:
+        query = query.filter(ResultadoAnalito.coletado_em >= de)
+    if ate:
+        query = query.filter(ResultadoAnalito.coletado_em < ate)
+    if unidade:
+        query = query.filter(ResultadoAnalito.unidade == unidade)
+
+    linhas = query.order_by(ResultadoAnalito.coletado_em, ResultadoAnalito.id).all()
+    if not linhas:
+        raise HTTPException(status_code=404, detail=f"Nenhum resultado de '{analito}' para este paciente.")
+
+    unidades = {l.unidade for l in linhas}
+    if len(unidades) > 1:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Resultados em unidades diferentes ({', '.join(sorted(u or '-' for u in unidades))}); informe ?unidade=."
+        )
+
+    n = len(linhas)
+    _, coletas, valores, _, ref_min, ref_max = zip(*linhas)
+
+    valores = np.array(valores, dtype=np.float64)
+    # referência ausente (None -> NaN) vira ±inf: nunca marca o ponto como fora da faixa
+    ref_min = np.array(ref_min, dtype=np.float64)
+    ref_max = np.array(ref_max, dtype=np.float64)
+    ref_min = np.where(np.isnan(ref_min), -np.inf, ref_min)
+    ref_max = np.where(np.isnan(ref_max), np.inf, ref_max)
+
+    instantes = np.array(coletas, dtype="datetime64[us]")
+    dias = (instantes - instantes[0]) / np.timedelta64(1, "D")
+
+    abaixo = valores < ref_min
+    acima = valores > ref_max
+
+    # inclinação por mínimos quadrados (unidade por dia); precisa de 2+ datas diferentes
+    inclinacao = None
+    dx = dias - dias.mean()
+    denominador = float(np.dot(dx, dx))
+    if n >= 2 and denominador > 0:
+        inclinacao = float(np.dot(dx, valores - valores.mean()) / denominador)
+
+    pontos = [
+        {
+            "exame_id": l.exame_id,
+            "coletado_em": l.coletado_em,
+            "valor": l.valor,
+            "referencia_min": l.referencia_min,
+            "referencia_max": l.referencia_max,
+            "fora_da_faixa": "baixo" if b else ("alto" if a else None),
+        }
+        for l, b, a in zip(linhas, abaixo.tolist(), acima.tolist())
+    ]
+
+    return {
+        "paciente_id": paciente_id,
+        "analito": analito,
+        "unidade": linhas[0].unidade,
+        "quantidade": n,
+        "minimo": float(valores.min()),
+        "maximo": float(valores.max()),
+        "media": float(valores.mean()),
+        "desvio_padrao": float(valores.std(ddof=1)) if n >= 2 else None,
+        "inclinacao_por_dia": inclinacao,
+        "fora_da_faixa": int(abaixo.sum() + acima.sum()),
+        "primeira_coleta": linhas[0].coletado_em,
+        "ultima_coleta": linhas[-1].coletado_em,
+        "pontos": pontos,
+    }
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.models.consulta import Consulta
+
+
+# ---------------------------------------------------------
+# Vínculo de cuidado profissional ↔ paciente
+# Um profissional "atende" um paciente se existe ao menos uma consulta entre os dois.
+# O conjunto de pacientes de cada profissional fica em cache (por processo);
+# o agendamento/exclusão de consulta invalida, e o TTL cobre os outros processos.
+# ---------------------------------------------------------
+TTL_VINCULOS_SEGUNDOS = 300
+
+_cache_vinculos: dict[int, tuple[float, frozenset[int]]] = {}
+_lock = threading.Lock()
+
+
+def _carregar_pacientes_do_profissional(db: Session, profissional_id: int) -> frozenset[int]:
+    # uma consulta só, coberta pelo índice (profissional_id, paciente_id)
+    return frozenset(
+        paciente_id for (paciente_id,) in db.query(Consulta.paciente_id)
+        .filter(Consulta.profissional_id == profissional_id)
+        .distinct()
+        .all()
+    )
+
+
+def pacientes_do_profissional(db: Session, profissional_id: int) -> frozenset[int]:
+    agora = time.monotonic()
+
+    with _lock:
+        item = _cache_vinculos.get(profissional_id)
+        if item and item[0] > agora:
+            return item[1]
+
+    pacientes = _carregar_pacientes_do_profissional(db, profissional_id)
+
+    with _lock:
+        _cache_vinculos[profissional_id] = (agora + TTL_VINCULOS_SEGUNDOS, pacientes)
+    return pacientes
+
+
+def profissional_atende_paciente(db: Session, profissional_id: int, paciente_id: int) -> bool:
+    return paciente_id in pacientes_do_profissional(db, profissional_id)
+
+
+def invalidar_vinculos_profissional(profissional_id: int):
+    with _lock:
+        _cache_vinculos.pop(profissional_id, None)
+
+
+# ---------------------------------------------------------
+# Regras de leitura do histórico clínico: ADMIN, o PRÓPRIO PACIENTE,
+# ou PROFISSIONAL que já atendeu o paciente
+# ---------------------------------------------------------
+def verificar_acesso_prontuario(usuario_atual, paciente_id: int, db: Session):
+    # ADMIN pode
+    if usuario_atual.role == "admin":
+        return
+
+    # PACIENTE pode ver seu próprio prontuário
+    if hasattr(usuario_atual, "paciente") and usuario_atual.paciente:
+        if usuario_atual.paciente[0].id != paciente_id:
+            raise HTTPException(403, "Você não pode ver entradas de outro paciente.")
+        return
+
+    # PROFISSIONAL pode ver se já atendeu o paciente
+    if hasattr(usuario_atual, "profissional_saude") and usuario_atual.profissional_saude:
+        profissional_id = usuario_atual.profissional_saude[0].id
+        if not profissional_atende_paciente(db, profissional_id, paciente_id):
+            raise HTTPException(403, "Você não possui permissão para acessar este prontuário.")
+        return
+
+    raise HTTPException(403, "Acesso não autorizado.")
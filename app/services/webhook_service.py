@@ -0,0 +1,259 @@
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+import uuid
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import or_, insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.webhook import AssinaturaWebhook, EntregaWebhook
+from app.schemas.webhook_schema import WebhookCreate
+
+logger = logging.getLogger(__name__)
+
+
+TAMANHO_LOTE_WEBHOOK = 50           # eventos por POST para o mesmo endpoint
+MAX_LOTES_POR_CICLO = 20            # endpoints/lotes despachados por varredura
+WORKERS_WEBHOOK = 4                 # tamanho do pool de entrega
+INTERVALO_WEBHOOKS = 5              # segundos entre varreduras
+
+TIMEOUT_WEBHOOK = 10                # segundos por requisição
+RESERVA_WEBHOOK = timedelta(minutes=2)  # quanto tempo um lote fica reservado para um worker
+
+MAX_TENTATIVAS_WEBHOOK = 8
+BACKOFF_BASE_WEBHOOK = 15           # 15s, 30s, 60s, ...
+BACKOFF_MAXIMO_WEBHOOK = timedelta(hours=6)
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS_WEBHOOK, thread_name_prefix="webhook")
+
+
+# ---------------------------------------------------------
+# Assinaturas (admin)
+# ---------------------------------------------------------
+def criar_webhook_service(dados: WebhookCreate, db: Session) -> AssinaturaWebhook:
+    assinatura = AssinaturaWebhook(
+        url=str(dados.url),
+        eventos=sorted(set(dados.eventos)),
+        segredo=secrets.token_hex(32),
+        ativo=True
+    )
+    db.add(assinatura)
+    db.commit()
+    db.refresh(assinatura)
+    return assinatura
+
+
+def listar_webhooks_service(db: Session):
+    return db.query(AssinaturaWebhook).order_by(AssinaturaWebhook.id).all()
+
+
+def deletar_webhook_service(webhook_id: int, db: Session):
+    assinatura = db.query(AssinaturaWebhook).filter(AssinaturaWebhook.id == webhook_id).first()
+    if not assinatura:
+        raise HTTPException(status_code=404, detail="Webhook não encontrado.")
+
+    db.delete(assinatura)
+    db.commit()
+    return {"message": "Webhook removido com sucesso."}
+
+
+def listar_entregas_falhas_service(webhook_id: int, db: Session):
+    return (
+        db.query(EntregaWebhook)
+        .filter(EntregaWebhook.assinatura_id == webhook_id, EntregaWebhook.status == "falhou")
+        .order_by(EntregaWebhook.id.desc())
+        .limit(100)
+        .all()
+    )
+
+
+# ---------------------------------------------------------
+# Publicação — chamada pelos services de domínio ANTES do commit deles,
+# assim o evento só existe se a mudança foi gravada (outbox).
+# ---------------------------------------------------------
+def publicar_evento(db: Session, evento: str, dados: dict):
+    publicar_eventos(db, evento, [dados])
+
+
+def publicar_eventos(db: Session, evento: str, lista_dados: list[dict]):
+    # mesmo evento várias vezes (ex.: ingestão em lote): busca as assinaturas uma vez só
+    if not lista_dados:
+        return
+
+    assinaturas = [
+        a for a in db.query(AssinaturaWebhook).filter(AssinaturaWebhook.ativo == True).all()
+        if evento in a.eventos
+    ]
+
+    if not assinaturas:
+        return
+
+    ocorrido_em = datetime.now(timezone.utc).isoformat()
+    db.execute(insert(EntregaWebhook), [
+        {
+            "assinatura_id": assinatura.id,
+            "evento": evento,
+            "payload": {"evento": evento, "ocorrido_em": ocorrido_em, "dados": dados},
+            "status": "pendente",
+        }
+        for assinatura in assinaturas
+        for dados in lista_dados
+    ])
+
+
+# ---------------------------------------------------------
+# Entrega
+# ---------------------------------------------------------
+def assinar_corpo(segredo: str, timestamp: str, corpo: bytes) -> str:
+    # o integrador valida com HMAC-SHA256(segredo, "<timestamp>.<corpo>")
+    mensagem = timestamp.encode("utf-8") + b"." + corpo
+    return "sha256=" + hmac.new(segredo.encode("utf-8"), mensagem, hashlib.sha256).hexdigest()
+
+
+def _calcular_backoff_webhook(tentativas: int) -> timedelta:
+    return min(timedelta(seconds=BACKOFF_BASE_WEBHOOK * (2 ** (tentativas - 1))), BACKOFF_MAXIMO_WEBHOOK)
+
+
+def _post(url: str, corpo: bytes, cabecalhos: dict) -> str | None:
+    partes = urlsplit(url)
+    classe = http.client.HTTPSConnection if partes.scheme == "https" else http.client.HTTPConnection
+    conexao = classe(partes.hostname, partes.port, timeout=TIMEOUT_WEBHOOK)
+    caminho = partes.path or "/"
+    if partes.query:
+        caminho += "?" + partes.query
+
+    try:
+        conexao.request("POST", caminho, body=corpo, headers=cabecalhos)
+        resposta = conexao.getresponse()
+        resposta.read()
+        if resposta.status >= 300:
+            return f"HTTP {resposta.status}"
+        return None
+    except (http.client.HTTPException, OSError) as e:
+        return str(e) or e.__class__.__name__
+    finally:
+        conexao.close()
+
+
+def _reservar_lote(db: Session, assinatura_id: int, agora: datetime) -> list[EntregaWebhook]:
+    disponivel = or_(EntregaWebhook.status == "pendente", EntregaWebhook.status == "enviando")
+
+    ids = [
+        i for (i,) in db.query(EntregaWebhook.id)
+        .filter(
+            EntregaWebhook.assinatura_id == assinatura_id,
+            disponivel,
+            EntregaWebhook.proxima_tentativa <= agora
+        )
+        .order_by(EntregaWebhook.id)
+        .limit(TAMANHO_LOTE_WEBHOOK)
+        .all()
+    ]
+    if not ids:
+        return []
+
+    # UPDATE condicional com token: só as linhas que ESTE worker conseguiu marcar voltam.
+    # "enviando" vencido (worker caiu no meio) pode ser reservado de novo.
+    token = uuid.uuid4().hex
+    (
+        db.query(EntregaWebhook)
+        .filter(EntregaWebhook.id.in_(ids), disponivel, EntregaWebhook.proxima_tentativa <= agora)
+        .update(
+            {"status": "enviando", "lote": token, "proxima_tentativa": agora + RESERVA_WEBHOOK},
+            synchronize_session=False
+        )
+    )
+    db.commit()
+
+    return (
+        db.query(EntregaWebhook)
+        .filter(EntregaWebhook.lote == token)
+        .order_by(EntregaWebhook.id)
+        .all()
+    )
+
+
+def entregar_lote_webhook(assinatura_id: int) -> int:
+    """Reserva e entrega UM lote de eventos de uma assinatura. Roda no pool de workers."""
+    db = SessionLocal()
+    try:
+        agora = datetime.now(timezone.utc)
+        assinatura = db.query(AssinaturaWebhook).filter(AssinaturaWebhook.id == assinatura_id).first()
+        if not assinatura:
+            return 0
+
+        entregas = _reservar_lote(db, assinatura_id, agora)
+        if not entregas:
+            return 0
+
+        corpo = json.dumps(
+            {"eventos": [{"id": e.id, **e.payload} for e in entregas]},
+            default=str
+        ).encode("utf-8")
+        timestamp = str(int(time.time()))
+
+        erro = _post(assinatura.url, corpo, {
+            "Content-Type": "application/json",
+            "X-SGHSS-Timestamp": timestamp,
+            "X-SGHSS-Assinatura": assinar_corpo(assinatura.segredo, timestamp, corpo),
+        })
+
+        agora = datetime.now(timezone.utc)
+        for entrega in entregas:
+            if erro is None:
+                db.delete(entrega)
+                continue
+
+            entrega.tentativas += 1
+            entrega.erro = erro
+            entrega.lote = None
+            if entrega.tentativas >= MAX_TENTATIVAS_WEBHOOK:
+                entrega.status = "falhou"
+            else:
+                entrega.status = "pendente"
+                entrega.proxima_tentativa = agora + _calcular_backoff_webhook(entrega.tentativas)
+
+        db.commit()
+
+        if erro:
+            logger.warning("Falha ao entregar webhook %s (%s): %s", assinatura_id, assinatura.url, erro)
+        return len(entregas)
+    finally:
+        db.close()
+
+
+def processar_webhooks_service(db: Session) -> int:
+    # quais endpoints têm eventos vencidos; cada um vira um lote no pool
+    agora = datetime.now(timezone.utc)
+    assinaturas = [
+        i for (i,) in db.query(EntregaWebhook.assinatura_id)
+        .filter(
+            or_(EntregaWebhook.status == "pendente", EntregaWebhook.status == "enviando"),
+            EntregaWebhook.proxima_tentativa <= agora
+        )
+        .distinct()
+        .limit(MAX_LOTES_POR_CICLO)
+        .all()
+    ]
+
+    futuros = [_pool.submit(entregar_lote_webhook, assinatura_id) for assinatura_id in assinaturas]
+    return sum(f.result() for f in futuros)
+
+
+def executar_webhooks_em_background():
+    db = SessionLocal()
+    try:
+        # continua enquanto houver eventos vencidos
+        while processar_webhooks_service(db):
+            pass
+    finally:
+        db.close()
@@ -0,0 +1,69 @@
+# comprimir_textos.py — Migração: comprime os textos clínicos grandes que já estão no banco.
+# Pode rodar mais de uma vez (o que já está comprimido é ignorado).
+#
+#   python comprimir_textos.py
+
+from sqlalchemy import select, update
+
+from app.database import SessionLocal, inicializar_bd
+from app.core.compressao import comprimir_texto, esta_comprimido
+from app.models.entrada_prontuario import EntradaProntuario
+from app.models.exame import Exame
+
+TAMANHO_LOTE = 500
+
+
+def comprimir_coluna(db, tabela, coluna):
+    # percorre a tabela por id, em lotes, com um commit por lote (transações curtas)
+    ultimo_id = 0
+    antes = depois = alteradas = 0
+
+    while True:
+        linhas = db.execute(
+            select(tabela.c.id, coluna)
+            .where(tabela.c.id > ultimo_id, coluna.isnot(None))
+            .order_by(tabela.c.id)
+            .limit(TAMANHO_LOTE)
+        ).all()
+        if not linhas:
+            break
+
+        mudancas = []
+        for id_, valor in linhas:
+            if esta_comprimido(valor):
+                continue
+            novo = comprimir_texto(valor)
+            antes += len(valor.encode("utf-8"))
+            depois += len(novo.encode("utf-8"))
+            if novo != valor:
+                mudancas.append({"id_": id_, "valor": novo})
+
+        for m in mudancas:
+            valores = {coluna.name: m["valor"]}
+            # é só a representação que muda: não dispara o onupdate de atualizado_em
+            # (senão a exportação incremental reenviaria a tabela inteira)
+            if "atualizado_em" in tabela.c:
+                valores["atualizado_em"] = tabela.c.atualizado_em
+            db.execute(update(tabela).where(tabela.c.id == m["id_"]).values(valores))
+        db.commit()
+
+        alteradas += len(mudancas)
+        ultimo_id = linhas[-1][0]
+
+    return alteradas, antes, depois
+
+
+inicializar_bd()
+db = SessionLocal()
+
+try:
+    for nome, tabela, coluna in [
+        ("entradas_prontuario.texto", EntradaProntuario.__table__, EntradaProntuario.__table__.c.texto),
+        ("exames.resultado", Exame.__table__, Exame.__table__.c.resultado),
+    ]:
+        alteradas, antes, depois = comprimir_coluna(db, tabela, coluna)
+        economia = (1 - depois / antes) * 100 if antes else 0
+        print(f"📦 {nome}: {alteradas} linhas comprimidas — {antes / 1024:.1f} KB → {depois / 1024:.1f} KB ({economia:.0f}% menor)")
+
+finally:
+    db.close()
@@ -0,0 +1,53 @@
+# preencher_atualizado_em.py — Migração: preenche atualizado_em nas linhas antigas
+# das tabelas exportadas para BI (a coluna chegou depois delas e ficou NULL).
+# Sem isso, essas linhas nunca aparecem numa exportação com ?desde=.
+# As linhas preenchidas recebem o instante da migração: entram na próxima carga
+# incremental uma vez. Pode rodar mais de uma vez (só mexe no que está NULL).
+#
+#   python preencher_atualizado_em.py
+
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update
+
+from app.database import SessionLocal, inicializar_bd
+from app.services.exportacao_service import ENTIDADES_EXPORTACAO
+
+TAMANHO_LOTE = 500
+
+
+def preencher_coluna(db, tabela, agora):
+    # lotes por id, com um commit por lote (transações curtas)
+    ultimo_id = 0
+    preenchidas = 0
+
+    while True:
+        ids = db.execute(
+            select(tabela.c.id)
+            .where(tabela.c.id > ultimo_id, tabela.c.atualizado_em.is_(None))
+            .order_by(tabela.c.id)
+            .limit(TAMANHO_LOTE)
+        ).scalars().all()
+        if not ids:
+            break
+
+        db.execute(update(tabela).where(tabela.c.id.in_(ids)).values(atualizado_em=agora))
+        db.commit()
+
+        preenchidas += len(ids)
+        ultimo_id = ids[-1]
+
+    return preenchidas
+
+
+inicializar_bd()
+db = SessionLocal()
+
+try:
+    agora = datetime.now(timezone.utc)
+    for entidade, (modelo, _) in ENTIDADES_EXPORTACAO.items():
+        preenchidas = preencher_coluna(db, modelo.__table__, agora)
+        print(f"🕒 {entidade}.atualizado_em: {preenchidas} linhas preenchidas")
+
+finally:
+    db.close()
@@ -0,0 +1,18 @@
+# reconstruir_contadores.py — Recalcula os contadores dos relatórios de consultas
+# (por status, mês e profissional) a partir da tabela de consultas.
+# Use se alguma consulta foi alterada fora do consulta_service (ex.: SQL direto).
+#
+#   python reconstruir_contadores.py
+
+from app.database import SessionLocal, inicializar_bd
+from app.services.contador_service import reconstruir_contadores
+
+inicializar_bd()
+db = SessionLocal()
+
+try:
+    linhas = reconstruir_contadores(db)
+    print(f"🔢 Contadores reconstruídos — {linhas['status']} status, {linhas['meses']} meses, {linhas['profissionais']} profissionais")
+
+finally:
+    db.close()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+
+# banco e diretórios temporários ANTES de importar a aplicação (app.database lê na importação)
+_diretorio = tempfile.mkdtemp(prefix="sghss-testes-")
+os.environ["SGHSS_DATABASE_URL"] = f"sqlite:///{os.path.join(_diretorio, 'sghss.db')}"
+os.environ["SGHSS_DIRETORIO_ARQUIVOS"] = os.path.join(_diretorio, "arquivos_exames")
+os.environ["SGHSS_DIRETORIO_RELATORIOS"] = os.path.join(_diretorio, "resultados_relatorios")
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.database import Base, engine, SessionLocal, inicializar_bd
+from app.core.cache_relatorios import invalidar_relatorios
+from app.core.security import criar_token_acesso
+from app.models.usuario import Usuario
+from app.models.paciente import Paciente
+from app.models.profissional_saude import ProfissionalSaude
+from app.models.prontuario import Prontuario
+from app.models.agenda import Agenda
+from app.services import vinculo_service
+
+
+# ---------------------------------------------------------
+# Cada teste começa com o banco vazio e os caches em processo limpos.
+# O TestClient é usado sem "with": o lifespan (agendador em background) não sobe.
+# ---------------------------------------------------------
+@pytest.fixture(autouse=True)
+def banco_limpo():
+    Base.metadata.drop_all(bind=engine)
+    inicializar_bd()
+    invalidar_relatorios()
+    with vinculo_service._lock:
+        vinculo_service._cache_vinculos.clear()
+    yield
+
+
+@pytest.fixture
+def db():
+    sessao = SessionLocal()
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+
+
+@pytest.fixture
+def cliente():
+    return TestClient(app)
+
+
+@pytest.fixture
+def cabecalho():
+    def montar(usuario: Usuario) -> dict:
+        return {"Authorization": f"Bearer {criar_token_acesso({'sub': str(usuario.id)})}"}
+    return montar
+
+
+def _usuario(db, nome: str, cpf: str, role: str = "usuario") -> Usuario:
+    usuario = Usuario(
+        nome=nome, cpf=cpf, email=f"{cpf}@sghss.com", telefone="11999990000",
+        senha_hash="-", role=role
+    )
+    db.add(usuario)
+    db.flush()
+    return usuario
+
+
+@pytest.fixture
+def cenario(db):
+    """Admin, um paciente com prontuário e um médico com horários livres nos próximos dias."""
+    admin = _usuario(db, "Admin", "00000000000", role="admin")
+
+    usuario_paciente = _usuario(db, "Paciente", "11111111111")
+    paciente = Paciente(usuario_id=usuario_paciente.id)
+    db.add(paciente)
+    db.flush()
+    db.add(Prontuario(paciente_id=paciente.id))
+
+    usuario_medico = _usuario(db, "Médico", "22222222222")
+    medico = ProfissionalSaude(
+        usuario_id=usuario_medico.id, tipo_profissional="medico", registro_profissional="CRM1"
+    )
+    db.add(medico)
+    db.flush()
+
+    # horários às 9h e 10h, de amanhã até daqui a 40 dias (cobre mais de um mês)
+    amanha = (datetime.now(timezone.utc) + timedelta(days=1)).date()
+    horarios = []
+    for dia in range(40):
+        for hora in (9, 10):
+            data_hora = datetime.combine(amanha + timedelta(days=dia), datetime.min.time()).replace(hour=hora)
+            db.add(Agenda(profissional_id=medico.id, data=data_hora.date(), hora=data_hora.time(), disponivel=True))
+            horarios.append(data_hora)
+    db.commit()
+
+    return {
+        "admin": admin,
+        "paciente": paciente,
+        "usuario_paciente": usuario_paciente,
+        "medico": medico,
+        "usuario_medico": usuario_medico,
+        "horarios": horarios,
+    }
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from app.models.notificacao import Notificacao
+from app.services.notificacao_service import _agrupar_notificacao, marcar_notificacao_lida_service
+
+
+# ---------------------------------------------------------
+# Agrupamento (digest) de notificações do mesmo tipo — user-029
+# ---------------------------------------------------------
+INICIO = datetime(2026, 6, 1, 12, 0)
+
+
+def _evento(db, usuario_id: int, segundos: int, mensagem: str) -> int:
+    notificacao_id = _agrupar_notificacao(db, usuario_id, "exame", [mensagem], INICIO + timedelta(seconds=segundos))
+    db.commit()
+    return notificacao_id
+
+
+def test_janela_conta_do_ultimo_evento(cenario, db):
+    usuario_id = cenario["usuario_paciente"].id
+
+    # janela de 60 s: cada evento chega 50 s depois do anterior e renova a janela
+    ids = {_evento(db, usuario_id, s, f"Exame {s}") for s in (0, 50, 100, 150)}
+    assert len(ids) == 1
+
+    (grupo,) = db.query(Notificacao).all()
+    assert grupo.agrupadas == 4
+    assert grupo.mensagem == "Você tem 4 novas notificações (exame). Última: Exame 150"
+
+    # 61 s sem eventos: o grupo fecha e o próximo abre outro
+    novo = _evento(db, usuario_id, 211, "Exame 211")
+    assert novo not in ids
+    db.expire_all()
+    assert [(n.agrupadas, n.agrupando) for n in db.query(Notificacao).order_by(Notificacao.id)] == [(4, False), (1, True)]
+
+
+def test_ler_fecha_o_grupo(cenario, db):
+    usuario_id = cenario["usuario_paciente"].id
+    primeiro = _evento(db, usuario_id, 0, "Hemograma")
+
+    marcar_notificacao_lida_service(primeiro, usuario_id, db)
+
+    # dentro da janela, mas o grupo lido não recebe mais eventos
+    segundo = _evento(db, usuario_id, 10, "Glicemia")
+    assert segundo != primeiro
+    assert db.get(Notificacao, segundo).mensagem == "Glicemia"
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models.notificacao import Notificacao
+from app.models.notificacao_arquivada import NotificacaoArquivada
+from app.services.notificacao_service import arquivar_notificacoes_service
+
+
+# ---------------------------------------------------------
+# Política de retenção: lidas e vencidas saem em lotes para o arquivo — user-026
+# ---------------------------------------------------------
+AGORA = datetime(2026, 6, 1, 12, 0)
+
+
+def _notificacao(db, usuario_id: int, tipo: str, dias: int, lida: bool = True) -> int:
+    notificacao = Notificacao(
+        usuario_id=usuario_id, tipo=tipo, mensagem=f"{tipo} há {dias} dias", lida=lida,
+        data_envio=AGORA - timedelta(days=dias)
+    )
+    db.add(notificacao)
+    db.flush()
+    return notificacao.id
+
+
+def test_arquiva_lidas_vencidas_em_lotes_por_tipo(cenario, db):
+    usuario_id = cenario["usuario_paciente"].id
+
+    # retenção: sistema 30 dias, consulta 90 dias
+    vencidas = [_notificacao(db, usuario_id, "sistema", 31) for _ in range(5)]
+    vencidas += [_notificacao(db, usuario_id, "consulta", 91) for _ in range(2)]
+    ficam = [
+        _notificacao(db, usuario_id, "sistema", 29),                 # dentro do prazo
+        _notificacao(db, usuario_id, "sistema", 400, lida=False),    # não lida nunca sai
+        _notificacao(db, usuario_id, "consulta", 60),                # prazo do tipo é maior
+    ]
+    db.commit()
+
+    # lote de 2: o tipo "sistema" precisa de três lotes
+    resultado = arquivar_notificacoes_service(db, agora=AGORA.replace(tzinfo=timezone.utc), tamanho_lote=2)
+
+    assert resultado == {"arquivadas_por_tipo": {"sistema": 5, "consulta": 2}, "total_arquivadas": 7}
+
+    db.expire_all()
+    assert sorted(i for (i,) in db.query(Notificacao.id)) == sorted(ficam)
+    arquivadas = db.query(NotificacaoArquivada).order_by(NotificacaoArquivada.id).all()
+    assert [a.id for a in arquivadas] == sorted(vencidas)
+    assert all(a.lida and a.usuario_id == usuario_id for a in arquivadas)
+
+    # rodar de novo não encontra mais nada
+    assert arquivar_notificacoes_service(db, agora=AGORA.replace(tzinfo=timezone.utc))["total_arquivadas"] == 0
+
+
+def test_usuario_pagina_as_proprias_arquivadas(cliente, cabecalho, cenario, db):
+    usuario_id = cenario["usuario_paciente"].id
+    ids = [_notificacao(db, usuario_id, "sistema", 31) for _ in range(3)]
+    _notificacao(db, cenario["usuario_medico"].id, "sistema", 31)
+    db.commit()
+    arquivar_notificacoes_service(db, agora=AGORA.replace(tzinfo=timezone.utc))
+
+    vistos, cursor = [], None
+    while True:
+        params = {"limite": 2, **({"cursor": cursor} if cursor else {})}
+        pagina = cliente.get(
+            "/notificacoes/arquivadas", params=params, headers=cabecalho(cenario["usuario_paciente"])
+        ).json()
+        vistos += [n["id"] for n in pagina["itens"]]
+        cursor = pagina["proximo_cursor"]
+        if cursor is None:
+            break
+
+    assert vistos == sorted(ids, reverse=True)
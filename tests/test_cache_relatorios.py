@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+from app.core import cache_relatorios
+from app.core.cache_relatorios import obter_ou_calcular, invalidar_relatorios, metricas_cache
+
+
+# ---------------------------------------------------------
+# Cache dos relatórios: invalidação pelas escritas e single-flight — user-045
+# ---------------------------------------------------------
+@pytest.fixture(autouse=True)
+def metricas_zeradas():
+    with cache_relatorios._lock:
+        cache_relatorios._metricas.clear()
+    yield
+
+
+def _aguardar(condicao, limite: float = 5):
+    fim = time.monotonic() + limite
+    while not condicao():
+        assert time.monotonic() < fim, "tempo esgotado"
+        time.sleep(0.005)
+
+
+class CalculoLento:
+    """Função de relatório que só termina quando o teste libera."""
+
+    def __init__(self, resultado=None, erro: Exception | None = None):
+        self.liberar = threading.Event()
+        self.chamadas = 0
+        self.resultado = resultado
+        self.erro = erro
+
+    def __call__(self):
+        self.chamadas += 1
+        assert self.liberar.wait(5)
+        if self.erro:
+            raise self.erro
+        return self.resultado
+
+
+def _em_threads(quantidade: int, funcao):
+    resultados, erros = [], []
+
+    def rodar():
+        try:
+            resultados.append(funcao())
+        except Exception as erro:
+            erros.append(erro)
+
+    threads = [threading.Thread(target=rodar) for _ in range(quantidade)]
+    for t in threads:
+        t.start()
+    return threads, resultados, erros
+
+
+def _metricas(relatorio: str) -> dict:
+    return metricas_cache()["relatorios"].get(relatorio, {})
+
+
+def test_escrita_de_consulta_invalida_o_relatorio(cliente, cabecalho, cenario):
+    admin = cabecalho(cenario["admin"])
+
+    assert cliente.get("/relatorios/consultas-por-status", headers=admin).json() == {"consultas_por_status": {}}
+    assert cliente.get("/relatorios/consultas-por-status", headers=admin).json() == {"consultas_por_status": {}}
+    assert _metricas("consultas_por_status")["acertos"] == 1
+
+    resposta = cliente.post("/consultas/", headers=admin, json={
+        "paciente_id": cenario["paciente"].id,
+        "profissional_id": cenario["medico"].id,
+        "data_hora": cenario["horarios"][0].isoformat() + "Z",
+    })
+    assert resposta.status_code == 200
+
+    # o agendamento limpou o cache: o total novo aparece na hora, sem esperar o TTL
+    resposta = cliente.get("/relatorios/consultas-por-status", headers=admin).json()
+    assert resposta == {"consultas_por_status": {"agendada": 1}}
+    assert _metricas("consultas_por_status")["invalidacoes"] >= 1
+
+
+def test_pedidos_simultaneos_calculam_uma_vez():
+    calculo = CalculoLento(resultado={"total": 42})
+    threads, resultados, erros = _em_threads(8, lambda: obter_ou_calcular("teste", (), calculo))
+
+    # um calcula, os outros sete esperam o mesmo Future
+    _aguardar(lambda: _metricas("teste").get("aguardaram") == 7)
+    calculo.liberar.set()
+    for t in threads:
+        t.join(5)
+
+    assert erros == []
+    assert resultados == [{"total": 42}] * 8
+    assert calculo.chamadas == 1
+
+    # o resultado ficou guardado
+    assert obter_ou_calcular("teste", (), calculo) == {"total": 42}
+    assert calculo.chamadas == 1
+
+
+def test_erro_do_calculo_chega_a_quem_esperava_e_nao_e_guardado():
+    calculo = CalculoLento(erro=RuntimeError("banco fora"))
+    threads, resultados, erros = _em_threads(3, lambda: obter_ou_calcular("teste", (), calculo))
+
+    _aguardar(lambda: _metricas("teste").get("aguardaram") == 2)
+    calculo.liberar.set()
+    for t in threads:
+        t.join(5)
+
+    assert resultados == []
+    assert [str(e) for e in erros] == ["banco fora"] * 3
+
+    calculo.erro, calculo.resultado = None, "ok"
+    assert obter_ou_calcular("teste", (), calculo) == "ok"
+    assert calculo.chamadas == 2
+
+
+def test_invalidacao_durante_o_calculo_descarta_o_resultado():
+    calculo = CalculoLento(resultado="antigo")
+    threads, resultados, _ = _em_threads(1, lambda: obter_ou_calcular("teste", (), calculo))
+    _aguardar(lambda: calculo.chamadas == 1)
+
+    # escrita no meio do cálculo
+    invalidar_relatorios("teste")
+    assert metricas_cache()["em_calculo"] == 0
+
+    calculo.liberar.set()
+    threads[0].join(5)
+    assert resultados == ["antigo"]
+
+    # quem chega depois da invalidação calcula de novo
+    calculo.resultado = "novo"
+    assert obter_ou_calcular("teste", (), calculo) == "novo"
+    assert calculo.chamadas == 2
@@ -0,0 +1,58 @@
+import runpy
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import insert
+
+from app.core.compressao import MARCADOR, comprimir_texto, descomprimir_texto, esta_comprimido
+from app.models.exame import Exame
+
+
+# ---------------------------------------------------------
+# Compressão transparente de textos clínicos — user-037
+# ---------------------------------------------------------
+LAUDO = "Hemácias normocíticas e normocrômicas. " * 100
+
+
+def test_texto_grande_grava_comprimido_e_le_igual():
+    gravado = comprimir_texto(LAUDO)
+    assert esta_comprimido(gravado)
+    assert len(gravado) < len(LAUDO)
+    assert descomprimir_texto(gravado) == LAUDO
+
+    # pequeno fica como está
+    assert comprimir_texto("Sem alterações.") == "Sem alterações."
+
+
+def test_texto_do_cliente_com_o_marcador_nao_quebra_a_leitura(cliente, cabecalho, cenario):
+    paciente_id = cenario["paciente"].id
+    admin = cabecalho(cenario["admin"])
+
+    for texto in (MARCADOR + "abc", MARCADOR + "não é base64!"):
+        criada = cliente.post(
+            f"/prontuarios/{paciente_id}/entradas", headers=admin, json={"texto": texto, "tipo": "anotacao"}
+        )
+        assert criada.status_code == 200, criada.text
+        assert criada.json()["texto"] == texto
+
+    lidas = cliente.get(f"/prontuarios/{paciente_id}/entradas", headers=admin)
+    assert lidas.status_code == 200
+    assert {e["texto"] for e in lidas.json()["itens"]} == {MARCADOR + "abc", MARCADOR + "não é base64!"}
+
+
+def test_migracao_comprime_sem_mexer_em_atualizado_em(cenario, db):
+    atualizado_em = datetime(2025, 1, 2, 3, 4, 5)
+    # linha antiga, gravada antes da compressão (texto puro na coluna)
+    exame_id = db.execute(insert(Exame).returning(Exame.id), [{
+        "paciente_id": cenario["paciente"].id, "profissional_id": cenario["medico"].id,
+        "tipo_exame": "Hemograma", "status": "concluido", "_resultado": LAUDO, "atualizado_em": atualizado_em,
+    }]).scalar_one()
+    db.commit()
+
+    runpy.run_path(str(Path(__file__).parent.parent / "comprimir_textos.py"))
+
+    db.expire_all()
+    exame = db.get(Exame, exame_id)
+    assert esta_comprimido(exame._resultado)
+    assert exame.resultado == LAUDO
+    assert exame.atualizado_em == atualizado_em
@@ -0,0 +1,75 @@
+from app.models.contador_consulta import (
+    ContadorConsultaStatus,
+    ContadorConsultaMes,
+    ContadorConsultaProfissional
+)
+from app.services.contador_service import reconstruir_contadores
+
+
+# ---------------------------------------------------------
+# Contadores incrementais x reconstrução a partir das consultas — user-044
+# ---------------------------------------------------------
+def _contadores(db) -> dict:
+    db.expire_all()
+    # zero e linha ausente são a mesma coisa (o incremental deixa linhas zeradas)
+    return {
+        "status": {c.status: c.total for c in db.query(ContadorConsultaStatus) if c.total},
+        "mes": {c.mes: c.total for c in db.query(ContadorConsultaMes) if c.total},
+        "profissional": {c.profissional_id: c.total for c in db.query(ContadorConsultaProfissional) if c.total},
+    }
+
+
+def test_contadores_incrementais_batem_com_a_reconstrucao(cliente, cabecalho, cenario, db):
+    admin = cabecalho(cenario["admin"])
+    medico = cabecalho(cenario["usuario_medico"])
+    horarios = cenario["horarios"]
+
+    def agendar(data_hora):
+        resposta = cliente.post("/consultas/", headers=admin, json={
+            "paciente_id": cenario["paciente"].id,
+            "profissional_id": cenario["medico"].id,
+            "data_hora": data_hora.isoformat() + "Z",
+        })
+        assert resposta.status_code == 200, resposta.text
+        return resposta.json()["id"]
+
+    ids = [agendar(h) for h in horarios[:5]]
+
+    # uma operação de cada tipo que mexe nos contadores
+    assert cliente.patch(f"/consultas/{ids[0]}/confirmar", headers=medico).status_code == 200
+    assert cliente.patch(f"/consultas/{ids[1]}/cancelar", headers=admin).status_code == 200
+    assert cliente.patch(f"/consultas/{ids[2]}/finalizar", headers=medico).status_code == 200
+    assert cliente.delete(f"/consultas/{ids[3]}", headers=admin).status_code == 200
+
+    # reagendamento para outro mês (o último horário fica mais de 30 dias à frente)
+    assert horarios[-1].strftime("%Y-%m") != horarios[4].strftime("%Y-%m")
+    resposta = cliente.patch(f"/consultas/{ids[4]}", headers=admin, json={"data_hora": horarios[-1].isoformat() + "Z"})
+    assert resposta.status_code == 200, resposta.text
+
+    incrementais = _contadores(db)
+    assert incrementais["status"] == {"confirmada": 1, "cancelada": 1, "finalizada": 1, "agendada": 1}
+    assert sum(incrementais["mes"].values()) == 4
+    assert incrementais["profissional"] == {cenario["medico"].id: 4}
+
+    reconstruir_contadores(db)
+    assert _contadores(db) == incrementais
+
+
+def test_relatorio_sem_filtros_le_os_contadores(cliente, cabecalho, cenario, db):
+    admin = cabecalho(cenario["admin"])
+    for data_hora in cenario["horarios"][:3]:
+        cliente.post("/consultas/", headers=admin, json={
+            "paciente_id": cenario["paciente"].id,
+            "profissional_id": cenario["medico"].id,
+            "data_hora": data_hora.isoformat() + "Z",
+        })
+
+    pelos_contadores = cliente.get("/relatorios/consultas-por-status", headers=admin).json()
+
+    # mesmo total calculado direto sobre as consultas (com filtro, o relatório não usa os contadores)
+    filtrado = cliente.get(
+        "/relatorios/consultas-por-status",
+        params={"profissional_id": cenario["medico"].id},
+        headers=admin
+    ).json()
+    assert pelos_contadores == filtrado == {"consultas_por_status": {"agendada": 3}}
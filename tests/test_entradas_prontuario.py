@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.entrada_prontuario import EntradaProntuario
+from app.models.prontuario import Prontuario
+
+
+# ---------------------------------------------------------
+# Entradas do prontuário paginadas por cursor, com empates de data — user-033
+# ---------------------------------------------------------
+MESMO_INSTANTE = datetime(2025, 3, 10, 14, 0)
+ANTES = datetime(2025, 3, 9, 8, 30)
+
+
+def _todas_as_paginas(cliente, url: str, headers: dict, limite: int) -> list[dict]:
+    itens, cursor = [], None
+    while True:
+        params = {"limite": limite, **({"cursor": cursor} if cursor else {})}
+        resposta = cliente.get(url, params=params, headers=headers)
+        assert resposta.status_code == 200, resposta.text
+        pagina = resposta.json()
+        assert len(pagina["itens"]) <= limite
+        itens += pagina["itens"]
+        cursor = pagina["proximo_cursor"]
+        if cursor is None:
+            return itens
+
+
+@pytest.fixture
+def entradas(cenario, db):
+    """Sete entradas, cinco delas no MESMO instante."""
+    paciente_id = cenario["paciente"].id
+    prontuario_id = db.query(Prontuario.id).filter(Prontuario.paciente_id == paciente_id).scalar()
+
+    for i, data in enumerate([MESMO_INSTANTE] * 5 + [ANTES] * 2):
+        db.add(EntradaProntuario(prontuario_id=prontuario_id, tipo="evolucao", texto=f"Entrada {i}", data_hora=data))
+    db.commit()
+    return paciente_id
+
+
+@pytest.mark.parametrize("limite", [1, 2, 3])
+def test_entradas_do_prontuario_paginam_sem_perder_empates(cliente, cabecalho, cenario, entradas, limite):
+    url = f"/prontuarios/{entradas}/entradas"
+    admin = cabecalho(cenario["admin"])
+
+    paginado = _todas_as_paginas(cliente, url, admin, limite)
+    de_uma_vez = cliente.get(url, params={"limite": 200}, headers=admin).json()["itens"]
+
+    assert [e["id"] for e in paginado] == [e["id"] for e in de_uma_vez]
+    assert len({e["id"] for e in paginado}) == 7
+
+    # mais recentes primeiro; no mesmo instante, id decrescente
+    chaves = [(e["data_hora"], e["id"]) for e in paginado]
+    assert chaves == sorted(chaves, reverse=True)
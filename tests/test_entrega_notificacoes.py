@@ -0,0 +1,128 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.database import SessionLocal
+from app.models.entrega_notificacao import EntregaNotificacao
+from app.models.notificacao import Notificacao
+from app.schemas.notificacao_schema import NotificacaoCreate
+from app.services import entrega_service
+from app.services.entrega_service import CanalEntrega, processar_entregas_service
+from app.services.notificacao_service import criar_notificacao_service
+
+
+# ---------------------------------------------------------
+# Entrega externa pela fila (outbox) — user-030
+# ---------------------------------------------------------
+class CanalTeste(CanalEntrega):
+    """Guarda as mensagens recebidas; falha as notificações em "falhar"."""
+    nome = "log"
+
+    def __init__(self):
+        super().__init__(mensagens_por_segundo=1000)
+        self.recebidas: list[tuple[int, str]] = []
+        self.falhar: set[int] = set()
+        self.durante_envio = None
+
+    def enviar_lote(self, itens: list[dict]) -> dict[int, str]:
+        if self.durante_envio:
+            self.durante_envio()
+        self.recebidas += [(item["notificacao_id"], item["mensagem"]) for item in itens]
+        return {item["notificacao_id"]: "indisponível" for item in itens if item["notificacao_id"] in self.falhar}
+
+
+@pytest.fixture
+def canal(monkeypatch):
+    monkeypatch.setattr(entrega_service, "CANAIS_ENTREGA", ["log"])
+    return CanalTeste()
+
+
+def _fila(db):
+    db.expire_all()
+    return db.query(EntregaNotificacao).all()
+
+
+def test_notificacao_entra_na_fila_e_sai_depois_de_entregue(cliente, cabecalho, cenario, canal, db):
+    resposta = cliente.post(
+        f"/notificacoes/{cenario['usuario_paciente'].id}",
+        json={"tipo": "sistema", "mensagem": "Bem-vindo"},
+        headers=cabecalho(cenario["admin"])
+    )
+    assert resposta.status_code == 200
+    notificacao_id = resposta.json()["id"]
+
+    # gravada na mesma transação da notificação
+    assert [(e.canal, e.notificacao_id, e.status) for e in _fila(db)] == [("log", notificacao_id, "pendente")]
+
+    assert processar_entregas_service(canal, db) == 1
+    assert canal.recebidas == [(notificacao_id, "Bem-vindo")]
+    assert _fila(db) == []
+
+    # nada pendente: a próxima varredura não reenvia
+    assert processar_entregas_service(canal, db) == 0
+    assert len(canal.recebidas) == 1
+
+
+def test_agrupamento_rearma_a_entrega_com_a_mensagem_nova(cenario, canal, db):
+    usuario_id = cenario["usuario_paciente"].id
+
+    primeira = criar_notificacao_service(usuario_id, NotificacaoCreate(tipo="exame", mensagem="Hemograma pronto"), db)
+    processar_entregas_service(canal, db)
+    assert canal.recebidas == [(primeira.id, "Hemograma pronto")]
+
+    # mesmo grupo aberto: a notificação é reescrita e a entrega volta para a fila
+    segunda = criar_notificacao_service(usuario_id, NotificacaoCreate(tipo="exame", mensagem="Glicemia pronta"), db)
+    assert segunda.id == primeira.id
+
+    fila = _fila(db)
+    assert [(e.notificacao_id, e.status, e.versao) for e in fila] == [(primeira.id, "pendente", 1)]
+
+    processar_entregas_service(canal, db)
+    assert canal.recebidas[-1] == (primeira.id, segunda.mensagem)
+    assert segunda.mensagem.startswith("Você tem 2 novas notificações (exame)")
+    assert _fila(db) == []
+
+
+def test_rearme_durante_o_envio_nao_e_perdido(cenario, canal, db):
+    usuario_id = cenario["usuario_paciente"].id
+    notificacao = criar_notificacao_service(usuario_id, NotificacaoCreate(tipo="exame", mensagem="Primeiro"), db)
+
+    def novo_evento():
+        # outro processo agrupa um evento enquanto o lote está no canal
+        canal.durante_envio = None
+        outra = SessionLocal()
+        try:
+            criar_notificacao_service(usuario_id, NotificacaoCreate(tipo="exame", mensagem="Segundo"), outra)
+        finally:
+            outra.close()
+
+    canal.durante_envio = novo_evento
+    processar_entregas_service(canal, db)
+
+    # a versão enviada era a antiga: a linha rearmada continua na fila
+    fila = _fila(db)
+    assert [(e.notificacao_id, e.status) for e in fila] == [(notificacao.id, "pendente")]
+    assert fila[0].versao == 2
+
+    processar_entregas_service(canal, db)
+    assert canal.recebidas[-1][1].startswith("Você tem 2 novas notificações (exame)")
+    assert _fila(db) == []
+
+
+def test_falha_fica_na_fila_com_backoff(cenario, canal, db):
+    notificacao = criar_notificacao_service(
+        cenario["usuario_paciente"].id, NotificacaoCreate(tipo="sistema", mensagem="Aviso"), db
+    )
+    canal.falhar.add(notificacao.id)
+
+    processar_entregas_service(canal, db)
+
+    (entrega,) = _fila(db)
+    assert entrega.status == "pendente"
+    assert entrega.tentativas == 1
+    assert entrega.erro == "indisponível"
+    assert entrega.proxima_tentativa > datetime.now(timezone.utc).replace(tzinfo=None)
+
+    # ainda dentro do backoff: a varredura seguinte não tenta de novo
+    assert processar_entregas_service(canal, db) == 0
+    assert db.query(Notificacao).count() == 1
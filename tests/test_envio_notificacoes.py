@@ -0,0 +1,87 @@
+from collections import Counter
+
+import pytest
+
+from app.models.notificacao import Notificacao
+from app.models.usuario import Usuario
+from app.schemas.notificacao_schema import NotificacaoBroadcastCreate
+from app.services import notificacao_service
+from app.services.notificacao_service import criar_envio_service, processar_envio_service, retomar_envio_service
+
+
+# ---------------------------------------------------------
+# Envio em massa com checkpoint e retomada — user-027
+# ---------------------------------------------------------
+@pytest.fixture
+def muitos_usuarios(cenario, db):
+    for i in range(7):
+        db.add(Usuario(nome=f"Usuário {i}", cpf=f"9000000000{i}", email=f"u{i}@sghss.com", senha_hash="-"))
+    db.commit()
+    return db.query(Usuario).count()
+
+
+def _destinatarios(db) -> Counter:
+    db.expire_all()
+    return Counter(u for (u,) in db.query(Notificacao.usuario_id).filter(Notificacao.tipo == "sistema"))
+
+
+def test_envio_pela_api_chega_a_todos(cliente, cabecalho, cenario, muitos_usuarios, db):
+    admin = cabecalho(cenario["admin"])
+
+    resposta = cliente.post("/notificacoes/envios", headers=admin, json={
+        "tipo": "sistema", "mensagem": "Manutenção às 22h", "alvo": "todos"
+    })
+    assert resposta.status_code == 202
+
+    # o TestClient roda a BackgroundTask antes de devolver a resposta
+    envio = cliente.get(f"/notificacoes/envios/{resposta.json()['id']}", headers=admin).json()
+    assert envio["status"] == "concluido"
+    assert envio["enviados"] == envio["total_destinatarios"] == muitos_usuarios
+    assert set(_destinatarios(db).values()) == {1}
+
+
+def test_envio_interrompido_retoma_do_checkpoint_sem_duplicar(cenario, muitos_usuarios, db, monkeypatch):
+    envio = criar_envio_service(
+        NotificacaoBroadcastCreate(tipo="sistema", mensagem="Aviso geral", alvo="todos"), db
+    )
+
+    # o segundo lote falha no meio (ex.: banco caiu)
+    original = notificacao_service.enfileirar_entregas
+    chamadas = []
+
+    def enfileirar_com_falha(sessao, ids):
+        chamadas.append(ids)
+        if len(chamadas) == 2:
+            raise RuntimeError("conexão perdida")
+        original(sessao, ids)
+
+    monkeypatch.setattr(notificacao_service, "enfileirar_entregas", enfileirar_com_falha)
+
+    envio = processar_envio_service(envio.id, db, tamanho_lote=3)
+    assert envio.status == "erro"
+    assert envio.erro == "conexão perdida"
+    # só o primeiro lote foi confirmado, junto com o checkpoint
+    assert envio.enviados == 3
+    assert sum(_destinatarios(db).values()) == 3
+
+    monkeypatch.setattr(notificacao_service, "enfileirar_entregas", original)
+    assert retomar_envio_service(envio.id, db).status == "pendente"
+
+    envio = processar_envio_service(envio.id, db, tamanho_lote=3)
+    assert envio.status == "concluido"
+    assert envio.enviados == muitos_usuarios
+
+    recebidas = _destinatarios(db)
+    assert len(recebidas) == muitos_usuarios
+    assert set(recebidas.values()) == {1}
+
+
+def test_envio_so_processa_uma_vez(cenario, muitos_usuarios, db):
+    envio = criar_envio_service(
+        NotificacaoBroadcastCreate(tipo="sistema", mensagem="Aviso", alvo="role", role="paciente"), db
+    )
+    assert processar_envio_service(envio.id, db).status == "concluido"
+
+    # já concluído: a reserva condicional não pega de novo
+    assert processar_envio_service(envio.id, db) is None
+    assert _destinatarios(db) == Counter({cenario["usuario_paciente"].id: 1})
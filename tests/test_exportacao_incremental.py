@@ -0,0 +1,88 @@
+import json
+import runpy
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import update
+
+from app.models.agenda import Agenda
+from app.models.consulta import Consulta
+
+
+# ---------------------------------------------------------
+# Exportação incremental para BI (?desde=) e marcas de remoção — user-050
+# ---------------------------------------------------------
+ONTEM = datetime(2026, 5, 31, 12, 0)
+HOJE = datetime(2026, 6, 1, 12, 0)
+
+
+def _ndjson(cliente, headers: dict, url: str, **params) -> list[dict]:
+    resposta = cliente.get(url, headers=headers, params={"formato": "ndjson", **params})
+    assert resposta.status_code == 200, resposta.text
+    return [json.loads(linha) for linha in resposta.text.splitlines()]
+
+
+def _consultas(cliente, cabecalho, cenario, db, quantidade: int) -> list[int]:
+    ids = []
+    for data_hora in cenario["horarios"][:quantidade]:
+        resposta = cliente.post("/consultas/", headers=cabecalho(cenario["admin"]), json={
+            "paciente_id": cenario["paciente"].id,
+            "profissional_id": cenario["medico"].id,
+            "data_hora": data_hora.isoformat() + "Z",
+        })
+        assert resposta.status_code == 200, resposta.text
+        ids.append(resposta.json()["id"])
+    return ids
+
+
+def _atualizado_em(db, consulta_id: int, valor: datetime | None):
+    db.execute(update(Consulta).where(Consulta.id == consulta_id).values(atualizado_em=valor))
+    db.commit()
+
+
+def test_desde_traz_so_o_que_mudou_e_as_remocoes(cliente, cabecalho, cenario, db):
+    admin = cabecalho(cenario["admin"])
+    antiga, mudou, apagada = _consultas(cliente, cabecalho, cenario, db, 3)
+    _atualizado_em(db, antiga, ONTEM)
+    _atualizado_em(db, mudou, HOJE)
+
+    # desde com fuso (09:00 em Brasília = 12:00 UTC) também funciona
+    desde = HOJE.replace(hour=9, tzinfo=timezone(timedelta(hours=-3))).isoformat()
+
+    completa = _ndjson(cliente, admin, "/admin/exportacoes/consultas")
+    assert [c["id"] for c in completa] == [antiga, mudou, apagada]
+
+    carga = _ndjson(cliente, admin, "/admin/exportacoes/consultas", desde=desde, colunas="id,status")
+    assert carga == [{"id": mudou, "status": "agendada"}, {"id": apagada, "status": "agendada"}]
+
+    assert cliente.delete(f"/consultas/{apagada}", headers=admin).status_code == 200
+
+    # a remoção não aparece no export, mas sai como marca, com o mesmo desde
+    assert [c["id"] for c in _ndjson(cliente, admin, "/admin/exportacoes/consultas", desde=desde)] == [mudou]
+    remocoes = _ndjson(cliente, admin, "/admin/exportacoes/consultas/remocoes", desde=desde)
+    assert [r["id"] for r in remocoes] == [apagada]
+    assert _ndjson(cliente, admin, "/admin/exportacoes/agendas/remocoes", desde=desde) == []
+
+    # horário livre apagado: marca em agendas, não em consultas
+    horario = db.query(Agenda.id).filter(Agenda.disponivel == True).order_by(Agenda.id.desc()).first()[0]
+    assert cliente.delete(f"/agendas/{horario}", headers=admin).status_code == 200
+    assert [r["id"] for r in _ndjson(cliente, admin, "/admin/exportacoes/agendas/remocoes", desde=desde)] == [horario]
+    assert [r["id"] for r in _ndjson(cliente, admin, "/admin/exportacoes/consultas/remocoes", desde=desde)] == [apagada]
+
+    # o CSV tem o mesmo conteúdo
+    csv = cliente.get("/admin/exportacoes/consultas/remocoes", headers=admin, params={"desde": desde}).text
+    assert csv.splitlines()[0] == "id,removido_em"
+    assert csv.splitlines()[1].startswith(f"{apagada},")
+
+
+def test_backfill_poe_as_linhas_antigas_na_proxima_carga(cliente, cabecalho, cenario, db):
+    admin = cabecalho(cenario["admin"])
+    (antiga,) = _consultas(cliente, cabecalho, cenario, db, 1)
+    # linha de antes da coluna existir: atualizado_em NULL nunca casa com ?desde=
+    _atualizado_em(db, antiga, None)
+    desde = ONTEM.isoformat()
+    assert _ndjson(cliente, admin, "/admin/exportacoes/consultas", desde=desde) == []
+
+    runpy.run_path(str(Path(__file__).parent.parent / "preencher_atualizado_em.py"))
+
+    assert [c["id"] for c in _ndjson(cliente, admin, "/admin/exportacoes/consultas", desde=desde)] == [antiga]
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.database import SessionLocal
+from app.models.exame import Exame
+from app.services import exame_service
+from app.services.exame_service import reservar_exame_service, reservar_exames_service
+
+
+# ---------------------------------------------------------
+# Fila do laboratório: reserva sem colisão entre técnicos — user-041
+# ---------------------------------------------------------
+CHEGADA = datetime(2026, 6, 1, 7, 0)
+
+
+@pytest.fixture
+def fila(cenario, db):
+    """Quatro hemogramas e uma glicemia, em ordem de chegada."""
+    ids = []
+    for minuto, tipo in enumerate(["Hemograma", "Glicemia", "Hemograma", "Hemograma", "Hemograma"]):
+        exame = Exame(
+            paciente_id=cenario["paciente"].id, profissional_id=cenario["medico"].id,
+            tipo_exame=tipo, status="solicitado", criado_em=CHEGADA + timedelta(minutes=minuto)
+        )
+        db.add(exame)
+        db.flush()
+        ids.append(exame.id)
+    db.commit()
+    return ids
+
+
+def test_reserva_pega_os_mais_antigos_uma_vez_so(fila, db):
+    primeiro = reservar_exames_service(db, "Hemograma", quantidade=2)
+    assert [e.id for e in primeiro] == [fila[0], fila[2]]
+    assert all(e.status == "em_andamento" and e.iniciado_em is not None for e in primeiro)
+
+    # o próximo técnico recebe os seguintes, nunca os mesmos
+    segundo = reservar_exames_service(db, "Hemograma", quantidade=5)
+    assert [e.id for e in segundo] == [fila[3], fila[4]]
+    assert reservar_exames_service(db, "Hemograma") == []
+
+    assert [e.id for e in reservar_exames_service(db)] == [fila[1]]
+
+
+def test_reserva_avanca_quando_outro_tecnico_leva_o_candidato(fila, db, monkeypatch):
+    # entre o SELECT dos candidatos e o UPDATE, outro técnico leva o mais antigo
+    original = exame_service._marcar_em_andamento
+
+    def com_concorrente(sessao, ids):
+        if fila[0] in ids:
+            outra = SessionLocal()
+            outra.get(Exame, fila[0]).status = "em_andamento"
+            outra.commit()
+            outra.close()
+        return original(sessao, ids)
+
+    monkeypatch.setattr(exame_service, "_marcar_em_andamento", com_concorrente)
+
+    reservados = reservar_exames_service(db, "Hemograma", quantidade=2)
+    assert [e.id for e in reservados] == [fila[2], fila[3]]
+
+
+def test_reservar_exame_que_saiu_da_fila_e_409_com_o_status_atual(fila, db):
+    exame_id = fila[0]
+    assert db.get(Exame, exame_id).status == "solicitado"   # fica na sessão
+
+    outra = SessionLocal()
+    outra.get(Exame, exame_id).status = "concluido"
+    outra.commit()
+    outra.close()
+
+    with pytest.raises(HTTPException) as erro:
+        reservar_exame_service(db, exame_id)
+    assert erro.value.status_code == 409
+    assert erro.value.detail == "Exame não está mais na fila (status atual: concluido)."
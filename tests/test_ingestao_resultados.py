@@ -0,0 +1,89 @@
+from app.models.entrada_prontuario import EntradaProntuario
+from app.models.exame import Exame
+from app.models.notificacao import Notificacao
+from app.models.paciente import Paciente
+from app.models.profissional_saude import ProfissionalSaude
+from app.models.usuario import Usuario
+
+
+# ---------------------------------------------------------
+# Ingestão de resultados em lote: um resultado por item — user-040
+# ---------------------------------------------------------
+def _exame(db, paciente_id: int, profissional_id: int, tipo: str = "Hemograma") -> int:
+    exame = Exame(paciente_id=paciente_id, profissional_id=profissional_id, tipo_exame=tipo, status="solicitado")
+    db.add(exame)
+    db.flush()
+    return exame.id
+
+
+def test_cada_item_volta_com_o_seu_resultado(cliente, cabecalho, cenario, db):
+    medico_id = cenario["medico"].id
+    com_prontuario = _exame(db, cenario["paciente"].id, medico_id)
+
+    # paciente cadastrado sem prontuário
+    usuario = Usuario(nome="Sem Prontuário", cpf="44444444444", email="sp@sghss.com", senha_hash="-")
+    db.add(usuario)
+    db.flush()
+    paciente = Paciente(usuario_id=usuario.id)
+    db.add(paciente)
+    db.flush()
+    sem_prontuario = _exame(db, paciente.id, medico_id, "Glicemia")
+    db.commit()
+
+    resposta = cliente.post("/exames/resultados/lote", headers=cabecalho(cenario["admin"]), json={"itens": [
+        {"exame_id": com_prontuario, "status": "concluido", "resultado": "Normal"},
+        {"exame_id": 999999, "status": "concluido"},
+        {"exame_id": sem_prontuario, "status": "concluido", "resultado": "98 mg/dL"},
+        {"exame_id": com_prontuario},
+    ]})
+    assert resposta.status_code == 200, resposta.text
+    corpo = resposta.json()
+    assert (corpo["total"], corpo["atualizados"], corpo["com_erro"]) == (4, 1, 3)
+
+    ok, nao_existe, sem_entrada, vazio = corpo["itens"]
+    assert ok == {"exame_id": com_prontuario, "sucesso": True, "status": "concluido", "erro": None}
+    assert nao_existe["erro"] == "Exame não encontrado."
+    assert not sem_entrada["sucesso"] and "não tem prontuário" in sem_entrada["erro"]
+    assert vazio["erro"] == "Informe status, resultado e/ou analitos."
+
+    # o exame sem prontuário fica concluído, mas sem entrada nem notificação
+    db.expire_all()
+    assert db.get(Exame, sem_prontuario).status == "concluido"
+    assert [e.texto for e in db.query(EntradaProntuario)] == ["Resultado do exame Hemograma: Normal"]
+    assert db.query(Notificacao).filter(Notificacao.usuario_id == usuario.id).count() == 0
+    assert db.query(Notificacao).filter(Notificacao.usuario_id == cenario["usuario_paciente"].id).count() == 1
+
+
+def test_lote_e_patch_gravam_a_mesma_entrada(cliente, cabecalho, cenario, db):
+    medico_id = cenario["medico"].id
+    pelo_lote = _exame(db, cenario["paciente"].id, medico_id)
+    pelo_patch = _exame(db, cenario["paciente"].id, medico_id)
+    db.commit()
+    admin = cabecalho(cenario["admin"])
+
+    cliente.post("/exames/resultados/lote", headers=admin, json={"itens": [
+        {"exame_id": pelo_lote, "status": "concluido"}
+    ]})
+    cliente.patch(f"/exames/{pelo_patch}", headers=admin, json={"status": "concluido"})
+
+    textos = [e.texto for e in db.query(EntradaProntuario).order_by(EntradaProntuario.id)]
+    assert textos == ["Resultado do exame Hemograma: sem resultado informado."] * 2
+
+
+def test_profissional_so_ingere_os_proprios_exames(cliente, cabecalho, cenario, db):
+    exame_id = _exame(db, cenario["paciente"].id, cenario["medico"].id)
+    db.commit()
+
+    # outro médico: o exame não é dele
+    outro = Usuario(nome="Outro Médico", cpf="55555555555", email="om@sghss.com", senha_hash="-")
+    db.add(outro)
+    db.flush()
+    db.add(ProfissionalSaude(usuario_id=outro.id, tipo_profissional="medico", registro_profissional="CRM2"))
+    db.commit()
+
+    corpo = cliente.post("/exames/resultados/lote", headers=cabecalho(outro), json={"itens": [
+        {"exame_id": exame_id, "status": "concluido"}
+    ]}).json()
+    assert corpo["itens"][0]["erro"] == "Você só pode atualizar exames que você mesmo cadastrou."
+    db.expire_all()
+    assert db.get(Exame, exame_id).status == "solicitado"
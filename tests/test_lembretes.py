@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models.consulta import Consulta
+from app.models.lembrete_consulta import LembreteConsulta
+from app.models.notificacao import Notificacao
+from app.services.lembrete_service import gerar_lembretes_service
+
+
+# ---------------------------------------------------------
+# Lembretes de consulta: janela de 24h e um lembrete por consulta — user-028
+# ---------------------------------------------------------
+# 09:00 em Brasília = 12:00 UTC
+AGORA = datetime(2026, 6, 1, 9, 0, tzinfo=timezone(timedelta(hours=-3)))
+AGORA_UTC = datetime(2026, 6, 1, 12, 0)
+
+
+def _consulta(db, cenario, data_hora: datetime, status: str = "agendada") -> int:
+    consulta = Consulta(
+        paciente_id=cenario["paciente"].id, profissional_id=cenario["medico"].id,
+        data_hora=data_hora, status=status
+    )
+    db.add(consulta)
+    db.flush()
+    return consulta.id
+
+
+def _lembradas(db) -> list[int]:
+    db.expire_all()
+    return sorted(c for (c,) in db.query(LembreteConsulta.consulta_id))
+
+
+def test_janela_em_utc_e_um_lembrete_por_consulta(cenario, db):
+    na_janela = [
+        _consulta(db, cenario, AGORA_UTC + timedelta(minutes=30)),
+        _consulta(db, cenario, AGORA_UTC + timedelta(hours=24), status="confirmada"),
+    ]
+    # já passou em UTC (embora seja "depois das 9h" no horário local)
+    _consulta(db, cenario, AGORA_UTC - timedelta(minutes=30))
+    _consulta(db, cenario, AGORA_UTC + timedelta(hours=25))
+    _consulta(db, cenario, AGORA_UTC + timedelta(hours=2), status="cancelada")
+    db.commit()
+
+    assert gerar_lembretes_service(db, agora=AGORA, tamanho_lote=1) == 2
+    assert _lembradas(db) == sorted(na_janela)
+    assert db.query(Notificacao).filter(Notificacao.usuario_id == cenario["usuario_paciente"].id).count() == 2
+
+    # a varredura seguinte (ou outro worker) não lembra de novo
+    assert gerar_lembretes_service(db, agora=AGORA + timedelta(minutes=5)) == 0
+    assert db.query(Notificacao).count() == 2
+
+
+def test_consulta_reagendada_ganha_lembrete_novo(cenario, db):
+    consulta_id = _consulta(db, cenario, AGORA_UTC + timedelta(hours=1))
+    db.commit()
+    assert gerar_lembretes_service(db, agora=AGORA) == 1
+
+    db.get(Consulta, consulta_id).data_hora = AGORA_UTC + timedelta(hours=5)
+    db.commit()
+
+    assert gerar_lembretes_service(db, agora=AGORA) == 1
+    assert _lembradas(db) == [consulta_id, consulta_id]
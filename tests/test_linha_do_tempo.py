@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.consulta import Consulta
+from app.models.entrada_prontuario import EntradaProntuario
+from app.models.exame import Exame
+from app.models.prontuario import Prontuario
+
+
+# ---------------------------------------------------------
+# Linha do tempo do paciente paginada por cursor, com empates entre fontes — user-035
+# ---------------------------------------------------------
+MESMO_INSTANTE = datetime(2025, 3, 10, 14, 0)
+ANTES = datetime(2025, 3, 9, 8, 30)
+
+
+def _todas_as_paginas(cliente, url: str, headers: dict, limite: int) -> list[dict]:
+    itens, cursor = [], None
+    while True:
+        params = {"limite": limite, **({"cursor": cursor} if cursor else {})}
+        resposta = cliente.get(url, params=params, headers=headers)
+        assert resposta.status_code == 200, resposta.text
+        pagina = resposta.json()
+        assert len(pagina["itens"]) <= limite
+        itens += pagina["itens"]
+        cursor = pagina["proximo_cursor"]
+        if cursor is None:
+            return itens
+
+
+@pytest.fixture
+def historico(cenario, db):
+    """Consultas, exames e entradas com vários itens no MESMO instante."""
+    paciente_id = cenario["paciente"].id
+    profissional_id = cenario["medico"].id
+    prontuario_id = db.query(Prontuario.id).filter(Prontuario.paciente_id == paciente_id).scalar()
+
+    for data in (MESMO_INSTANTE, MESMO_INSTANTE, ANTES):
+        db.add(Consulta(paciente_id=paciente_id, profissional_id=profissional_id, data_hora=data, status="finalizada"))
+        db.add(Exame(
+            paciente_id=paciente_id, profissional_id=profissional_id, tipo_exame="Hemograma",
+            status="concluido", criado_em=data
+        ))
+    for i, data in enumerate([MESMO_INSTANTE] * 5 + [ANTES] * 2):
+        db.add(EntradaProntuario(prontuario_id=prontuario_id, tipo="evolucao", texto=f"Entrada {i}", data_hora=data))
+    db.commit()
+    return paciente_id
+
+
+@pytest.mark.parametrize("limite", [1, 2, 4])
+def test_linha_do_tempo_pagina_empates_entre_fontes(cliente, cabecalho, cenario, historico, limite):
+    url = f"/pacientes/{historico}/linha-do-tempo"
+    admin = cabecalho(cenario["admin"])
+
+    paginado = _todas_as_paginas(cliente, url, admin, limite)
+    de_uma_vez = cliente.get(url, params={"limite": 100}, headers=admin).json()["itens"]
+
+    chaves = [(item["tipo"], item["id"]) for item in paginado]
+    assert chaves == [(item["tipo"], item["id"]) for item in de_uma_vez]
+    assert len(set(chaves)) == 3 + 3 + 7
+
+    # no mesmo instante: consultas, depois exames, depois entradas; dentro da fonte, id decrescente
+    no_mesmo_instante = [k for k, item in zip(chaves, paginado) if item["data_hora"].startswith("2025-03-10")]
+    tipos = [tipo for tipo, _ in no_mesmo_instante]
+    assert tipos == ["consulta"] * 2 + ["exame"] * 2 + ["entrada"] * 5
+    for fonte in ("consulta", "exame", "entrada"):
+        ids = [i for tipo, i in no_mesmo_instante if tipo == fonte]
+        assert ids == sorted(ids, reverse=True)
+
+
+def test_cursor_invalido_e_400(cliente, cabecalho, cenario, historico):
+    resposta = cliente.get(
+        f"/pacientes/{historico}/linha-do-tempo", params={"cursor": "nao-e-um-cursor"},
+        headers=cabecalho(cenario["admin"])
+    )
+    assert resposta.status_code == 400
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from app.models.entrada_prontuario import EntradaProntuario
+from app.models.prontuario import Prontuario
+from app.models.resumo_prontuario import ResumoProntuario
+from app.schemas.prontuario_schema import EntradaProntuarioCreate
+from app.services.prontuario_service import adicionar_entrada, obter_resumo
+
+
+# ---------------------------------------------------------
+# Resumo do prontuário mantido na mesma transação da entrada — user-038
+# ---------------------------------------------------------
+def _entrada_antiga(db, prontuario_id: int, tipo: str, dia: int):
+    db.add(EntradaProntuario(
+        prontuario_id=prontuario_id, tipo=tipo, texto=f"{tipo} do dia {dia}", data_hora=datetime(2025, 1, dia)
+    ))
+
+
+def test_primeira_entrada_cria_o_resumo_contando_as_antigas(cenario, db):
+    paciente_id = cenario["paciente"].id
+    prontuario_id = db.query(Prontuario.id).filter(Prontuario.paciente_id == paciente_id).scalar()
+    # prontuário de antes do resumo existir: tem entradas, mas não tem a linha do resumo
+    for dia in (1, 2, 3):
+        _entrada_antiga(db, prontuario_id, "evolucao", dia)
+    db.commit()
+    assert db.get(ResumoProntuario, prontuario_id) is None
+
+    adicionar_entrada(db, paciente_id, EntradaProntuarioCreate(texto="Retorno em 30 dias", tipo="anotacao"))
+    adicionar_entrada(db, paciente_id, EntradaProntuarioCreate(texto="Exame pedido", tipo="anotacao"))
+
+    db.expire_all()
+    resumo = obter_resumo(db, paciente_id)
+    assert resumo.total_entradas == 5
+    assert resumo.contagem_por_tipo == {"evolucao": 3, "anotacao": 2}
+    assert [e["trecho"] for e in resumo.ultimas_entradas[:3]] == [
+        "Exame pedido", "Retorno em 30 dias", "evolucao do dia 3"
+    ]
+
+
+def test_ler_o_resumo_cria_uma_vez_so(cenario, db):
+    paciente_id = cenario["paciente"].id
+    prontuario_id = db.query(Prontuario.id).filter(Prontuario.paciente_id == paciente_id).scalar()
+    _entrada_antiga(db, prontuario_id, "evolucao", 1)
+    db.commit()
+
+    assert obter_resumo(db, paciente_id).total_entradas == 1
+    # já existe: a segunda leitura (ou uma escrita) não insere de novo
+    assert obter_resumo(db, paciente_id).total_entradas == 1
+    adicionar_entrada(db, paciente_id, EntradaProntuarioCreate(texto="Nova", tipo="evolucao"))
+    db.expire_all()
+    assert obter_resumo(db, paciente_id).contagem_por_tipo == {"evolucao": 2}
+    assert db.query(ResumoProntuario).count() == 1
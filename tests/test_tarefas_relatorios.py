@@ -0,0 +1,99 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.database import SessionLocal
+from app.models.tarefa_relatorio import TarefaRelatorio
+from app.services import tarefa_relatorio_service
+from app.services.tarefa_relatorio_service import (
+    INSTANCIA,
+    _executar_tarefa,
+    caminho_resultado,
+    recuperar_tarefas_interrompidas,
+    renovar_tarefas_em_background,
+)
+
+
+# ---------------------------------------------------------
+# Tarefas de relatório: reserva por instância e recuperação das órfãs — user-049
+# ---------------------------------------------------------
+@pytest.fixture
+def tarefa(cenario, db):
+    def criar(instancia: str | None, status: str = "pendente", reserva_minutos: int | None = 2,
+              relatorio: str = "consultas_por_status") -> int:
+        agora = datetime.now(timezone.utc).replace(tzinfo=None)
+        nova = TarefaRelatorio(
+            relatorio=relatorio, parametros={}, status=status, solicitado_por=cenario["admin"].id,
+            instancia=instancia,
+            reservada_ate=agora + timedelta(minutes=reserva_minutos) if reserva_minutos is not None else None
+        )
+        db.add(nova)
+        db.commit()
+        return nova.id
+    return criar
+
+
+@pytest.fixture
+def em_aberto(monkeypatch):
+    # _executar_tarefa desconta do contador do pool; aqui a tarefa roda sem passar pelo pool
+    monkeypatch.setattr(tarefa_relatorio_service, "_em_aberto", 1)
+
+
+def _status(db, *ids) -> list[str]:
+    db.expire_all()
+    return [db.get(TarefaRelatorio, i).status for i in ids]
+
+
+def test_recupera_so_as_orfas(tarefa, db):
+    desta_instancia = tarefa(INSTANCIA, reserva_minutos=2)          # a instância reiniciou: o pool se perdeu
+    viva = tarefa("outra", "executando", reserva_minutos=1)         # outra instância ainda renovando
+    vencida = tarefa("caiu", "executando", reserva_minutos=-1)      # outra instância parou de renovar
+    antiga = tarefa(None, reserva_minutos=None)                     # criada antes da reserva existir
+
+    recuperar_tarefas_interrompidas()
+
+    assert _status(db, desta_instancia, viva, vencida, antiga) == ["erro", "executando", "erro", "erro"]
+    assert db.get(TarefaRelatorio, vencida).erro.startswith("Interrompida")
+
+
+def test_renovacao_mantem_as_proprias_e_marca_as_vencidas_das_outras(tarefa, db):
+    propria = tarefa(INSTANCIA, "executando", reserva_minutos=-1)   # venceu, mas a dona está viva
+    de_outra = tarefa("caiu", "executando", reserva_minutos=-1)
+
+    renovar_tarefas_em_background()
+
+    assert _status(db, propria, de_outra) == ["executando", "erro"]
+    assert db.get(TarefaRelatorio, propria).reservada_ate > datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def test_conclusao_nao_sobrescreve_a_tarefa_dada_como_interrompida(tarefa, db, em_aberto, monkeypatch):
+    tarefa_id = tarefa(INSTANCIA)
+
+    def relatorio_lento(sessao):
+        # enquanto roda, outra instância acha a reserva vencida e marca erro
+        outra = SessionLocal()
+        outra.get(TarefaRelatorio, tarefa_id).status = "erro"
+        outra.commit()
+        outra.close()
+        return {"ok": True}
+
+    monkeypatch.setitem(tarefa_relatorio_service.RELATORIOS_ASSINCRONOS, "consultas_por_status", relatorio_lento)
+
+    _executar_tarefa(tarefa_id)
+
+    assert _status(db, tarefa_id) == ["erro"]
+    assert not os.path.exists(caminho_resultado(tarefa_id))
+
+
+def test_exportacao_de_pacientes_em_background(tarefa, cenario, db, em_aberto):
+    tarefa_id = tarefa(INSTANCIA, relatorio="exportacao_pacientes")
+
+    _executar_tarefa(tarefa_id)
+
+    assert _status(db, tarefa_id) == ["concluida"]
+    with open(caminho_resultado(tarefa_id), encoding="utf-8") as arquivo:
+        pacientes = json.load(arquivo)
+    assert [p["paciente_id"] for p in pacientes] == [cenario["paciente"].id]
+    assert pacientes[0]["cpf"] == cenario["usuario_paciente"].cpf
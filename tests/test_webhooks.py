@@ -0,0 +1,94 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.webhook import AssinaturaWebhook, EntregaWebhook
+from app.services import webhook_service
+from app.services.webhook_service import MAX_TENTATIVAS_WEBHOOK, entregar_lote_webhook, publicar_evento
+
+
+# ---------------------------------------------------------
+# Outbox de webhooks: reserva por lote e nova tentativa com backoff — user-031
+# ---------------------------------------------------------
+@pytest.fixture
+def assinatura(db):
+    assinatura = AssinaturaWebhook(
+        url="http://integrador.local/eventos", eventos=["consulta.cancelada"], segredo="s", ativo=True
+    )
+    db.add(assinatura)
+    db.commit()
+    return assinatura.id
+
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    # troca o POST real: guarda os ids de cada lote e devolve o erro configurado
+    chamadas = {"lotes": [], "erro": None}
+
+    def post_falso(url, corpo, cabecalhos):
+        chamadas["lotes"].append([e["id"] for e in json.loads(corpo)["eventos"]])
+        return chamadas["erro"]
+
+    monkeypatch.setattr(webhook_service, "_post", post_falso)
+    return chamadas
+
+
+def _publicar(db, quantidade: int) -> list[int]:
+    for i in range(quantidade):
+        publicar_evento(db, "consulta.cancelada", {"consulta_id": i})
+    db.commit()
+    return [i for (i,) in db.query(EntregaWebhook.id).order_by(EntregaWebhook.id)]
+
+
+def test_lote_entregue_e_apagado(assinatura, endpoint, db):
+    ids = _publicar(db, 3)
+
+    assert entregar_lote_webhook(assinatura) == 3
+    assert endpoint["lotes"] == [ids]
+    db.expire_all()
+    assert db.query(EntregaWebhook).count() == 0
+
+
+def test_reserva_viva_nao_e_pega_e_vencida_volta(assinatura, endpoint, db):
+    (entrega_id,) = _publicar(db, 1)
+
+    # outro worker reservou e ainda está dentro do prazo
+    entrega = db.get(EntregaWebhook, entrega_id)
+    entrega.status, entrega.lote = "enviando", "outro-worker"
+    entrega.proxima_tentativa = datetime.now(timezone.utc) + timedelta(minutes=1)
+    db.commit()
+    assert entregar_lote_webhook(assinatura) == 0
+    assert endpoint["lotes"] == []
+
+    # o worker caiu: a reserva vence e a linha é reservada de novo
+    entrega.proxima_tentativa = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.commit()
+    assert entregar_lote_webhook(assinatura) == 1
+    assert endpoint["lotes"] == [[entrega_id]]
+
+
+def test_falha_reagenda_com_backoff_ate_desistir(assinatura, endpoint, db):
+    (entrega_id,) = _publicar(db, 1)
+    endpoint["erro"] = "HTTP 503"
+
+    antes = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert entregar_lote_webhook(assinatura) == 1
+
+    db.expire_all()
+    entrega = db.get(EntregaWebhook, entrega_id)
+    assert (entrega.status, entrega.tentativas, entrega.erro, entrega.lote) == ("pendente", 1, "HTTP 503", None)
+    assert entrega.proxima_tentativa >= antes + timedelta(seconds=15)
+
+    # ainda no backoff: nada a entregar
+    assert entregar_lote_webhook(assinatura) == 0
+
+    # última tentativa falha: vira "falhou" e sai da fila
+    entrega.tentativas = MAX_TENTATIVAS_WEBHOOK - 1
+    entrega.proxima_tentativa = antes
+    db.commit()
+    assert entregar_lote_webhook(assinatura) == 1
+
+    db.expire_all()
+    assert db.get(EntregaWebhook, entrega_id).status == "falhou"
+    assert entregar_lote_webhook(assinatura) == 0